@@ -25,6 +25,10 @@ def create_app(config_class=Config):
                 static_folder=static_dir)
     app.config.from_object(config_class)
 
+    # Zone for users who have not picked one (schedules are entered in wall-clock time)
+    from app.utils.timezones import set_default_zone
+    set_default_zone(app.config.get('DEFAULT_TIMEZONE'))
+
     # Root landing page
     @app.route('/')
     def index():
@@ -103,16 +107,22 @@ def create_app(config_class=Config):
     # Import models to ensure they're registered
     from app import models
 
-    # Create database tables
+    # Register Socket.IO connect handlers (per-user rooms)
+    from app import realtime
+
+    # Create database tables, then add columns and indexes create_all cannot add to existing ones
     with app.app_context():
         db.create_all()
+        from app import schema_upgrade
+        schema_upgrade.upgrade()
 
     # Start the background scheduler for notifications
-    try:
-        from app.scheduler import start_scheduler, stop_scheduler
-        start_scheduler(app, socketio)
-        atexit.register(stop_scheduler)
-    except Exception as e:
-        print(f"Warning: Could not start scheduler: {e}")
+    if app.config.get('SCHEDULER_AUTOSTART', True):
+        try:
+            from app.scheduler import start_scheduler, stop_scheduler
+            start_scheduler(app, socketio)
+            atexit.register(stop_scheduler)
+        except Exception as e:
+            print(f"Warning: Could not start scheduler: {e}")
 
     return app
@@ -1,7 +1,23 @@
-from flask import jsonify
+from flask import Response, current_app, jsonify, request
 from flask_login import current_user
 from app.admin import bp
-from app.scheduler import scheduler
+from app.scheduler import scheduler, scheduler_lease, reported_stats, render_metrics
+from datetime import date
+import hmac
+
+
+def _bearer(token):
+    """True when the request carries `Authorization: Bearer <token>` (never for an unset token)."""
+    bearer = request.headers.get('Authorization', '')
+    return bool(token) and hmac.compare_digest(bearer, f'Bearer {token}')
+
+
+def _is_admin():
+    """ADMIN_TOKEN bearer, or a logged-in user named in ADMIN_USERS."""
+    if _bearer(current_app.config.get('ADMIN_TOKEN')):
+        return True
+    return bool(current_user) and current_user.is_authenticated and \
+        current_user.username in current_app.config.get('ADMIN_USERS', ())
 
 
 @bp.route('/jobs', methods=['GET'])
@@ -29,3 +45,105 @@ def jobs():
         })
 
     return jsonify(jobs_list), 200
+
+
+@bp.route('/scheduler/stats', methods=['GET'])
+def scheduler_stats():
+    """Return job execution counters (submitted, queued, misfired, coalesced, ...). Requires authentication.
+
+    Served from the leader's last persisted report when another process runs the scheduler.
+    """
+    if not current_user or not current_user.is_authenticated:
+        return jsonify({'error': 'unauthenticated'}), 401
+
+    return jsonify(reported_stats()), 200
+
+
+@bp.route('/scheduler/leader', methods=['GET'])
+def scheduler_leader():
+    """Return which process holds the scheduler lease and how fresh its heartbeat is. Requires authentication."""
+    if not current_user or not current_user.is_authenticated:
+        return jsonify({'error': 'unauthenticated'}), 401
+
+    return jsonify(scheduler_lease.status()), 200
+
+
+@bp.route('/metrics', methods=['GET'])
+def scheduler_metrics():
+    """Scheduler metrics in Prometheus text format.
+
+    Requires authentication, or `Authorization: Bearer <METRICS_TOKEN>` for scrapers. The
+    scheduler engine's series come from the leader's last persisted report when another
+    process runs the scheduler.
+    """
+    scraper = _bearer(current_app.config.get('METRICS_TOKEN'))
+    if not scraper and (not current_user or not current_user.is_authenticated):
+        return jsonify({'error': 'unauthenticated'}), 401
+
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
+
+
+@bp.route('/terms', methods=['GET'])
+def list_terms():
+    """Return academic term date ranges with the last rollover report. Requires authentication."""
+    if not current_user or not current_user.is_authenticated:
+        return jsonify({'error': 'unauthenticated'}), 401
+
+    from app.models import AcademicTerm
+    from app.terms import last_run
+
+    terms = AcademicTerm.query.order_by(AcademicTerm.starts_on.desc()).all()
+    return jsonify({
+        'terms': [{
+            'id': t.id,
+            'semester': t.semester,
+            'academic_year': t.academic_year,
+            'starts_on': t.starts_on.isoformat(),
+            'ends_on': t.ends_on.isoformat(),
+        } for t in terms],
+        'last_rollover': dict(last_run),
+    }), 200
+
+
+@bp.route('/terms', methods=['POST'])
+def save_term():
+    """Create or update a term from JSON {semester, academic_year, starts_on, ends_on}. Admins only.
+
+    Returns 403 unless the request is an admin's (see _is_admin).
+    """
+    if not _is_admin():
+        return jsonify({'error': 'forbidden'}), 403
+
+    from app import db
+    from app.models import AcademicTerm
+
+    data = request.get_json(silent=True) or {}
+    semester = (data.get('semester') or '').strip()
+    academic_year = (data.get('academic_year') or '').strip()
+    try:
+        starts_on = date.fromisoformat(data.get('starts_on') or '')
+        ends_on = date.fromisoformat(data.get('ends_on') or '')
+    except ValueError:
+        return jsonify({'error': 'starts_on and ends_on must be YYYY-MM-DD dates'}), 400
+    if not semester or not academic_year or ends_on < starts_on:
+        return jsonify({'error': 'semester, academic_year and a valid date range are required'}), 400
+
+    term = AcademicTerm.query.filter_by(semester=semester, academic_year=academic_year).first()
+    if term is None:
+        term = AcademicTerm(semester=semester, academic_year=academic_year)
+        db.session.add(term)
+    term.starts_on = starts_on
+    term.ends_on = ends_on
+    db.session.commit()
+    return jsonify({'id': term.id}), 200
+
+
+@bp.route('/terms/rollover', methods=['POST'])
+def run_term_rollover():
+    """Run the term rollover now instead of waiting for the hourly job. Admins only (403 otherwise)."""
+    if not _is_admin():
+        return jsonify({'error': 'forbidden'}), 403
+
+    from app.terms import run_rollover
+
+    return jsonify(run_rollover()), 200
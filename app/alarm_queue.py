@@ -0,0 +1,130 @@
+"""
+Shared queue of due alarms, drained by every scheduler process
+
+With ALARM_QUEUE_ENABLED the scheduler leader stops delivering alarms itself: the tick,
+the per-occurrence jobs and the minute buckets insert what is due into `due_alarms`, and
+a consumer thread in every process that runs `start_scheduler` (typically several
+`scheduler_worker.py` processes) claims batches of rows and delivers them.
+
+Claims go through `claims.claim_rows` (one `UPDATE ... RETURNING` that skips rows locked
+by other workers on Postgres). A claim hides its rows for ALARM_QUEUE_VISIBILITY_TIMEOUT seconds: rows of a worker that dies before
+acknowledging them become claimable again, and the fire ledger keeps the retry from
+notifying anyone twice.
+"""
+
+from datetime import datetime, timedelta, timezone
+
+from app import claims
+from app.polling import PollingThread
+
+# Report of the most recent batch this process delivered
+last_batch = {}
+
+
+def _naive_utc(at: datetime):
+    return at.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def enqueue(alarms):
+    """Insert (schedule, seconds_before, occurrence_date, fire_at) alarms; returns those not already queued.
+
+    Commits. Call inside an app context.
+    """
+    from app import db
+    from app.models import DueAlarm
+
+    if not alarms:
+        return []
+
+    rows = [
+        {'schedule_id': sched.id, 'offset_seconds': seconds_before, 'occurrence_date': occurrence_date,
+         'fire_at': _naive_utc(fire_at), 'attempts': 0}
+        for sched, seconds_before, occurrence_date, fire_at in alarms
+    ]
+    # A morning burst goes in chunks, like the fire ledger (app/claims.py)
+    inserted = claims.insert_new(DueAlarm, rows, ('schedule_id', 'offset_seconds', 'occurrence_date'))
+    db.session.commit()
+    return [alarm for alarm in alarms if (alarm[0].id, alarm[1], alarm[2]) in inserted]
+
+
+def claim(worker: str, batch_size: int, visibility_timeout: int, now: datetime):
+    """Claim up to `batch_size` unclaimed or expired rows, earliest first. Returns the DueAlarm rows as tuples."""
+    from app.models import DueAlarm
+
+    columns = (DueAlarm.id, DueAlarm.schedule_id, DueAlarm.offset_seconds, DueAlarm.occurrence_date,
+               DueAlarm.fire_at, DueAlarm.attempts)
+    return claims.claim_rows(DueAlarm, columns, DueAlarm.fire_at, worker, batch_size, visibility_timeout,
+                             _naive_utc(now), attempts=DueAlarm.attempts + 1)
+
+
+def ack(ids, worker: str):
+    """Delete delivered rows that are still ours (a row re-claimed after our timeout is left to its new owner)."""
+    from app import db
+    from app.models import DueAlarm
+
+    if ids:
+        db.session.execute(db.delete(DueAlarm).where(DueAlarm.id.in_(ids), DueAlarm.claimed_by == worker))
+        db.session.commit()
+
+
+def depth():
+    """Rows waiting or in flight (call inside an app context)."""
+    from app import db
+    from app.models import DueAlarm
+
+    return db.session.query(db.func.count(DueAlarm.id)).scalar()
+
+
+def process_batch(config, worker: str):
+    """Claim one batch, deliver it and acknowledge it. Returns the number of rows claimed."""
+    import app.scheduler as sched_module
+    from app import metrics
+    from app.models import Schedule
+
+    now = sched_module.clock()
+    rows = claim(worker, config.get('ALARM_QUEUE_BATCH_SIZE', 500),
+                 config.get('ALARM_QUEUE_VISIBILITY_TIMEOUT', 30), now)
+    if not rows:
+        return 0
+
+    query = Schedule.query.filter(Schedule.id.in_({row.schedule_id for row in rows}))
+    schedules = {s.id: s for s in sched_module._with_user_zone(query).all()}
+    max_lateness = timedelta(seconds=config.get('ALARM_QUEUE_MAX_LATENESS', 300))
+    max_attempts = config.get('ALARM_QUEUE_MAX_ATTEMPTS', 5)
+
+    alarms, dropped = [], 0
+    for row in rows:
+        sched = schedules.get(row.schedule_id)
+        fire_at = row.fire_at.replace(tzinfo=timezone.utc)
+        if not sched_module._is_active(sched) or now - fire_at > max_lateness or row.attempts > max_attempts:
+            dropped += 1
+            continue
+        alarms.append((sched, row.offset_seconds, row.occurrence_date, fire_at))
+
+    delivered = sched_module._deliver_alarms(alarms, 'queue')
+    ack([row.id for row in rows], worker)
+    metrics.alarm_queue_claimed.inc(len(rows))
+
+    last_batch.clear()
+    last_batch.update({'at': now.isoformat(), 'worker': worker, 'claimed': len(rows),
+                       'delivered': len(delivered), 'dropped': dropped})
+    return len(rows)
+
+
+class AlarmQueueConsumer(PollingThread):
+    """Background thread that drains the due-alarm queue in batches."""
+
+    thread_name = 'alarm-queue-consumer'
+
+    def start(self, app):
+        if super().start(app):
+            print(f"✓ Alarm queue consumer started as {self.worker}")
+
+    def _poll(self):
+        return process_batch(self._app.config, self.worker)
+
+    def _delay(self, claimed):
+        # A full batch means more is probably waiting: go again without sleeping
+        if (claimed or 0) >= self._app.config.get('ALARM_QUEUE_BATCH_SIZE', 500):
+            return 0
+        return self._app.config.get('ALARM_QUEUE_POLL_INTERVAL', 1)
@@ -0,0 +1,103 @@
+"""
+Dialect-dispatched SQL for claiming work exactly once
+
+`insert_new()` inserts rows and reports which ones were not already present by their
+unique key, for the fire ledger and the due-alarm queue. It is one
+`INSERT ... ON CONFLICT DO NOTHING RETURNING` on Postgres and SQLite (3.35 or newer), in
+chunks that stay under SQLite's bound-parameter limit, and one savepoint per row on any
+other database.
+
+`claim_rows()` hands out rows of a work table (the due-alarm queue, the notification
+outbox) to one worker at a time. On Postgres a claim is one
+`UPDATE ... WHERE id IN (SELECT ... FOR UPDATE SKIP LOCKED) RETURNING`, so workers never
+wait on each other's rows; SQLite runs the same statement without the locking clause, its
+database-wide write lock serializing claims.
+"""
+
+from datetime import timedelta
+
+from sqlalchemy.exc import IntegrityError
+
+# SQLite before 3.32 allows at most 999 bound parameters per statement
+MAX_BIND_PARAMS = 999
+
+
+def _dialect_insert(dialect: str):
+    """The dialect's `insert` construct with ON CONFLICT support, or None."""
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        return None
+    return insert
+
+
+def insert_new(model, rows, key_columns):
+    """Insert `rows` (dicts) into `model`'s table, skipping those whose `key_columns` already exist.
+
+    `key_columns` names the columns of a unique index. Returns the set of key tuples this
+    call inserted. Runs in the caller's transaction (does not commit).
+    """
+    from app import db
+
+    if not rows:
+        return set()
+
+    insert = _dialect_insert(db.session.get_bind().dialect.name)
+    if insert is None:
+        # Portable fallback: one savepoint per row
+        inserted = set()
+        for row in rows:
+            try:
+                with db.session.begin_nested():
+                    db.session.execute(db.insert(model).values(**row))
+                inserted.add(tuple(row[name] for name in key_columns))
+            except IntegrityError:
+                pass
+        return inserted
+
+    chunk_size = max(1, MAX_BIND_PARAMS // len(rows[0]))
+    returning = [getattr(model, name) for name in key_columns]
+    inserted = set()
+    for i in range(0, len(rows), chunk_size):
+        stmt = insert(model).values(rows[i:i + chunk_size]).on_conflict_do_nothing(
+            index_elements=list(key_columns)
+        ).returning(*returning)
+        inserted.update(tuple(row) for row in db.session.execute(stmt))
+    return inserted
+
+
+def claim_rows(model, columns, order_by, worker: str, batch_size: int, visibility_timeout: int, now,
+               **values):
+    """Claim up to `batch_size` of `model`'s unclaimed or expired rows in `order_by` order, and commit.
+
+    `model` has `id`, `claimed_until` and `claimed_by` columns; `now` is naive UTC. A claim
+    hides its rows for `visibility_timeout` seconds. Extra `values` are set on the claimed
+    rows too. Returns their `columns` as tuples.
+    """
+    from app import db
+
+    claimable = db.select(model.id).where(
+        db.or_(model.claimed_until.is_(None), model.claimed_until < now)
+    ).order_by(order_by).limit(batch_size)
+    values.update(claimed_until=now + timedelta(seconds=visibility_timeout), claimed_by=worker)
+
+    dialect = db.session.get_bind().dialect.name
+    if dialect in ('postgresql', 'sqlite'):
+        if dialect == 'postgresql':
+            claimable = claimable.with_for_update(skip_locked=True)
+        stmt = db.update(model).where(model.id.in_(claimable.scalar_subquery())).values(**values)
+        rows = db.session.execute(stmt.returning(*columns)).all()
+    else:
+        # Portable fallback: lock the candidates, then claim only those still unclaimed
+        ids = db.session.execute(claimable.with_for_update(skip_locked=True)).scalars().all()
+        if ids:
+            db.session.execute(db.update(model).where(
+                model.id.in_(ids), db.or_(model.claimed_until.is_(None), model.claimed_until < now)
+            ).values(**values))
+        rows = db.session.execute(db.select(*columns).where(
+            model.id.in_(ids), model.claimed_by == worker, model.claimed_until == values['claimed_until']
+        )).all() if ids else []
+    db.session.commit()
+    return rows
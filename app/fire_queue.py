@@ -0,0 +1,205 @@
+"""
+In-memory priority queue of upcoming alarm fire instants.
+
+Entries are keyed by (schedule_id, offset_seconds) and ordered by their next fire
+instant, so the scheduler tick only has to look at the head of the heap instead of
+re-evaluating every enabled schedule. Updates and removals are lazy: the heap may hold
+stale items, but only the item matching the current `_entries` value is ever returned.
+
+A queue can also be started from fire-time-sorted arrays (`load_sorted`, e.g. a
+memory-mapped plan snapshot). Those entries stay in a cold tail and move into the heap
+only as they come due, so loading costs nothing per entry; a later push or discard of the
+same schedule supersedes its cold entries.
+"""
+
+from datetime import datetime, timezone
+import heapq
+import threading
+
+
+class FireQueue:
+    """Thread-safe min-heap of (fire_at, schedule_id, offset_seconds) entries."""
+
+    def __init__(self):
+        self._heap = []
+        self._entries = {}  # schedule_id -> {offset_seconds: fire_ts}
+        self._live = 0
+        self._lock = threading.Lock()
+        self._drop_cold()
+
+    def __len__(self):
+        """Live entries; cold entries superseded by a later push or discard count until they are skipped."""
+        cold = len(self._cold[0]) - self._cold_pos if self._cold is not None else 0
+        return self._live + cold
+
+    def push(self, schedule_id: int, offset_seconds: int, fire_at: datetime):
+        """Insert or move the entry for (schedule_id, offset_seconds) to `fire_at`."""
+        ts = fire_at.timestamp()
+        with self._lock:
+            if self._cold is not None:
+                self._dead_keys.add((schedule_id, offset_seconds))
+            offsets = self._entries.setdefault(schedule_id, {})
+            if offset_seconds not in offsets:
+                self._live += 1
+            offsets[offset_seconds] = ts
+            heapq.heappush(self._heap, (ts, schedule_id, offset_seconds))
+            self._maybe_compact()
+
+    def load(self, entries):
+        """Replace the queue contents with (schedule_id, offset_seconds, fire_ts) tuples in O(n)."""
+        heap = []
+        by_schedule = {}
+        for schedule_id, offset_seconds, ts in entries:
+            by_schedule.setdefault(schedule_id, {})[offset_seconds] = ts
+            heap.append((ts, schedule_id, offset_seconds))
+        heapq.heapify(heap)
+        with self._lock:
+            self._heap = heap
+            self._entries = by_schedule
+            self._live = sum(len(offsets) for offsets in by_schedule.values())
+            self._drop_cold()
+
+    def load_sorted(self, fire_ts, schedule_ids, offsets):
+        """Replace the queue contents with parallel arrays sorted by `fire_ts` (epoch seconds), kept as a cold tail."""
+        with self._lock:
+            self._heap = []
+            self._entries = {}
+            self._live = 0
+            self._drop_cold()
+            if len(fire_ts):
+                self._cold = (fire_ts, schedule_ids, offsets)
+
+    def export(self):
+        """Return (fire_ts, schedule_id, offset_seconds) for every live entry, hot and cold.
+
+        Cold entries are returned as array slices with the keys superseded since loading,
+        so the caller can filter them without holding the lock.
+        """
+        with self._lock:
+            hot = [
+                (ts, schedule_id, offset_seconds)
+                for schedule_id, offsets in self._entries.items()
+                for offset_seconds, ts in offsets.items()
+            ]
+            if self._cold is None:
+                return hot, None, set(), set()
+            ts, ids, offs = self._cold
+            pos = self._cold_pos
+            return hot, (ts[pos:], ids[pos:], offs[pos:]), set(self._dead_ids), set(self._dead_keys)
+
+    def discard(self, schedule_id: int, offset_seconds: int = None):
+        """Drop one offset of a schedule, or every offset when `offset_seconds` is None."""
+        with self._lock:
+            if offset_seconds is None:
+                self._live -= len(self._entries.pop(schedule_id, {}))
+                if self._cold is not None:
+                    self._dead_ids.add(schedule_id)
+            else:
+                self._discard_locked(schedule_id, offset_seconds)
+                if self._cold is not None:
+                    self._dead_keys.add((schedule_id, offset_seconds))
+
+    def clear(self):
+        with self._lock:
+            self._heap = []
+            self._entries = {}
+            self._live = 0
+            self._drop_cold()
+
+    def offsets_for(self, schedule_id: int):
+        """Return {offset_seconds: fire_at} currently queued for a schedule."""
+        with self._lock:
+            found = dict(self._entries.get(schedule_id, {}))
+            if self._cold is not None and schedule_id not in self._dead_ids:
+                ts, ids, offs = self._cold
+                pos = self._cold_pos
+                for i in (ids[pos:] == schedule_id).nonzero()[0]:
+                    offset = int(offs[pos + i])
+                    if (schedule_id, offset) not in self._dead_keys:
+                        found.setdefault(offset, float(ts[pos + i]))
+            return {offset: datetime.fromtimestamp(ts, timezone.utc) for offset, ts in found.items()}
+
+    def peek(self):
+        """Return the earliest live fire instant as an aware UTC datetime, or None."""
+        with self._lock:
+            while True:
+                self._drop_stale_head()
+                cold_ts = self._cold_head()
+                if cold_ts is None or (self._heap and self._heap[0][0] <= cold_ts):
+                    break
+                self._promote_locked(cold_ts)
+            if not self._heap:
+                return None
+            return datetime.fromtimestamp(self._heap[0][0], timezone.utc)
+
+    def pop_due(self, until: datetime):
+        """Remove and return every live entry with fire_at <= `until`, earliest first."""
+        limit = until.timestamp()
+        due = []
+        with self._lock:
+            self._promote_locked(limit)
+            while True:
+                self._drop_stale_head()
+                if not self._heap or self._heap[0][0] > limit:
+                    break
+                ts, schedule_id, offset_seconds = heapq.heappop(self._heap)
+                self._discard_locked(schedule_id, offset_seconds)
+                due.append((schedule_id, offset_seconds, datetime.fromtimestamp(ts, timezone.utc)))
+        return due
+
+    def _drop_cold(self):
+        self._cold = None  # (fire_ts, schedule_ids, offsets) arrays sorted by fire_ts
+        self._cold_pos = 0
+        self._dead_ids = set()  # schedules re-queued or removed since the cold tail was loaded
+        self._dead_keys = set()  # (schedule_id, offset) pairs likewise
+
+    def _cold_head(self):
+        if self._cold is None:
+            return None
+        return float(self._cold[0][self._cold_pos])
+
+    def _promote_locked(self, limit):
+        """Move cold entries due at or before `limit` into the heap, skipping superseded ones."""
+        if self._cold is None:
+            return
+        ts, ids, offs = self._cold
+        end = int(ts.searchsorted(limit, side='right'))
+        for i in range(self._cold_pos, end):
+            schedule_id, offset_seconds = int(ids[i]), int(offs[i])
+            if schedule_id in self._dead_ids or (schedule_id, offset_seconds) in self._dead_keys:
+                continue
+            fire_ts = float(ts[i])
+            offsets = self._entries.setdefault(schedule_id, {})
+            if offset_seconds not in offsets:
+                self._live += 1
+            offsets[offset_seconds] = fire_ts
+            heapq.heappush(self._heap, (fire_ts, schedule_id, offset_seconds))
+        self._cold_pos = max(self._cold_pos, end)
+        if self._cold_pos >= len(ts):
+            self._drop_cold()
+
+    def _discard_locked(self, schedule_id, offset_seconds):
+        offsets = self._entries.get(schedule_id)
+        if offsets is not None and offset_seconds in offsets:
+            del offsets[offset_seconds]
+            self._live -= 1
+            if not offsets:
+                del self._entries[schedule_id]
+
+    def _is_live(self, item):
+        ts, schedule_id, offset_seconds = item
+        return self._entries.get(schedule_id, {}).get(offset_seconds) == ts
+
+    def _drop_stale_head(self):
+        while self._heap and not self._is_live(self._heap[0]):
+            heapq.heappop(self._heap)
+
+    def _maybe_compact(self):
+        # Lazy deletion leaves dead items behind; rebuild once they dominate the heap.
+        if len(self._heap) > 2 * self._live + 1024:
+            self._heap = [
+                (ts, schedule_id, offset_seconds)
+                for schedule_id, offsets in self._entries.items()
+                for offset_seconds, ts in offsets.items()
+            ]
+            heapq.heapify(self._heap)
@@ -0,0 +1,142 @@
+"""
+Compact jobstore for per-occurrence alarm jobs
+
+Every per-occurrence job has the same shape: `_fire_notification(schedule_id,
+seconds_before)` on a DateTrigger. Instead of pickling the whole Job like
+`SQLAlchemyJobStore`, `AlarmJobStore` keeps one typed row per job and rebuilds the Job
+object from the columns. Due-job lookup is a range scan on the `next_run_time` index with
+no deserialization.
+
+The table keeps the `id` / `next_run_time` columns of the pickled store, so scheduler
+helpers that read or delete jobs by those columns work with either store.
+"""
+
+from apscheduler.job import Job
+from apscheduler.jobstores.base import BaseJobStore, ConflictingIdError, JobLookupError
+from apscheduler.triggers.date import DateTrigger
+from apscheduler.util import datetime_to_utc_timestamp, utc_timestamp_to_datetime
+from sqlalchemy import Column, Float, Integer, MetaData, Table, Unicode, and_, create_engine, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.sql.expression import null
+
+FIRE_FUNC_REF = 'app.scheduler:_fire_notification'
+
+
+class AlarmJobStore(BaseJobStore):
+    """Typed-column store for `_fire_notification` DateTrigger jobs only."""
+
+    def __init__(self, url=None, engine=None, tablename='alarm_jobs', executor='default', engine_options=None):
+        super().__init__()
+        if engine is not None:
+            self.engine = engine
+        elif url:
+            self.engine = create_engine(url, **(engine_options or {}))
+        else:
+            raise ValueError('Need either "engine" or "url" defined')
+        self.executor = executor
+
+        self.jobs_t = Table(
+            tablename, MetaData(),
+            Column('id', Unicode(191), primary_key=True),
+            Column('schedule_id', Integer, nullable=False, index=True),
+            Column('offset_seconds', Integer, nullable=False),
+            Column('run_at', Float(25), nullable=False),  # DateTrigger instant, epoch seconds UTC
+            Column('next_run_time', Float(25), index=True),  # NULL while paused
+        )
+
+    def start(self, scheduler, alias):
+        super().start(scheduler, alias)
+        self.jobs_t.create(self.engine, checkfirst=True)
+
+    @staticmethod
+    def row(job_id, schedule_id, offset_seconds, run_at, next_run_time):
+        """Column values for one alarm job (`run_at` / `next_run_time` as aware datetimes)."""
+        return {
+            'id': job_id,
+            'schedule_id': int(schedule_id),
+            'offset_seconds': int(offset_seconds),
+            'run_at': datetime_to_utc_timestamp(run_at),
+            'next_run_time': datetime_to_utc_timestamp(next_run_time),
+        }
+
+    def _row_for_job(self, job):
+        if job.func_ref != FIRE_FUNC_REF or not isinstance(job.trigger, DateTrigger) or len(job.args) != 2:
+            raise ValueError(f'AlarmJobStore only holds {FIRE_FUNC_REF} DateTrigger jobs, not {job.id!r}')
+        return self.row(job.id, job.args[0], job.args[1], job.trigger.run_date, job.next_run_time)
+
+    def _reconstitute_job(self, row):
+        defaults = self._scheduler._job_defaults
+        job = Job.__new__(Job)
+        job.__setstate__({
+            'version': 1,
+            'id': row.id,
+            'func': FIRE_FUNC_REF,
+            'trigger': DateTrigger(run_date=utc_timestamp_to_datetime(row.run_at)),
+            'executor': self.executor,
+            'args': (row.schedule_id, row.offset_seconds),
+            'kwargs': {},
+            'name': '_fire_notification',
+            'misfire_grace_time': defaults['misfire_grace_time'],
+            'coalesce': defaults['coalesce'],
+            'max_instances': defaults['max_instances'],
+            'next_run_time': utc_timestamp_to_datetime(row.next_run_time),
+        })
+        job._scheduler = self._scheduler
+        job._jobstore_alias = self._alias
+        return job
+
+    def _get_jobs(self, *conditions):
+        query = select(self.jobs_t).order_by(self.jobs_t.c.next_run_time)
+        if conditions:
+            query = query.where(and_(*conditions))
+        with self.engine.begin() as connection:
+            return [self._reconstitute_job(row) for row in connection.execute(query)]
+
+    def lookup_job(self, job_id):
+        jobs = self._get_jobs(self.jobs_t.c.id == job_id)
+        return jobs[0] if jobs else None
+
+    def get_due_jobs(self, now):
+        return self._get_jobs(self.jobs_t.c.next_run_time <= datetime_to_utc_timestamp(now))
+
+    def get_next_run_time(self):
+        query = select(self.jobs_t.c.next_run_time).where(self.jobs_t.c.next_run_time != null()).\
+            order_by(self.jobs_t.c.next_run_time).limit(1)
+        with self.engine.begin() as connection:
+            return utc_timestamp_to_datetime(connection.execute(query).scalar())
+
+    def get_all_jobs(self):
+        jobs = self._get_jobs()
+        self._fix_paused_jobs_sorting(jobs)
+        return jobs
+
+    def add_job(self, job):
+        with self.engine.begin() as connection:
+            try:
+                connection.execute(self.jobs_t.insert().values(**self._row_for_job(job)))
+            except IntegrityError:
+                raise ConflictingIdError(job.id)
+
+    def update_job(self, job):
+        values = self._row_for_job(job)
+        del values['id']
+        with self.engine.begin() as connection:
+            result = connection.execute(self.jobs_t.update().values(**values).where(self.jobs_t.c.id == job.id))
+            if result.rowcount == 0:
+                raise JobLookupError(job.id)
+
+    def remove_job(self, job_id):
+        with self.engine.begin() as connection:
+            result = connection.execute(self.jobs_t.delete().where(self.jobs_t.c.id == job_id))
+            if result.rowcount == 0:
+                raise JobLookupError(job_id)
+
+    def remove_all_jobs(self):
+        with self.engine.begin() as connection:
+            connection.execute(self.jobs_t.delete())
+
+    def shutdown(self):
+        self.engine.dispose()
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__} (url={self.engine.url})>'
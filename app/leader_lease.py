@@ -0,0 +1,149 @@
+"""
+Database-backed leader lease for the notification scheduler
+
+Every process that calls `start_scheduler` competes for one row in `scheduler_leases`.
+The holder renews it every renew interval; a lease whose `expires_at` has passed can be
+taken over by anyone. Acquisition is a single conditional UPDATE (or an INSERT for the
+first lease), so it works the same on SQLite and Postgres.
+"""
+
+from datetime import datetime, timedelta
+import traceback
+
+from app.polling import PollingThread
+
+
+class LeaderLease(PollingThread):
+    """Background heartbeat that keeps (or waits for) leadership of a named lease."""
+
+    def __init__(self, name: str):
+        super().__init__()
+        self.name = name
+        self.thread_name = f'lease-{name}'
+        self.is_leader = False
+        self._expires_at = None
+        self._on_acquired = None
+        self._on_lost = None
+
+    @property
+    def holder(self):
+        """Identity this process holds (or competes for) the lease under."""
+        return self.worker
+
+    def start(self, app, on_acquired, on_lost):
+        """Start the heartbeat thread; callbacks run on it when leadership changes."""
+        self._on_acquired = on_acquired
+        self._on_lost = on_lost
+        super().start(app)
+
+    def stop(self):
+        """Stop heartbeating and give the lease up so another process can take over at once."""
+        super().stop()
+        if self.is_leader:
+            try:
+                self.release()
+            except Exception:
+                traceback.print_exc()
+
+    def _poll(self):
+        from app import db
+
+        try:
+            held = self.try_acquire()
+        except Exception:
+            traceback.print_exc()
+            db.session.rollback()
+            # Cannot reach the DB: keep leading only until our lease would have expired
+            held = self.is_leader and datetime.utcnow() < self._expires_at
+
+        if held and not self.is_leader:
+            self.is_leader = True
+            print(f"✓ Scheduler leadership acquired by {self.holder}")
+            self._notify(self._on_acquired)
+        elif not held and self.is_leader:
+            self.is_leader = False
+            print(f"⚠️ Scheduler leadership lost by {self.holder}")
+            self._notify(self._on_lost)
+
+    def _delay(self, result):
+        return self._app.config.get('SCHEDULER_LEASE_RENEW_INTERVAL', 10)
+
+    def _notify(self, callback):
+        try:
+            if callback:
+                callback()
+        except Exception:
+            traceback.print_exc()
+
+    def try_acquire(self):
+        """Renew our lease or take over an expired one. Returns True if we hold it afterwards."""
+        from app import db
+        from app.models import SchedulerLease
+
+        now = datetime.utcnow()
+        expires_at = now + timedelta(seconds=self._app.config.get('SCHEDULER_LEASE_TTL', 30))
+
+        updated = SchedulerLease.query.filter(
+            SchedulerLease.name == self.name,
+            db.or_(SchedulerLease.holder == self.holder, SchedulerLease.expires_at < now)
+        ).update({
+            SchedulerLease.acquired_at: db.case(
+                (SchedulerLease.holder == self.holder, SchedulerLease.acquired_at), else_=now
+            ),
+            SchedulerLease.holder: self.holder,
+            SchedulerLease.renewed_at: now,
+            SchedulerLease.expires_at: expires_at,
+        }, synchronize_session=False)
+        db.session.commit()
+        if updated:
+            self._expires_at = expires_at
+            return True
+
+        if db.session.get(SchedulerLease, self.name) is not None:
+            return False
+
+        # First process ever: create the lease row (a concurrent insert loses on the primary key)
+        try:
+            db.session.add(SchedulerLease(
+                name=self.name, holder=self.holder, acquired_at=now, renewed_at=now, expires_at=expires_at
+            ))
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            return False
+        self._expires_at = expires_at
+        return True
+
+    def release(self):
+        """Expire our lease immediately so a passive process can take over."""
+        from app import db
+        from app.models import SchedulerLease
+
+        with self._app.app_context():
+            SchedulerLease.query.filter_by(name=self.name, holder=self.holder).update(
+                {SchedulerLease.expires_at: datetime.utcnow()}, synchronize_session=False
+            )
+            db.session.commit()
+        self.is_leader = False
+
+    def status(self):
+        """Current lease row as a dict, with ages in seconds (call inside an app context)."""
+        from app.models import SchedulerLease
+
+        lease = SchedulerLease.query.get(self.name)
+        if lease is None:
+            return {'name': self.name, 'holder': None, 'this_process': self.holder, 'is_leader': False}
+
+        now = datetime.utcnow()
+        return {
+            'name': lease.name,
+            'holder': lease.holder,
+            'this_process': self.holder,
+            'is_leader': lease.holder == self.holder and lease.expires_at > now,
+            'active': lease.expires_at > now,
+            'acquired_at': lease.acquired_at.isoformat(),
+            'renewed_at': lease.renewed_at.isoformat(),
+            'expires_at': lease.expires_at.isoformat(),
+            'lease_age_seconds': round((now - lease.acquired_at).total_seconds(), 1),
+            'heartbeat_age_seconds': round((now - lease.renewed_at).total_seconds(), 1),
+        }
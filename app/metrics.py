@@ -0,0 +1,150 @@
+"""
+In-process scheduler metrics rendered in the Prometheus text exposition format
+
+Counters and histograms are plain Python numbers behind one lock, so recording on the
+tick's hot path is a dict lookup and an addition. Values that are cheap to read but
+not worth tracking continuously (jobstore size, queue depth) are collected at scrape
+time by `render()`.
+
+The registry is per process. Series marked `leader=True` are produced by the scheduler
+engine, which runs only in the process holding the lease; that process persists them
+every SCHEDULER_REPORT_INTERVAL seconds (`scheduler.write_report`) and every other
+process serves the persisted copy in their place.
+"""
+
+from bisect import bisect_left
+import threading
+
+_lock = threading.Lock()
+_metrics = []
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values)) + ([extra] if extra else [])
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{value}"' for name, value in pairs) + '}'
+
+
+class Counter:
+    def __init__(self, name, help_text, labels=(), leader=False):
+        self.name, self.help, self.labels = name, help_text, tuple(labels)
+        self.leader = leader
+        self._values = {}
+        _metrics.append(self)
+
+    def inc(self, amount=1, *label_values):
+        with _lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def samples(self):
+        with _lock:
+            return [(self.name + _format_labels(self.labels, key), value) for key, value in self._values.items()]
+
+    type = 'counter'
+
+
+class Gauge(Counter):
+    type = 'gauge'
+
+    def set(self, value, *label_values):
+        with _lock:
+            self._values[label_values] = value
+
+
+class Histogram:
+    type = 'histogram'
+
+    def __init__(self, name, help_text, buckets, labels=(), leader=False):
+        self.name, self.help, self.labels = name, help_text, tuple(labels)
+        self.leader = leader
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # label values -> [bucket counts..., +Inf count, sum]
+        _metrics.append(self)
+
+    def observe(self, value, *label_values):
+        index = bisect_left(self.buckets, value)
+        with _lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    def samples(self):
+        with _lock:
+            snapshot = {key: list(series) for key, series in self._series.items()}
+        samples = []
+        for key, series in snapshot.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), series):
+                cumulative += count
+                le = ('le', bound if bound == '+Inf' else f'{bound:g}')
+                samples.append((f'{self.name}_bucket' + _format_labels(self.labels, key, le), cumulative))
+            samples.append((f'{self.name}_sum' + _format_labels(self.labels, key), series[-1]))
+            samples.append((f'{self.name}_count' + _format_labels(self.labels, key), cumulative))
+        return samples
+
+
+tick_seconds = Histogram(
+    'classalert_scheduler_tick_seconds', 'Duration of the interval notification check',
+    (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5), leader=True,
+)
+schedules_evaluated = Counter(
+    'classalert_scheduler_schedules_evaluated_total', 'Due (schedule, offset) entries evaluated by the scheduler',
+    leader=True,
+)
+notifications_created = Counter(
+    'classalert_notifications_created_total', 'Alarm notifications persisted', ('source',), leader=True,
+)
+emit_failures = Counter(
+    'classalert_notification_emit_failures_total', 'Socket.IO emits that raised',
+)
+socket_emits = Counter(
+    'classalert_notification_socket_emits_total', 'Socket.IO notification events emitted, by event', ('event',),
+)
+fire_lateness = Histogram(
+    'classalert_alarm_fire_lateness_seconds', 'Actual minus intended alarm fire time, per alarm offset',
+    (-5, -1, 0, 1, 2, 5, 10, 30, 60, 300), ('offset_seconds',), leader=True,
+)
+jobstore_jobs = Gauge(
+    'classalert_scheduler_jobstore_jobs', 'Jobs persisted per APScheduler jobstore', ('jobstore',), leader=True,
+)
+fire_queue_entries = Gauge(
+    'classalert_scheduler_fire_queue_entries', 'Entries in the in-memory fire queue', leader=True,
+)
+job_events = Gauge(
+    'classalert_scheduler_job_events', 'APScheduler job event counters since start', ('event',), leader=True,
+)
+report_age = Gauge(
+    'classalert_scheduler_report_age_seconds',
+    'Age of the leader report the scheduler series come from (0 in the leader itself)',
+)
+alarm_queue_claimed = Counter('classalert_alarm_queue_claimed_total', 'Due-alarm queue rows claimed by this process')
+alarm_queue_depth = Gauge('classalert_alarm_queue_depth', 'Due-alarm queue rows waiting or in flight')
+outbox_rows = Counter(
+    'classalert_notification_outbox_rows_total', 'Outbox rows drained by this process, by outcome', ('outcome',),
+)
+outbox_latency = Histogram(
+    'classalert_notification_outbox_latency_seconds', 'Outbox row commit to Socket.IO emit',
+    (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 30),
+)
+outbox_depth = Gauge('classalert_notification_outbox_depth', 'Outbox rows waiting for a web process to emit them')
+
+
+def render(collect=None, leader=None):
+    """Return metrics in Prometheus text format, calling `collect()` first to refresh gauges.
+
+    `leader=True` renders only the scheduler engine's series, `leader=False` only the others.
+    """
+    if collect is not None:
+        collect()
+    lines = []
+    for metric in _metrics:
+        if leader is not None and metric.leader != leader:
+            continue
+        lines.append(f'# HELP {metric.name} {metric.help}')
+        lines.append(f'# TYPE {metric.name} {metric.type}')
+        for sample, value in metric.samples():
+            lines.append(f'{sample} {value:g}' if isinstance(value, float) else f'{sample} {value}')
+    return '\n'.join(lines) + '\n'
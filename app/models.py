@@ -22,6 +22,12 @@ class User(UserMixin, db.Model):
     # Google OAuth fields
     google_id = db.Column(db.String(100), unique=True, nullable=True)
     profile_pic = db.Column(db.String(255), nullable=True)
+
+    # IANA time zone name (e.g. "Asia/Manila"); None uses DEFAULT_TIMEZONE / the server zone
+    timezone = db.Column(db.String(64), nullable=True)
+
+    # Denormalized count of unread notifications for the navbar badge (app/unread.py)
+    unread_notifications = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -48,6 +54,12 @@ class User(UserMixin, db.Model):
 class Schedule(db.Model):
     """Schedule model for class timings"""
     __tablename__ = 'schedules'
+    __table_args__ = (
+        # The scheduler's working set: enabled, unarchived schedules
+        db.Index('ix_schedules_alarm_active', 'alarm_enabled', 'archived_at'),
+        # Term rollover archives by (semester, academic_year)
+        db.Index('ix_schedules_term', 'semester', 'academic_year'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
@@ -64,16 +76,49 @@ class Schedule(db.Model):
     alarm_offset_minutes = db.Column(db.Integer, default=30)  # minutes before class
     custom_alarm_time = db.Column(db.String(20), nullable=True)  # e.g., "08:30 AM"
     
+    # Set while the schedule's academic term is not in session (ended or not started); archived schedules never fire
+    archived_at = db.Column(db.DateTime, nullable=True)
+    
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Indexed: the scheduler polls for rows changed since its last sync
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
 
     def __repr__(self):
         return f'<Schedule {self.subject} - {self.time}>'
 
 
+class AcademicTerm(db.Model):
+    """Date range of a semester, matched to schedules by (semester, academic_year)"""
+    __tablename__ = 'academic_terms'
+    __table_args__ = (
+        db.UniqueConstraint('semester', 'academic_year', name='uq_academic_term'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    semester = db.Column(db.String(50), nullable=False)  # e.g., "1st Semester"
+    academic_year = db.Column(db.String(50), nullable=False)  # e.g., "AY 2024-2025"
+
+    starts_on = db.Column(db.Date, nullable=False)
+    ends_on = db.Column(db.Date, nullable=False, index=True)
+
+    def __repr__(self):
+        return f'<AcademicTerm {self.semester} {self.academic_year} {self.starts_on}..{self.ends_on}>'
+
+
 class Notification(db.Model):
     """Notification model for alerts"""
     __tablename__ = 'notifications'
+    __table_args__ = (
+        # Retention purges walk each type oldest first (app/retention.py)
+        db.Index('ix_notifications_type_timestamp', 'notification_type', 'timestamp'),
+        # Keyset pagination of a user's notifications, newest first (app/notifications/routes.py)
+        db.Index('ix_notifications_user_timestamp_id', 'user_id', 'timestamp', 'id'),
+        # Unread rows only: mark-all-read and unread recounts never touch read history. Queries
+        # must filter with the same `is_read == false()` so the planner can match the predicate.
+        db.Index('ix_notifications_unread_user_id', 'user_id',
+                 postgresql_where=db.column('is_read', db.Boolean) == db.false(),
+                 sqlite_where=db.column('is_read', db.Boolean) == db.false()),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
@@ -88,6 +133,137 @@ class Notification(db.Model):
         return f'<Notification {self.id} - {self.message[:30]}>'
 
 
+class NotificationArchive(db.Model):
+    """Cold copy of notifications removed by the retention engine"""
+    __tablename__ = 'notifications_archive'
+
+    id = db.Column(db.Integer, primary_key=True)
+    # id of the original notification; not unique, since SQLite reuses the ids of deleted rows
+    original_id = db.Column(db.Integer)
+    user_id = db.Column(db.Integer, nullable=False, index=True)
+
+    message = db.Column(db.Text, nullable=False)
+    is_read = db.Column(db.Boolean, default=False)
+    notification_type = db.Column(db.String(50))
+
+    timestamp = db.Column(db.DateTime, index=True)
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<NotificationArchive {self.id} - {self.message[:30]}>'
+
+
+class FireLedger(db.Model):
+    """Claimed alarm fires; the unique key makes delivery exactly-once across jobs and scans"""
+    __tablename__ = 'fire_ledger'
+    __table_args__ = (
+        db.UniqueConstraint('schedule_id', 'offset_seconds', 'occurrence_date', name='uq_fire_ledger_occurrence'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    schedule_id = db.Column(db.Integer, db.ForeignKey('schedules.id', ondelete='CASCADE'), nullable=False)
+    offset_seconds = db.Column(db.Integer, nullable=False)  # seconds before class start
+    occurrence_date = db.Column(db.Date, nullable=False)  # local date of the class start
+
+    fired_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+    def __repr__(self):
+        return f'<FireLedger {self.schedule_id}/{self.offset_seconds} {self.occurrence_date}>'
+
+
+class DueAlarm(db.Model):
+    """Alarm waiting for delivery by one of the scheduler workers (see app/alarm_queue.py)"""
+    __tablename__ = 'due_alarms'
+    __table_args__ = (
+        db.UniqueConstraint('schedule_id', 'offset_seconds', 'occurrence_date', name='uq_due_alarm_occurrence'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    schedule_id = db.Column(db.Integer, nullable=False)
+    offset_seconds = db.Column(db.Integer, nullable=False)  # seconds before class start
+    occurrence_date = db.Column(db.Date, nullable=False)  # local date of the class start
+    fire_at = db.Column(db.DateTime, nullable=False, index=True)  # intended fire instant (UTC)
+
+    # Visibility timeout: while in the future, the row belongs to `claimed_by`
+    claimed_until = db.Column(db.DateTime, nullable=True)
+    claimed_by = db.Column(db.String(128), nullable=True)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<DueAlarm {self.schedule_id}/{self.offset_seconds} {self.occurrence_date}>'
+
+
+class NotificationOutbox(db.Model):
+    """Socket.IO event committed with its notification, emitted later by the web process (app/outbox.py)"""
+    __tablename__ = 'notification_outbox'
+
+    id = db.Column(db.Integer, primary_key=True)  # drain order
+    user_id = db.Column(db.Integer, nullable=False)
+    event = db.Column(db.String(50), nullable=False, default='new_notification')
+    payload = db.Column(db.JSON, nullable=False)
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)  # delivery latency starts here
+    # While in the future, the row is being emitted by the drainer `claimed_by`
+    claimed_until = db.Column(db.DateTime, nullable=True)
+    claimed_by = db.Column(db.String(128), nullable=True)
+
+    def __repr__(self):
+        return f'<NotificationOutbox {self.id} {self.event} -> user {self.user_id}>'
+
+
+class AlarmSlot(db.Model):
+    """Weekly fire minute of one (schedule, offset) pair, used by the minute-bucket job mode"""
+    __tablename__ = 'alarm_slots'
+
+    id = db.Column(db.Integer, primary_key=True)
+    schedule_id = db.Column(db.Integer, db.ForeignKey('schedules.id', ondelete='CASCADE'), nullable=False, index=True)
+    offset_seconds = db.Column(db.Integer, nullable=False)  # seconds before class start
+    minute_of_week = db.Column(db.Integer, nullable=False, index=True)  # UTC, Monday 00:00 = 0
+
+    def __repr__(self):
+        return f'<AlarmSlot {self.schedule_id}/{self.offset_seconds} @{self.minute_of_week}>'
+
+
+class SchedulerLease(db.Model):
+    """Heartbeat row naming the process that currently runs the notification scheduler"""
+    __tablename__ = 'scheduler_leases'
+
+    name = db.Column(db.String(50), primary_key=True)
+    holder = db.Column(db.String(200), nullable=False)  # "host:pid:nonce" of the leader
+
+    acquired_at = db.Column(db.DateTime, nullable=False)
+    renewed_at = db.Column(db.DateTime, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False)
+
+    def __repr__(self):
+        return f'<SchedulerLease {self.name} held by {self.holder}>'
+
+
+class SchedulerCheckpoint(db.Model):
+    """Last instant the notification scheduler was known to be ticking (bounds missed-alarm recovery)"""
+    __tablename__ = 'scheduler_checkpoints'
+
+    name = db.Column(db.String(50), primary_key=True)
+    checkpoint_at = db.Column(db.DateTime, nullable=False)  # UTC
+
+    def __repr__(self):
+        return f'<SchedulerCheckpoint {self.name} @ {self.checkpoint_at}>'
+
+
+class SchedulerReport(db.Model):
+    """Stats and metrics the lease holder last persisted, served by processes not running the scheduler"""
+    __tablename__ = 'scheduler_reports'
+
+    name = db.Column(db.String(50), primary_key=True)
+    holder = db.Column(db.String(200), nullable=False)  # process that wrote the report
+    reported_at = db.Column(db.DateTime, nullable=False)  # UTC
+    stats = db.Column(db.JSON, nullable=False)  # get_scheduler_stats() of the leader
+    metrics = db.Column(db.Text, nullable=False)  # leader series in Prometheus text format
+
+    def __repr__(self):
+        return f'<SchedulerReport {self.name} by {self.holder} @ {self.reported_at}>'
+
+
 class UploadedFile(db.Model):
     """Model for tracking uploaded COR files"""
     __tablename__ = 'uploaded_files'
@@ -1,39 +1,25 @@
-from flask import render_template, redirect, url_for, request, flash, jsonify
+from flask import render_template, redirect, url_for, request, flash, jsonify, current_app
 from flask_login import login_required, current_user
 from datetime import datetime, timedelta
 from app.notifications import bp
-from app import db, socketio
-from app.models import Notification, Schedule
-
-
-def _parse_start_time(time_str: str):
-    """Return datetime.time parsed from a range string like "01:00 PM - 02:30 PM"."""
-    if not time_str:
-        return None
-    start_part = time_str.split('-')[0].strip()
-    for fmt in ("%I:%M %p", "%I:%M%p"):
-        try:
-            return datetime.strptime(start_part, fmt).time()
-        except ValueError:
-            continue
-    return None
-
-
-def _should_notify_today(schedule: Schedule, now: datetime):
-    day_map = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
-    today_abbr = day_map[now.weekday()]
-    days_field = (schedule.days or '').lower()
-    return today_abbr.lower() in days_field
+from app import db, socketio, unread
+from app.models import Notification, Schedule, User
+from app.realtime import emit_to_user
+from app.utils.compiled_schedule import compile_schedule
+from app.utils.timezones import get_zone
 
 
 def _create_upcoming_notifications_for_user(user_id: int):
-    now = datetime.now()
-    schedules = Schedule.query.filter_by(user_id=user_id, alarm_enabled=True).all()
+    user = db.session.get(User, user_id)
+    # Wall-clock now in the student's zone, since class times are entered in it
+    now = datetime.now(get_zone(user.timezone if user else None)).replace(tzinfo=None)
+    schedules = Schedule.query.filter_by(user_id=user_id, alarm_enabled=True, archived_at=None).all()
     for sched in schedules:
-        if not _should_notify_today(sched, now):
+        compiled = compile_schedule(sched)
+        if not compiled.runs_on(now.weekday()):
             continue
 
-        start_time = _parse_start_time(sched.time or '')
+        start_time = compiled.start_time
         if not start_time:
             continue
 
@@ -57,34 +43,115 @@ def _create_upcoming_notifications_for_user(user_id: int):
                 notification_type='info'
             )
             db.session.add(notification)
+            unread.inserted([user_id])
             db.session.commit()
 
-            socketio.emit('new_notification', {
+            emit_to_user(socketio, user_id, 'new_notification', {
                 'user_id': user_id,
                 'message': message
             })
 
 
+def _encode_cursor(note):
+    """Opaque keyset cursor '<timestamp ISO>_<id>' for the page after `note`"""
+    return f"{note.timestamp.isoformat()}_{note.id}"
+
+
+def _decode_cursor(cursor):
+    """(timestamp, id) from a cursor, or None if it is malformed"""
+    try:
+        stamp, _, note_id = cursor.rpartition('_')
+        return datetime.fromisoformat(stamp), int(note_id)
+    except (AttributeError, ValueError):
+        return None
+
+
+def _notification_page(user_id, cursor=None, limit=50):
+    """One page of a user's notifications, newest first, strictly older than `cursor` (timestamp, id).
+
+    Seeks through ix_notifications_user_timestamp_id, so every page costs the same however
+    deep it is. Returns (notifications, next_cursor), next_cursor None on the last page.
+    """
+    query = Notification.query.filter(Notification.user_id == user_id)
+    if cursor is not None:
+        query = query.filter(db.tuple_(Notification.timestamp, Notification.id) < cursor)
+    rows = query.order_by(Notification.timestamp.desc(), Notification.id.desc()).limit(limit + 1).all()
+    next_cursor = _encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+    return rows[:limit], next_cursor
+
+
+def _page_size():
+    default = current_app.config.get('NOTIFICATIONS_PAGE_SIZE', 50)
+    limit = request.args.get('limit', default, type=int)
+    return max(1, min(limit, current_app.config.get('NOTIFICATIONS_MAX_PAGE_SIZE', 200)))
+
+
+def _serialize(note):
+    return {
+        'id': note.id,
+        'message': note.message,
+        'type': note.notification_type,
+        'is_read': bool(note.is_read),
+        'timestamp': note.timestamp.isoformat() if note.timestamp else None,
+    }
+
+
 @bp.route('/')
 @login_required
 def view_notifications():
-    """Display user notifications"""
+    """Display user notifications, one keyset page at a time"""
     # Notifications are now created by the background scheduler
     # No need to create them on page view
     
-    # Get all notifications for current user
-    notifications = Notification.query.filter_by(user_id=current_user.id).order_by(
-        Notification.timestamp.desc()
-    ).all()
+    # A malformed cursor shows the newest page
+    cursor = _decode_cursor(request.args.get('cursor'))
+    notifications, next_cursor = _notification_page(
+        current_user.id, cursor, current_app.config.get('NOTIFICATIONS_PAGE_SIZE', 50)
+    )
     
-    # Mark all as read
-    for notification in notifications:
-        if not notification.is_read:
-            notification.is_read = True
+    # Mark read up to the newest row shown, in one UPDATE; later arrivals stay unread
+    if notifications:
+        newest_id = max(note.id for note in notifications)
+        unread.mark_read(db.and_(Notification.user_id == current_user.id, Notification.id <= newest_id))
+        db.session.commit()
     
-    db.session.commit()
+    return render_template('dashboard/notifications.html', notifications=notifications,
+                           next_cursor=next_cursor, first_page=cursor is None)
+
+
+@bp.route('/api')
+@login_required
+def list_notifications_api():
+    """Notifications as JSON, newest first: ?cursor=<next_cursor>&limit=<n>"""
+    raw_cursor = request.args.get('cursor')
+    cursor = _decode_cursor(raw_cursor) if raw_cursor else None
+    if raw_cursor and cursor is None:
+        return jsonify({'error': 'invalid cursor'}), 400
+    
+    notifications, next_cursor = _notification_page(current_user.id, cursor, _page_size())
+    return jsonify({
+        'notifications': [_serialize(note) for note in notifications],
+        'next_cursor': next_cursor,
+        'unread': _unread_count(),
+    })
+
+
+@bp.route('/api/mark-read', methods=['POST'])
+@login_required
+def mark_read_api():
+    """Mark every notification with id <= `up_to` (default: all of them) read in one UPDATE"""
+    payload = request.get_json(silent=True) or {}
+    up_to = payload.get('up_to', request.form.get('up_to'))
+    condition = Notification.user_id == current_user.id
+    if up_to is not None:
+        try:
+            condition = db.and_(condition, Notification.id <= int(up_to))
+        except (TypeError, ValueError):
+            return jsonify({'error': 'up_to must be a notification id'}), 400
     
-    return render_template('dashboard/notifications.html', notifications=notifications)
+    marked = unread.mark_read(condition)
+    db.session.commit()
+    return jsonify({'success': True, 'marked': marked, 'unread': _unread_count()})
 
 
 @bp.route('/create', methods=['POST'])
@@ -100,10 +167,11 @@ def create_notification():
     )
     
     db.session.add(notification)
+    unread.inserted([current_user.id])
     db.session.commit()
     
     # Emit socket event
-    socketio.emit('new_notification', {
+    emit_to_user(socketio, current_user.id, 'new_notification', {
         'user_id': current_user.id,
         'message': message
     })
@@ -121,10 +189,24 @@ def mark_read(notification_id):
         user_id=current_user.id
     ).first_or_404()
     
-    notification.is_read = True
+    unread.mark_read(Notification.id == notification.id)
     db.session.commit()
     
-    return jsonify({'success': True})
+    return jsonify({'success': True, 'unread': _unread_count()})
+
+
+@bp.route('/unread-count')
+@login_required
+def unread_count():
+    """Unread notifications of the current user, for the navbar badge"""
+    return jsonify({'unread': _unread_count()})
+
+
+def _unread_count():
+    # Read back from the user row: another request or the scheduler may have changed it
+    return db.session.execute(
+        db.select(User.unread_notifications).where(User.id == current_user.id)
+    ).scalar() or 0
 
 
 @bp.route('/delete/<int:notification_id>', methods=['POST'])
@@ -136,7 +218,7 @@ def delete_notification(notification_id):
         user_id=current_user.id
     ).first_or_404()
     
-    db.session.delete(notification)
+    unread.delete_notifications(Notification.id == notification.id)
     db.session.commit()
     
     flash('Notification deleted.', 'success')
@@ -149,11 +231,11 @@ def clear_all_notifications():
     """Delete all notifications except upcoming class notifications"""
     # Only delete notifications that are NOT about upcoming classes
     # Keep notifications that contain alarm emojis (🔔 or ⏰)
-    Notification.query.filter(
+    unread.delete_notifications(db.and_(
         Notification.user_id == current_user.id,
         ~Notification.message.contains('🔔'),
         ~Notification.message.contains('⏰')
-    ).delete(synchronize_session=False)
+    ))
     db.session.commit()
     
     flash('Old notifications cleared. Upcoming class alerts preserved.', 'success')
@@ -0,0 +1,198 @@
+"""
+Transactional outbox for Socket.IO events raised outside the web process
+
+`scheduler_worker.py` runs the scheduler without a Socket.IO server, so it cannot emit
+`new_notification` itself. Instead `add()` inserts one `notification_outbox` row per event
+in the same transaction as the notifications (both commit or neither does), and the web
+process's `OutboxDrainer` claims the oldest rows, emits each to its user's room and
+deletes them. Rows are claimed with `claims.claim_rows`, like the due-alarm queue, so
+several drainers never emit the same row. Claimed rows stay hidden for
+NOTIFICATION_OUTBOX_VISIBILITY_TIMEOUT seconds: a drainer that dies between the emit and
+the delete leaves them to be re-emitted, never lost.
+
+The drainer polls, backing off from NOTIFICATION_OUTBOX_POLL_MIN to _POLL_MAX while the
+outbox stays empty. On Postgres `add()` also sends a NOTIFY that the drainer LISTENs for,
+so a commit wakes it immediately. Rows older than NOTIFICATION_OUTBOX_MAX_AGE are dropped
+unsent: the notification itself is stored and shows on the next page load.
+
+The drainer starts with the first authenticated socket (app/realtime.py), so processes
+without browser clients never consume events. With several web processes, give Socket.IO
+a message queue so the process that drains a row reaches sockets connected to the others.
+"""
+
+from datetime import datetime
+import select
+import traceback
+
+from app import claims, metrics
+from app.polling import PollingThread
+
+CHANNEL = 'notification_outbox'
+
+# Report of the most recent non-empty batch this process drained
+last_drain = {}
+
+
+def add(events):
+    """Queue (user_id, event, payload) socket events in the current transaction (does not commit)."""
+    from app import db
+    from app.models import NotificationOutbox
+
+    if not events:
+        return
+    db.session.execute(db.insert(NotificationOutbox), [
+        {'user_id': user_id, 'event': event, 'payload': payload} for user_id, event, payload in events
+    ])
+    if db.session.get_bind().dialect.name == 'postgresql':
+        # Delivered to listeners when the transaction commits
+        db.session.execute(db.text(f"NOTIFY {CHANNEL}"))
+
+
+def depth():
+    """Rows waiting for the web process (call inside an app context)."""
+    from app import db
+    from app.models import NotificationOutbox
+
+    return db.session.query(db.func.count(NotificationOutbox.id)).scalar()
+
+
+def claim(worker: str, batch_size: int, visibility_timeout: int):
+    """Claim up to `batch_size` unclaimed or expired rows, oldest first, and commit. Returns them in id order."""
+    from app.models import NotificationOutbox
+
+    columns = (NotificationOutbox.id, NotificationOutbox.user_id, NotificationOutbox.event,
+               NotificationOutbox.payload, NotificationOutbox.created_at)
+    rows = claims.claim_rows(NotificationOutbox, columns, NotificationOutbox.id, worker, batch_size,
+                             visibility_timeout, datetime.utcnow())
+    return sorted(rows, key=lambda row: row.id)
+
+
+def drain_batch(sio, worker: str, batch_size: int, max_age: int, visibility_timeout: int = 30):
+    """Claim, emit and delete the oldest `batch_size` rows. Returns the number of rows taken."""
+    from app import db
+    from app.models import NotificationOutbox
+    from app.realtime import emit_buffer
+
+    rows = claim(worker, batch_size, visibility_timeout)
+    if not rows:
+        return 0
+
+    now = datetime.utcnow()
+    oldest = (now - rows[0].created_at).total_seconds()
+    events, expired = [], 0
+    for row in rows:
+        age = (now - row.created_at).total_seconds()
+        if age > max_age:
+            expired += 1
+            continue
+        events.append((row.user_id, row.event, row.payload))
+        metrics.outbox_latency.observe(max(age, 0.0))
+    # Rows committed by separate worker transactions still reach each user as one event
+    emit_buffer.send(sio, events)
+    emitted = len(events)
+
+    # Rows re-claimed after our visibility timeout ran out are left to their new owner
+    db.session.execute(db.delete(NotificationOutbox).where(
+        NotificationOutbox.id.in_([row.id for row in rows]), NotificationOutbox.claimed_by == worker
+    ))
+    db.session.commit()
+    metrics.outbox_rows.inc(emitted, 'emitted')
+    if expired:
+        metrics.outbox_rows.inc(expired, 'expired')
+
+    last_drain.clear()
+    last_drain.update({'at': datetime.utcnow().isoformat(), 'taken': len(rows), 'emitted': emitted,
+                       'expired': expired, 'oldest_age_seconds': round(oldest, 3)})
+    return len(rows)
+
+
+class OutboxDrainer(PollingThread):
+    """Background thread of the web process that emits outbox rows in batches."""
+
+    thread_name = 'notification-outbox'
+
+    def __init__(self):
+        super().__init__()
+        self._socketio = None
+        self._listener = None
+        self._backoff = None
+
+    def start(self, app, sio):
+        if self.running:
+            return
+        self._socketio = sio
+        if super().start(app):
+            print(f"✓ Notification outbox drainer started as {self.worker}")
+
+    def _listen(self):
+        """Raw Postgres connection LISTENing on the outbox channel, or None to poll only."""
+        from app import db
+
+        if db.engine.dialect.name != 'postgresql':
+            return None
+        try:
+            connection = db.engine.raw_connection()
+            driver = connection.driver_connection
+            if not hasattr(driver, 'poll'):  # psycopg2 only
+                connection.close()
+                return None
+            driver.autocommit = True
+            with driver.cursor() as cursor:
+                cursor.execute(f"LISTEN {CHANNEL}")
+            return connection
+        except Exception:
+            traceback.print_exc()
+            return None
+
+    def _wait(self, listener, timeout):
+        """Sleep up to `timeout`, waking early on NOTIFY. Returns the listener, or None once it has failed."""
+        if listener is None:
+            self._stop.wait(timeout)
+            return None
+        try:
+            driver = listener.driver_connection
+            if select.select([driver], [], [], timeout)[0]:
+                driver.poll()
+                driver.notifies.clear()
+            return listener
+        except Exception:
+            traceback.print_exc()
+            print("⚠️ Outbox LISTEN connection failed; falling back to polling")
+            listener.invalidate()
+            return None
+
+    def _run(self):
+        self._backoff = self._app.config.get('NOTIFICATION_OUTBOX_POLL_MIN', 0.05)
+        with self._app.app_context():
+            self._listener = self._listen()
+        try:
+            super()._run()
+        finally:
+            if self._listener is not None:
+                self._listener.close()
+                self._listener = None
+
+    def _poll(self):
+        config = self._app.config
+        return drain_batch(self._socketio, self.worker, config.get('NOTIFICATION_OUTBOX_BATCH_SIZE', 500),
+                           config.get('NOTIFICATION_OUTBOX_MAX_AGE', 300),
+                           config.get('NOTIFICATION_OUTBOX_VISIBILITY_TIMEOUT', 30))
+
+    def _delay(self, taken):
+        config = self._app.config
+        poll_min = config.get('NOTIFICATION_OUTBOX_POLL_MIN', 0.05)
+        # A full batch means more is probably waiting: go again without sleeping
+        if (taken or 0) >= config.get('NOTIFICATION_OUTBOX_BATCH_SIZE', 500):
+            return 0
+        if taken:
+            self._backoff = poll_min
+            return poll_min
+        delay = self._backoff
+        self._backoff = min(delay * 2, config.get('NOTIFICATION_OUTBOX_POLL_MAX', 1))
+        return delay
+
+    def _sleep(self, seconds):
+        self._listener = self._wait(self._listener, seconds)
+
+
+drainer = OutboxDrainer()
@@ -0,0 +1,115 @@
+"""
+On-disk snapshot of the scheduler's computed alarm plan (the fire queue)
+
+The leader periodically writes every queued (schedule_id, offset_seconds, fire_ts) entry,
+sorted by fire time, as a NumPy structured array (`.npy`), plus a small JSON manifest
+holding the schedule `updated_at` watermark the plan was computed up to. On the next
+start the array is memory-mapped straight into the fire queue's cold tail
+(`FireQueue.load_sorted`), and only schedules changed since the watermark, or whose
+queued fire passed while the process was down, are recomputed from the database.
+
+The manifest is replaced atomically after its data file is written, so a reader never
+sees a half-written plan.
+"""
+
+from datetime import datetime
+import json
+import os
+import time
+import traceback
+
+try:
+    import numpy as np
+except ImportError:  # optional: without NumPy every start recomputes the plan
+    np = None
+
+FORMAT_VERSION = 1
+PLAN_DTYPE = [('fire_ts', '<f8'), ('schedule_id', '<i8'), ('offset_seconds', '<i4')]
+
+# Reports of the most recent write and load, exposed through get_scheduler_stats()
+last_write = {}
+last_load = {}
+
+
+def _pack(schedule_ids, offsets):
+    """One int64 per (schedule_id, offset) pair, for vectorized membership tests."""
+    return (np.asarray(schedule_ids, dtype=np.int64) << 32) | (np.asarray(offsets, dtype=np.int64) & 0xFFFFFFFF)
+
+
+def capture_plan(fire_queue):
+    """Structured array of every live fire queue entry, sorted by fire time."""
+    hot, cold, dead_ids, dead_keys = fire_queue.export()
+    plan = np.array(hot, dtype=PLAN_DTYPE)
+    if cold is not None:
+        ts, ids, offs = cold
+        keep = np.ones(len(ts), dtype=bool)
+        if dead_ids:
+            keep &= ~np.isin(ids, np.fromiter(dead_ids, dtype=np.int64))
+        if dead_keys:
+            dead = np.array(sorted(dead_keys), dtype=np.int64)
+            keep &= ~np.isin(_pack(ids, offs), _pack(dead[:, 0], dead[:, 1]))
+        tail = np.empty(int(keep.sum()), dtype=PLAN_DTYPE)
+        tail['fire_ts'], tail['schedule_id'], tail['offset_seconds'] = ts[keep], ids[keep], offs[keep]
+        plan = np.concatenate([plan, tail])
+    plan.sort(order='fire_ts', kind='stable')
+    return plan
+
+
+def write_snapshot(path: str, plan, watermark: datetime, meta: dict):
+    """Write a captured plan and its `updated_at` watermark to `path` (the manifest) and a sibling .npy."""
+    started = time.monotonic()
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    base = os.path.splitext(os.path.basename(path))[0]
+    data_file = f"{base}-{int(time.time() * 1000)}.npy"
+    np.save(os.path.join(directory, data_file), plan)
+
+    manifest = dict(meta, version=FORMAT_VERSION, data_file=data_file, entries=int(len(plan)),
+                    watermark=watermark.isoformat() if watermark else None,
+                    written_at=datetime.utcnow().isoformat())
+    tmp = f"{path}.tmp"
+    with open(tmp, 'w') as f:
+        json.dump(manifest, f)
+    os.replace(tmp, path)
+
+    # Older data files are unreferenced once the new manifest is in place
+    for name in os.listdir(directory):
+        if name.startswith(f"{base}-") and name.endswith('.npy') and name != data_file:
+            try:
+                os.remove(os.path.join(directory, name))
+            except OSError:
+                pass
+
+    report = {'written_at': manifest['written_at'], 'entries': manifest['entries'],
+              'seconds': round(time.monotonic() - started, 3)}
+    last_write.clear()
+    last_write.update(report)
+    return report
+
+
+def read_snapshot(path: str, meta: dict):
+    """Return (plan array memory-mapped read-only, watermark) or None if missing, unreadable or `meta` differs."""
+    if np is None or not path or not os.path.exists(path):
+        return None
+    try:
+        with open(path) as f:
+            manifest = json.load(f)
+        if manifest.get('version') != FORMAT_VERSION:
+            return None
+        for key, value in meta.items():
+            if manifest.get(key) != value:
+                print(f"⚠️ Plan snapshot ignored: {key} changed ({manifest.get(key)!r} -> {value!r})")
+                return None
+        data_path = os.path.join(os.path.dirname(os.path.abspath(path)), manifest['data_file'])
+        plan = np.load(data_path, mmap_mode='r')
+        if plan.dtype != np.dtype(PLAN_DTYPE) or len(plan) != manifest['entries']:
+            return None
+    except Exception:
+        traceback.print_exc()
+        return None
+
+    watermark = datetime.fromisoformat(manifest['watermark']) if manifest.get('watermark') else None
+    last_load.clear()
+    last_load.update({'written_at': manifest.get('written_at'), 'entries': manifest['entries']})
+    return plan, watermark
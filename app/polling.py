@@ -0,0 +1,73 @@
+"""
+Background polling threads
+
+`PollingThread` is the loop shared by the due-alarm consumer (app/alarm_queue.py), the
+outbox drainer (app/outbox.py) and the scheduler lease (app/leader_lease.py): a daemon
+thread with its own worker identity that calls `_poll()` in an app context until stopped,
+sleeping in between for as long as `_delay()` says.
+"""
+
+import os
+import socket
+import threading
+import traceback
+import uuid
+
+
+class PollingThread:
+    """Daemon thread that repeatedly calls `_poll()`; subclasses implement `_poll` and `_delay`."""
+
+    thread_name = 'poller'
+
+    def __init__(self):
+        self.worker = None
+        self._app = None
+        self._thread = None
+        self._stop = threading.Event()
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, app):
+        """Start the thread. Returns False if it was already running."""
+        self._app = app
+        if self.running:
+            return False
+        # Identity is taken at start so forked workers (e.g. gunicorn --preload) differ
+        self.worker = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name=self.thread_name, daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self):
+        self._stop.set()
+
+    def _poll(self):
+        """One round of work, run inside an app context. Its result is passed to `_delay`."""
+        raise NotImplementedError
+
+    def _delay(self, result):
+        """Seconds to sleep after a round that returned `result` (None if it raised); 0 goes again at once."""
+        raise NotImplementedError
+
+    def _sleep(self, seconds):
+        self._stop.wait(seconds)
+
+    def _run(self):
+        from app import db
+
+        while not self._stop.is_set():
+            result = None
+            with self._app.app_context():
+                try:
+                    result = self._poll()
+                except Exception:
+                    traceback.print_exc()
+                    db.session.rollback()
+                finally:
+                    db.session.remove()
+            delay = self._delay(result)
+            if delay:
+                self._sleep(delay)
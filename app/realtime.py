@@ -0,0 +1,116 @@
+"""
+Socket.IO connection handling and per-user delivery
+
+Every authenticated socket joins the room `user:<id>` when it connects, and the server
+emits a user's notifications to that room only. A user with several tabs open gets the
+event in each of them; other users' browsers never receive it. Unauthenticated
+connections are refused. The first connection also starts the outbox drainer
+(app/outbox.py), which emits events committed by scheduler processes that have no
+Socket.IO server of their own.
+
+Alarms that land together (classes sharing a start time, offsets lining up) are sent as
+one `notifications_batch` event per user instead of one `new_notification` each, so the
+browser shows a single alert. `coalesce()` merges the events of one delivery batch;
+NOTIFICATION_COALESCE_WINDOW additionally holds the scheduler's emits for a few hundred
+milliseconds so alarms fired by separate jobs in the same second merge as well.
+"""
+
+import threading
+
+from flask import current_app
+from flask_login import current_user
+from flask_socketio import join_room
+
+from app import metrics, outbox, socketio
+
+BATCH_EVENT = 'notifications_batch'
+
+
+def user_room(user_id) -> str:
+    """Name of the room every socket of `user_id` is joined to."""
+    return f"user:{user_id}"
+
+
+def emit_to_user(sio, user_id, event: str, payload: dict):
+    """Emit `event` to the sockets of one user (`sio` is the SocketIO server)."""
+    sio.emit(event, payload, to=user_room(user_id))
+    metrics.socket_emits.inc(1, event)
+
+
+def _items(event, payload):
+    if event == BATCH_EVENT:
+        return payload['items']
+    return [[payload['message'], payload.get('type', 'info')]]
+
+
+def coalesce(events):
+    """Merge each user's notification events into one; returns the new (user_id, event, payload) list.
+
+    A user left with a single notification keeps a plain `new_notification`; several become
+    one `notifications_batch` whose payload is {'user_id', 'items': [[message, type], ...]}.
+    Other events pass through. Users keep their order of first appearance.
+    """
+    grouped, passthrough = {}, []
+    for user_id, event, payload in events:
+        if event in ('new_notification', BATCH_EVENT):
+            grouped.setdefault(user_id, []).append((event, payload))
+        else:
+            passthrough.append((user_id, event, payload))
+
+    merged = []
+    for user_id, user_events in grouped.items():
+        if len(user_events) == 1:
+            merged.append((user_id,) + user_events[0])
+            continue
+        items = [item for event, payload in user_events for item in _items(event, payload)]
+        merged.append((user_id, BATCH_EVENT, {'user_id': user_id, 'items': items}))
+    return merged + passthrough
+
+
+class EmitBuffer:
+    """Holds notification events for `window` seconds, then emits them coalesced per user."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = []
+        self._timer = None
+
+    def send(self, sio, events, window: float = 0):
+        """Emit `events` coalesced, now (window <= 0) or when the current window closes."""
+        if window <= 0:
+            _emit_all(sio, coalesce(events))
+            return
+        with self._lock:
+            self._pending.extend(events)
+            if self._timer is None:
+                self._timer = threading.Timer(window, self.flush, args=(sio,))
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self, sio):
+        with self._lock:
+            events, self._pending, self._timer = self._pending, [], None
+        _emit_all(sio, coalesce(events))
+
+
+def _emit_all(sio, events):
+    for user_id, event, payload in events:
+        try:
+            emit_to_user(sio, user_id, event, payload)
+        except Exception:
+            metrics.emit_failures.inc()
+
+
+emit_buffer = EmitBuffer()
+
+
+@socketio.on('connect')
+def handle_connect(auth=None):
+    """Join the user's room; refuse the connection when nobody is logged in."""
+    if not current_user.is_authenticated:
+        return False
+    join_room(user_room(current_user.id))
+
+    # Events committed by scheduler workers are emitted from here once browsers are connected
+    if current_app.config.get('NOTIFICATION_OUTBOX_ENABLED') and not outbox.drainer.running:
+        outbox.drainer.start(current_app._get_current_object(), socketio)
@@ -0,0 +1,158 @@
+"""
+Notification retention engine
+
+Expired notifications are removed on a low-frequency scheduler job instead of on every
+tick. Each notification type has its own retention window; rows are purged oldest first
+in bounded chunks selected through the (notification_type, timestamp) index, one commit
+per chunk, optionally copying them to the cold `notifications_archive` table first.
+Expired fire ledger rows are pruned the same way, and so are `notification_outbox` rows
+older than NOTIFICATION_OUTBOX_MAX_AGE: the web process's drainer would drop them unsent
+anyway, and with no drainer running (a worker-only deployment, or no browser connected)
+nothing else ever deletes them.
+"""
+
+from datetime import datetime, timedelta
+import time
+import traceback
+
+# Report of the most recent run, exposed through get_scheduler_stats()
+last_run = {}
+
+
+def parse_retention(spec: str):
+    """Parse "warning=1,info=24" into {notification_type: hours}; malformed items are ignored."""
+    policy = {}
+    for item in (spec or '').split(','):
+        name, _, hours = item.partition('=')
+        try:
+            policy[name.strip()] = float(hours)
+        except ValueError:
+            continue
+    policy.pop('', None)
+    return policy
+
+
+def retention_policy(config):
+    """Return ({notification_type: timedelta}, default timedelta) from the app config."""
+    by_type = parse_retention(config.get('NOTIFICATION_RETENTION_BY_TYPE', ''))
+    default = timedelta(hours=config.get('NOTIFICATION_RETENTION_HOURS', 2))
+    return {name: timedelta(hours=hours) for name, hours in by_type.items()}, default
+
+
+def _purge_chunks(model, id_column, condition, order_column, chunk_size, deadline, archive=None, delete=None):
+    """Delete rows matching `condition` oldest first, `chunk_size` at a time. Returns rows deleted.
+
+    `delete(ids)`, when given, replaces the plain DELETE of each chunk.
+    """
+    from app import db
+
+    purged = 0
+    while time.monotonic() < deadline:
+        ids = db.session.execute(
+            db.select(id_column).where(condition).order_by(order_column).limit(chunk_size)
+        ).scalars().all()
+        if not ids:
+            break
+        if archive is not None:
+            archive(ids)
+        if delete is not None:
+            delete(ids)
+        else:
+            db.session.execute(db.delete(model).where(id_column.in_(ids)))
+        db.session.commit()
+        purged += len(ids)
+        if len(ids) < chunk_size:
+            break
+    return purged
+
+
+def _archive_notifications(ids):
+    from app import db
+    from app.models import Notification, NotificationArchive
+
+    columns = ['user_id', 'message', 'is_read', 'notification_type', 'timestamp']
+    db.session.execute(
+        db.insert(NotificationArchive).from_select(
+            ['original_id'] + columns,
+            db.select(Notification.id, *[getattr(Notification, c) for c in columns]).where(Notification.id.in_(ids))
+        )
+    )
+
+
+def _delete_notifications(ids):
+    from app import unread
+    from app.models import Notification
+
+    # Purged unread rows leave the users' unread counters
+    unread.delete_notifications(Notification.id.in_(ids))
+
+
+def run_retention(config):
+    """Purge (or archive) expired notifications, fire ledger and outbox rows. Call inside an app context.
+
+    Returns a report dict with rows purged per type and the time spent.
+    """
+    from app import db
+    from app.models import Notification, FireLedger, NotificationOutbox
+
+    started = time.monotonic()
+    deadline = started + config.get('NOTIFICATION_RETENTION_MAX_SECONDS', 30)
+    chunk_size = config.get('NOTIFICATION_RETENTION_CHUNK_SIZE', 1000)
+    archive = _archive_notifications if config.get('NOTIFICATION_ARCHIVE_ENABLED') else None
+    now = datetime.utcnow()
+
+    by_type, default = retention_policy(config)
+    purged = {}
+    try:
+        for name, keep in by_type.items():
+            purged[name] = _purge_chunks(
+                Notification, Notification.id,
+                db.and_(Notification.notification_type == name, Notification.timestamp < now - keep),
+                Notification.timestamp, chunk_size, deadline, archive, _delete_notifications
+            )
+
+        # Every type without its own window (including untyped rows) uses the default
+        other = db.or_(Notification.notification_type.is_(None), Notification.notification_type.notin_(by_type))
+        purged['*'] = _purge_chunks(
+            Notification, Notification.id,
+            db.and_(other, Notification.timestamp < now - default),
+            Notification.timestamp, chunk_size, deadline, archive, _delete_notifications
+        )
+
+        # Ledger rows only need to outlive the occurrence they guard
+        ledger_cutoff = now - timedelta(days=config.get('FIRE_LEDGER_RETENTION_DAYS', 8))
+        ledger_purged = _purge_chunks(
+            FireLedger, FireLedger.id, FireLedger.fired_at < ledger_cutoff,
+            FireLedger.fired_at, chunk_size, deadline
+        )
+
+        # Ids follow created_at, so walking them oldest first finds the expired rows at the start
+        outbox_cutoff = now - timedelta(seconds=config.get('NOTIFICATION_OUTBOX_MAX_AGE', 300))
+        outbox_purged = _purge_chunks(
+            NotificationOutbox, NotificationOutbox.id, NotificationOutbox.created_at < outbox_cutoff,
+            NotificationOutbox.id, chunk_size, deadline
+        )
+    except Exception:
+        traceback.print_exc()
+        db.session.rollback()
+        raise
+
+    report = {
+        'ran_at': now.isoformat(),
+        'seconds': round(time.monotonic() - started, 3),
+        'notifications_purged': sum(purged.values()),
+        'by_type': purged,
+        'archived': bool(archive),
+        'ledger_purged': ledger_purged,
+        'outbox_purged': outbox_purged,
+        'incomplete': time.monotonic() >= deadline,
+    }
+    last_run.clear()
+    last_run.update(report)
+
+    if report['notifications_purged'] or ledger_purged or outbox_purged:
+        print(f"🧹 Retention: {report['notifications_purged']} notification(s) "
+              f"{'archived' if archive else 'purged'}, {ledger_purged} ledger row(s) pruned, "
+              f"{outbox_purged} undelivered outbox row(s) dropped "
+              f"in {report['seconds']:.2f}s{' (time budget reached)' if report['incomplete'] else ''}")
+    return report
@@ -1,368 +1,1232 @@
 """
 Background scheduler for class notifications
 Two modes:
-- Per-occurrence persistent jobs (preferred): uses APScheduler jobstore to schedule exact notifications
-- Fallback interval check: scans schedules periodically to catch missed events
+- Per-occurrence persistent jobs (preferred): uses APScheduler jobstore to schedule exact notifications.
+  With SCHEDULER_JOB_MODE='minute_bucket' there is instead one weekly job per distinct fire
+  minute, which delivers every `alarm_slots` row due in that minute as a batch
+- Fallback interval check: pops due entries from an in-memory fire queue (app/fire_queue.py)
+  every 5 seconds, so a tick costs O(due alarms) rather than O(all schedules)
 
 Notifications fired by jobs create Notification rows and emit socket events. Jobs are re-scheduled for the next weekly occurrence.
 """
 
 from datetime import datetime, timedelta, timezone
+from apscheduler.events import (
+    EVENT_JOB_ERROR, EVENT_JOB_EXECUTED, EVENT_JOB_MAX_INSTANCES, EVENT_JOB_MISSED, EVENT_JOB_SUBMITTED
+)
+from apscheduler.executors.pool import ProcessPoolExecutor, ThreadPoolExecutor
 from apscheduler.schedulers.background import BackgroundScheduler
+from apscheduler.schedulers.base import STATE_RUNNING
+from apscheduler.job import Job
+from apscheduler.jobstores.base import JobLookupError
 from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
+from apscheduler.triggers.cron import CronTrigger
 from apscheduler.triggers.date import DateTrigger
-import math
+from apscheduler.util import datetime_to_utc_timestamp
+from contextlib import contextmanager
+from sqlalchemy import bindparam, event, or_, select
+from app import alarm_queue, claims, metrics, outbox, plan_snapshot, unread
+from app.fire_queue import FireQueue
+from app.jobstore import AlarmJobStore
+from app.leader_lease import LeaderLease
+from app.realtime import coalesce, emit_buffer
+from app.utils.compiled_schedule import compile_schedule, cached_schedule, evict, ALL_DAYS
+from app.utils.timezones import zone_table
+import hashlib
+import os
+import pickle
+import threading
+import time
 import traceback
 
+try:
+    import numpy as np
+except ImportError:  # optional: batch rehydration falls back to per-schedule computation
+    np = None
+
 # Global references
 _app = None
 _socketio = None
 scheduler = BackgroundScheduler()
+scheduler_lease = LeaderLease('notification_scheduler')
+alarm_consumer = alarm_queue.AlarmQueueConsumer()
 
+# Upcoming fire instants keyed by (schedule_id, offset_seconds); see app/fire_queue.py
+fire_queue = FireQueue()
+_queued_versions = {}  # schedule_id -> updated_at the queue entries were computed from
+_queue_watermark = None
+_plan_lock = threading.Lock()  # serializes queue syncs with plan snapshot captures
+_job_offsets = {}  # schedule_id -> offsets this process created DateTrigger jobs for
+_bucket_minutes = set()  # minute-bucket jobs known to exist in the jobstore
+last_tick_stats = {}  # SQL statement count of the most recent tick
 
-def _parse_start_time(time_str: str):
-    """Return datetime.time parsed from a range string like "01:00 PM - 02:30 PM"."""
-    if not time_str:
-        return None
-    start_part = time_str.split('-')[0].strip()
-    for fmt in ("%I:%M %p", "%I:%M%p"):
-        try:
-            return datetime.strptime(start_part, fmt).time()
-        except ValueError:
-            continue
-    return None
+# Executor alias for per-occurrence and minute-bucket jobs (see _configure_executors)
+ALARM_EXECUTOR = 'alarms'
+# Jobstore alias of the typed per-occurrence store (SCHEDULER_JOBSTORE='compact', app/jobstore.py)
+ALARM_JOBSTORE = 'alarms'
+# Interval jobs and their period in seconds, used to count coalesced runs
+_INTERVAL_JOBS = {
+    'class_notifications': 5, 'notification_retention': 600, 'term_rollover': 3600, 'plan_snapshot': 300,
+    'scheduler_report': 15,
+}
+_last_submitted = {}
+_stats_lock = threading.Lock()
+scheduler_stats = {
+    'submitted': 0, 'finished': 0, 'errors': 0, 'misfired': 0, 'coalesced': 0, 'max_instances_skipped': 0,
+}
 
+# Fire entries up to this many seconds early (half the 5 second tick interval)
+_FIRE_THRESHOLD = 4
+# Entries popped later than this (e.g. after the process was suspended) are not delivered
+_MAX_FIRE_LATENESS = 60
+# Seconds of `updated_at` overlap re-read on every sync to tolerate commit ordering
+_SYNC_SLACK = 2
+# The tick records a recovery checkpoint at most this often (seconds)
+_CHECKPOINT_INTERVAL = 30
+_checkpoint_written = None
 
-def _should_notify_today(schedule, now: datetime):
-    """Check if schedule is for today."""
-    # Convert UTC `now` to local timezone to evaluate the schedule's local weekday
-    try:
-        local_tz = datetime.now().astimezone().tzinfo
-        local_now = now.astimezone(local_tz)
-    except Exception:
-        local_now = now
 
-    day_map = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
-    today_abbr = day_map[local_now.weekday()]
-    days_field = (schedule.days or '').lower()
-    return today_abbr.lower() in days_field
+def _utc_now():
+    return datetime.now(timezone.utc)
+
+
+# Source of "now" for every scheduling decision; replay runs swap in a virtual clock
+clock = _utc_now
+
+
+def set_clock(now_fn=None):
+    """Use `now_fn()` (returning an aware UTC datetime) as the scheduler clock; None restores wall time."""
+    global clock
+    clock = now_fn or _utc_now
 
 
 def _next_start_datetime_for_schedule(schedule, from_dt: datetime):
-    """Return next datetime for the schedule start at or after from_dt (search up to 14 days)."""
-    start_time = _parse_start_time(schedule.time or '')
-    if not start_time:
-        return None
+    """Return next datetime for the schedule start at or after from_dt."""
+    return compile_schedule(schedule).next_start(from_dt)
+
+
+_LOWEST_BIT = [7] + [(i & -i).bit_length() - 1 for i in range(1, 128)]  # days ahead per rotated mask
+
 
-    # Normalize days list into set of weekday indices
-    day_map = {'mon': 0, 'tue': 1, 'wed': 2, 'thu': 3, 'fri': 4, 'sat': 5, 'sun': 6}
-    days_field = (schedule.days or '').lower()
-    days = [d.strip() for d in days_field.replace(',', ' ').split() if d.strip()]
-    target_weekdays = [day_map.get(d[:3]) for d in days if d[:3] in day_map]
+def next_fire_batch(weekday_masks, start_minutes, offsets, now: datetime, zone=None):
+    """Vectorized next fire instant for many (schedule, offset) rows at once.
 
-    # If no days specified, assume any day
-    if not target_weekdays:
-        target_weekdays = list(range(7))
+    All array arguments have one element per row: the schedule's weekday bitmask (Mon=bit0),
+    its start minute-of-day (negative if unparseable) and the alarm offset in seconds.
+    Every row must belong to the time zone whose OffsetTable is `zone` (default zone if None).
+    Returns an int64 NumPy array of epoch seconds for the first fire at or after `now`
+    (-1 where the schedule has no start time). Matches
+    `_next_start_datetime_for_schedule(s, now + offset) - offset` for each row.
+    """
+    if np is None:
+        raise RuntimeError('next_fire_batch requires numpy')
+
+    now_ts = int(now.timestamp())
+    zone = zone or zone_table(None, now_ts)
+
+    masks = np.asarray(weekday_masks, dtype=np.int64)
+    starts = np.asarray(start_minutes, dtype=np.int64) * 60
+    offs = np.asarray(offsets, dtype=np.int64)
+
+    # Local wall-clock seconds of `now + offset`, split into day number and second-of-day
+    from_ts = now_ts + offs
+    local_from = from_ts + zone.offsets_at(np, from_ts)
+    day = local_from // 86400
+    second_of_day = local_from - day * 86400
+    weekday = (day + 3) % 7  # 1970-01-01 was a Thursday
+
+    # Rotate each mask so bit 0 is the local weekday of `now + offset`; drop today if passed
+    rotated = ((masks >> weekday) | (masks << (7 - weekday))) & ALL_DAYS
+    rotated &= ~(starts < second_of_day).astype(np.int64)
+    days_ahead = np.asarray(_LOWEST_BIT, dtype=np.int64)[rotated]
+
+    # Back to UTC through the zone's DST table, then move to the alarm instant
+    fire = zone.to_utc_batch(np, (day + days_ahead) * 86400 + starts) - offs
+    return np.where(starts < 0, -1, fire)
+
+
+_query_counter = threading.local()
+
+
+def _on_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = getattr(_query_counter, 'stats', None)
+    if stats is not None:
+        stats['queries'] += 1
+
+
+@contextmanager
+def _count_queries():
+    """Count SQL statements issued by the current thread (used to report per-tick round trips)."""
+    from app import db
 
-    # Determine local timezone
+    engine = db.engine
+    if not event.contains(engine, 'before_cursor_execute', _on_cursor_execute):
+        event.listen(engine, 'before_cursor_execute', _on_cursor_execute)
+    stats = {'queries': 0}
+    _query_counter.stats = stats
     try:
-        local_tz = datetime.now().astimezone().tzinfo
-    except Exception:
-        local_tz = timezone.utc
-
-    # Search next 14 days for matching weekday
-    for delta in range(0, 14):
-        candidate_date = (from_dt + timedelta(days=delta)).date()
-        if candidate_date.weekday() in target_weekdays:
-            # Combine with schedule's start_time in local timezone
-            candidate_local = datetime.combine(candidate_date, start_time)
-            # Attach local tz and convert to UTC
-            try:
-                candidate_local = candidate_local.replace(tzinfo=local_tz)
-                candidate_utc = candidate_local.astimezone(timezone.utc)
-            except Exception:
-                # Fallback: treat as naive UTC
-                candidate_utc = datetime.combine(candidate_date, start_time).replace(tzinfo=timezone.utc)
+        yield stats
+    finally:
+        _query_counter.stats = None
+        last_tick_stats.update(stats)
 
-            if candidate_utc >= from_dt.astimezone(timezone.utc):
-                return candidate_utc
-    return None
+
+@contextmanager
+def _timed(histogram):
+    """Observe the duration of the block in a metrics histogram."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        histogram.observe(time.perf_counter() - started)
 
 
 def _job_id_for(schedule_id: int, seconds_before: int):
     return f"sched_{schedule_id}_{int(seconds_before)}"
 
 
+def _build_message(schedule, seconds_before: int):
+    """Return (message, notification_type) for an alarm fired `seconds_before` class start."""
+    if seconds_before == 0:
+        return f"🔔 CLASS STARTING NOW: {schedule.subject} at {schedule.time}", 'warning'
+    if seconds_before == 1800:
+        return f"⏰ Class in 30 minutes: {schedule.subject} at {schedule.time}", 'info'
+    if seconds_before == 3600:
+        return f"⏰ Class in 1 hour: {schedule.subject} at {schedule.time}", 'info'
+    mins = int(seconds_before / 60)
+    return f"⏰ Class in {mins} minutes: {schedule.subject} at {schedule.time}", 'info'
+
+
+def _occurrence_date(schedule, fire_at: datetime, seconds_before: int):
+    """Date, in the owner's time zone, of the class start an alarm fired at `fire_at` belongs to."""
+    return compile_schedule(schedule).local_date(fire_at + timedelta(seconds=seconds_before))
+
+
+def _is_active(schedule):
+    """True if the schedule exists, has alarms on and its term has not been archived."""
+    return bool(schedule and schedule.alarm_enabled and schedule.archived_at is None)
+
+
+def _active_schedules(query):
+    """Restrict a Schedule query to the scheduler's working set (uses ix_schedules_alarm_active)."""
+    from app.models import Schedule
+
+    return query.filter(Schedule.alarm_enabled.is_(True), Schedule.archived_at.is_(None))
+
+
+def _with_user_zone(query):
+    """Eager-load each schedule owner's time zone so compiling a batch costs one extra query."""
+    from sqlalchemy.orm import selectinload
+    from app.models import Schedule, User
+
+    return query.options(selectinload(Schedule.user).load_only(User.timezone))
+
+
+def _scan_chunk_size():
+    return int(_app.config.get('SCHEDULER_SCAN_CHUNK_SIZE', 2000)) if _app else 2000
+
+
+def _scan_active_schedules(schedule_ids=None):
+    """Yield the compiled form of every active schedule (or of those in `schedule_ids`) in chunks.
+
+    In the default 'stream' scan mode only the columns compilation needs are selected, as
+    plain row tuples joined with the owner's zone, and fetched SCHEDULER_SCAN_CHUNK_SIZE
+    rows at a time via `yield_per` (a server-side cursor on Postgres). Nothing enters the
+    session's identity map, so scan memory is one chunk however large the table grows.
+    SCHEDULER_SCAN_MODE='orm' loads full Schedule objects as before. Call inside an app context.
+    """
+    from app.models import Schedule
+
+    if schedule_ids is None:
+        yield from _scan_where()
+        return
+    schedule_ids = list(schedule_ids)
+    for i in range(0, len(schedule_ids), 500):
+        yield from _scan_where(Schedule.id.in_(schedule_ids[i:i + 500]))
+
+
+def _scan_where(*conditions):
+    from app import db
+    from app.models import Schedule, User
+
+    chunk_size = _scan_chunk_size()
+    if _app and _app.config.get('SCHEDULER_SCAN_MODE', 'stream') == 'orm':
+        schedules = _with_user_zone(_active_schedules(Schedule.query.filter(*conditions))).all()
+        for i in range(0, len(schedules), chunk_size):
+            yield [compile_schedule(s) for s in schedules[i:i + chunk_size]]
+        return
+
+    query = _active_schedules(
+        select(Schedule.id, Schedule.updated_at, Schedule.days, Schedule.time, Schedule.alarm_offset_minutes,
+               User.timezone.label('tz_name'))
+        .outerjoin(User, Schedule.user_id == User.id)
+        .where(*conditions)
+    ).execution_options(yield_per=chunk_size)
+    for rows in db.session.execute(query).partitions():
+        yield [compile_schedule(row) for row in rows]
+
+
+def _claim_fires(keys):
+    """Insert (schedule_id, offset_seconds, occurrence_date) rows into the fire ledger.
+
+    Already claimed fires are skipped by the unique index (see app/claims.py). Returns the
+    set of keys claimed by this call. Runs in the caller's transaction.
+    """
+    from app.models import FireLedger
+
+    keys = list(dict.fromkeys(keys))
+    rows = [
+        {'schedule_id': schedule_id, 'offset_seconds': offset_seconds, 'occurrence_date': occurrence_date}
+        for schedule_id, offset_seconds, occurrence_date in keys
+    ]
+    return claims.insert_new(FireLedger, rows, ('schedule_id', 'offset_seconds', 'occurrence_date'))
+
+
+def _deliver_alarms(alarms, source: str):
+    """Persist and emit a batch of alarms as one transaction (call inside an app context).
+
+    `alarms` is a list of (schedule, seconds_before, occurrence_date, intended fire_at).
+    Each fire is claimed in the fire ledger; fires already claimed (by a job or an earlier
+    tick) are skipped. Survivors are bulk-inserted with one commit and socket events are
+    emitted only after the commit. `source` labels the metrics ('tick', 'job', 'bucket').
+    Returns the delivered (user_id, message, type) tuples.
+    """
+    from app import db
+    from app.models import Notification
+
+    if not alarms:
+        return []
+
+    claimed = _claim_fires(
+        (sched.id, seconds_before, occurrence_date) for sched, seconds_before, occurrence_date, _ in alarms
+    )
+    now = clock()
+    delivered = []
+    for sched, seconds_before, occurrence_date, fire_at in alarms:
+        if (sched.id, seconds_before, occurrence_date) in claimed:
+            delivered.append((sched.user_id,) + _build_message(sched, seconds_before))
+            metrics.fire_lateness.observe((now - fire_at).total_seconds(), seconds_before)
+    if not delivered:
+        db.session.commit()
+        return []
+
+    db.session.execute(db.insert(Notification), [
+        {'user_id': user_id, 'message': msg, 'notification_type': ntype}
+        for user_id, msg, ntype in delivered
+    ])
+    unread.inserted(user_id for user_id, _, _ in delivered)
+    # One socket event per user, however many of their alarms are in this batch
+    events = coalesce([
+        (user_id, 'new_notification', {'user_id': user_id, 'message': msg, 'type': ntype})
+        for user_id, msg, ntype in delivered
+    ])
+    # Without a Socket.IO server here (worker mode) the web process emits them from the outbox
+    if _socketio is None and _outbox_mode():
+        outbox.add(events)
+    db.session.commit()
+    metrics.notifications_created.inc(len(delivered), source)
+
+    # Emit socket events for real-time notification
+    if _socketio is not None:
+        emit_buffer.send(_socketio, events, _app.config.get('NOTIFICATION_COALESCE_WINDOW', 0))
+    return delivered
+
+
+def _queue_mode():
+    return bool(_app) and bool(_app.config.get('ALARM_QUEUE_ENABLED'))
+
+
+def _outbox_mode():
+    return bool(_app) and bool(_app.config.get('NOTIFICATION_OUTBOX_ENABLED'))
+
+
+def _dispatch_alarms(alarms, source: str):
+    """Deliver alarms here, or hand them to the shared due-alarm queue (app/alarm_queue.py) in queue mode.
+
+    Returns the alarms delivered or newly queued.
+    """
+    if _queue_mode():
+        return alarm_queue.enqueue(alarms)
+    return _deliver_alarms(alarms, source)
+
+
 def _fire_notification(schedule_id: int, seconds_before: int):
     """Job handler: create notification for schedule and re-schedule next week's job."""
     try:
-        from app import db
-        from app.models import Schedule, Notification
+        from app.models import Schedule
         global _app, _socketio
         if not _app:
             return
 
         with _app.app_context():
             sched = Schedule.query.get(schedule_id)
-            if not sched or not sched.alarm_enabled:
+            if not _is_active(sched):
                 return
-
-            # Build message
-            if seconds_before == 0:
-                msg = f"🔔 CLASS STARTING NOW: {sched.subject} at {sched.time}"
-                ntype = 'warning'
-            elif seconds_before == 1800:
-                msg = f"⏰ Class in 30 minutes: {sched.subject} at {sched.time}"
-                ntype = 'info'
-            elif seconds_before == 3600:
-                msg = f"⏰ Class in 1 hour: {sched.subject} at {sched.time}"
-                ntype = 'info'
-            else:
-                mins = int(seconds_before / 60)
-                msg = f"⏰ Class in {mins} minutes: {sched.subject} at {sched.time}"
-                ntype = 'info'
-
-            # Avoid duplicates today (use UTC-aware start of day)
-            today_start = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
-            existing = Notification.query.filter(
-                Notification.user_id == sched.user_id,
-                Notification.message == msg,
-                Notification.timestamp >= today_start
-            ).first()
-            if existing:
+            if seconds_before not in compile_schedule(sched).offsets:
+                # Left over from an offset edited in another process; let it expire
                 return
 
-            notification = Notification(
-                user_id=sched.user_id,
-                message=msg,
-                notification_type=ntype
+            # The occurrence this job belongs to: the start closest to now + offset
+            now = clock()
+            start = _next_start_datetime_for_schedule(
+                sched, now + timedelta(seconds=seconds_before - _MAX_FIRE_LATENESS)
             )
-            db.session.add(notification)
-            db.session.commit()
-
-            try:
-                _socketio.emit('new_notification', {
-                    'user_id': sched.user_id,
-                    'message': msg,
-                    'type': ntype
-                })
-            except Exception:
-                pass
+            if not start:
+                return
+            fire_at = start - timedelta(seconds=seconds_before)
+            # Usually the tick has claimed this fire already; only the delivery is skipped then
+            _dispatch_alarms([(sched, seconds_before, _occurrence_date(sched, fire_at, seconds_before), fire_at)], 'job')
 
             # Reschedule this job for next week's same weekday (use UTC)
-            next_start = _next_start_datetime_for_schedule(sched, datetime.now(timezone.utc) + timedelta(days=1))
+            next_start = _next_start_datetime_for_schedule(sched, clock() + timedelta(days=1))
             if next_start:
                 run_date = next_start - timedelta(seconds=seconds_before)
                 job_id = _job_id_for(schedule_id, seconds_before)
                 try:
-                    scheduler.add_job(
-                        func=_fire_notification,
-                        trigger=DateTrigger(run_date=run_date),
-                        args=[schedule_id, seconds_before],
-                        id=job_id,
-                        replace_existing=True
-                    )
+                    _put_job(job_id, _fire_notification, DateTrigger(run_date=run_date), [schedule_id, seconds_before])
                 except Exception:
                     traceback.print_exc()
     except Exception:
         traceback.print_exc()
 
 
+def _queue_offset(schedule, seconds_before: int, after: datetime):
+    """Queue the first fire of one offset at or after `after`."""
+    next_start = _next_start_datetime_for_schedule(schedule, after + timedelta(seconds=seconds_before))
+    if next_start:
+        fire_queue.push(schedule.id, seconds_before, next_start - timedelta(seconds=seconds_before))
+
+
+def queue_schedule(schedule, now: datetime = None):
+    """(Re)insert every alarm offset of a schedule into the in-memory fire queue."""
+    if not schedule or not getattr(schedule, 'id', None):
+        return
+
+    fire_queue.discard(schedule.id)
+    _queued_versions[schedule.id] = schedule.updated_at
+    if not _is_active(schedule):
+        return
+
+    now = now or clock()
+    for t in compile_schedule(schedule).offsets:
+        _queue_offset(schedule, t, now)
+
+
+def unqueue_schedule(schedule_id: int):
+    """Drop every queued fire of a schedule."""
+    fire_queue.discard(schedule_id)
+    _queued_versions.pop(schedule_id, None)
+
+
+def _rebuild_fire_queue():
+    """Load every enabled schedule into the fire queue (call inside an app context).
+
+    Starts from the plan snapshot instead when one is available (see _warm_start_fire_queue).
+    """
+    global _queue_watermark
+    if _warm_start_fire_queue():
+        return
+
+    _queued_versions.clear()
+    now = clock()
+    entries = []
+    watermark = None
+    for chunk in _scan_active_schedules():
+        entries.extend(_batch_entries(chunk, now))
+        for c in chunk:
+            _queued_versions[c.schedule_id] = c.updated_at
+            if c.updated_at and (watermark is None or c.updated_at > watermark):
+                watermark = c.updated_at
+    fire_queue.load(entries)
+    _queue_watermark = watermark
+    print(f"✓ Fire queue loaded: {len(fire_queue)} entries for {len(_queued_versions)} schedules")
+
+
+def _snapshot_path():
+    return _app.config.get('SCHEDULER_SNAPSHOT_PATH') if _app else None
+
+
+def _snapshot_meta():
+    """Settings a snapshot was computed under; a snapshot written under others is not loaded."""
+    uri = _app.config.get('SQLALCHEMY_DATABASE_URI') or ''
+    return {
+        'database': hashlib.sha256(uri.encode()).hexdigest()[:16],
+        'default_zone': _app.config.get('DEFAULT_TIMEZONE') or '',
+    }
+
+
+def _warm_start_fire_queue():
+    """Load the fire queue from the last plan snapshot (call inside an app context). Returns False if none.
+
+    The snapshot is memory-mapped as the queue's cold tail; only schedules edited since its
+    watermark, deleted ones and those whose queued fire passed during the downtime are
+    recomputed, so start-up cost follows the changes rather than the table size.
+    """
+    global _queue_watermark
+    from app import db
+    from app.models import Schedule
+
+    path = _snapshot_path()
+    snapshot = plan_snapshot.read_snapshot(path, _snapshot_meta()) if path else None
+    if snapshot is None:
+        return False
+
+    started = time.monotonic()
+    plan, watermark = snapshot
+    now = clock()
+    with _plan_lock:
+        # Fires that passed while no scheduler ran (recovery delivers those) need their next occurrence
+        passed = int(plan['fire_ts'].searchsorted(now.timestamp()))
+        recompute = set(np.unique(plan['schedule_id'][:passed]).tolist())
+        query = db.session.query(Schedule.id, Schedule.updated_at)
+        if watermark is not None:
+            query = query.filter(Schedule.updated_at > watermark)
+        for schedule_id, updated_at in query:
+            recompute.add(schedule_id)
+            if updated_at and (watermark is None or updated_at > watermark):
+                watermark = updated_at
+
+        ids = list(recompute)
+        _queued_versions.clear()
+        # Still memory-mapped: filtering the plan here would copy all of it into memory
+        fire_queue.load_sorted(plan['fire_ts'], plan['schedule_id'], plan['offset_seconds'])
+        for schedule_id in ids:
+            fire_queue.discard(schedule_id)  # marks its cold entries dead
+
+        # Deleted, disabled and archived schedules are not re-added
+        for chunk in _scan_active_schedules(ids):
+            for schedule_id, offset, fire_ts in _batch_entries(chunk, now):
+                fire_queue.push(schedule_id, offset, datetime.fromtimestamp(fire_ts, timezone.utc))
+            for c in chunk:
+                _queued_versions[c.schedule_id] = c.updated_at
+        _queue_watermark = watermark
+
+    print(f"✓ Fire queue warm-started from snapshot: {len(fire_queue)} entries, {len(ids)} schedule(s) recomputed "
+          f"in {time.monotonic() - started:.2f}s")
+    return True
+
+
+def write_plan_snapshot():
+    """Scheduler job: write the fire queue to SCHEDULER_SNAPSHOT_PATH for the next warm start."""
+    path = _snapshot_path()
+    if not path or np is None:
+        return
+    try:
+        with _plan_lock:
+            plan = plan_snapshot.capture_plan(fire_queue)
+            watermark = _queue_watermark
+        if watermark is not None:
+            # Rows stamped just before the watermark may commit after it was read; the next start re-reads them
+            watermark -= timedelta(seconds=_SYNC_SLACK)
+        plan_snapshot.write_snapshot(path, plan, watermark, _snapshot_meta())
+    except Exception:
+        traceback.print_exc()
+
+
+def _batch_entries(compiled_schedules, now: datetime):
+    """Return (schedule_id, offset, fire_ts) queue entries for compiled schedules via next_fire_batch.
+
+    Rows are grouped by time zone so each batch converts through a single offset table.
+    Without NumPy each (schedule, offset) is computed on its own.
+    """
+    if np is None:
+        entries = []
+        for c in compiled_schedules:
+            for t in c.offsets:
+                next_start = c.next_start(now + timedelta(seconds=t))
+                if next_start:
+                    entries.append((c.schedule_id, t, next_start.timestamp() - t))
+        return entries
+
+    return _zone_batch_entries(_zone_arrays(compiled_schedules), now)
+
+
+def _zone_arrays(compiled_schedules):
+    """{tz_name: (ids, masks, starts, offsets)} int64 arrays with one row per (schedule, offset) (needs NumPy)."""
+    by_zone = {}
+    for c in compiled_schedules:
+        by_zone.setdefault(c.tz_name, []).extend(
+            (c.schedule_id, c.weekday_mask, -1 if c.start_minute is None else c.start_minute, t)
+            for t in c.offsets
+        )
+    return {
+        tz_name: tuple(np.asarray(col, dtype=np.int64) for col in zip(*rows))
+        for tz_name, rows in by_zone.items() if rows
+    }
+
+
+def _zone_batch_entries(arrays, now: datetime, until: datetime = None):
+    """_batch_entries for rows already grouped by _zone_arrays, optionally only fires before `until`."""
+    entries = []
+    now_ts = int(now.timestamp())
+    for tz_name, (ids, masks, starts, offs) in arrays.items():
+        fires = next_fire_batch(masks, starts, offs, now, zone_table(tz_name, now_ts))
+        keep = fires >= 0
+        if until is not None:
+            keep &= fires < until.timestamp()
+        entries.extend(zip(ids[keep].tolist(), offs[keep].tolist(), fires[keep].astype(np.float64).tolist()))
+    return entries
+
+
+def _sync_fire_queue():
+    """Re-queue schedules whose `updated_at` moved since they were queued (call inside an app context).
+
+    Route handlers in this process update the queue directly; this catches edits made by
+    other processes (web vs. worker). Deleted schedules are dropped lazily when they fire.
+    The watermark only ever advances to an `updated_at` actually read: those are stamped
+    by whichever host wrote the row, so this process's own clock is never compared to them.
+    """
+    global _queue_watermark
+    from app import db
+    from app.models import Schedule
+
+    with _plan_lock:
+        # Versions only: rows inside the slack window are re-read every tick, so keep that cheap
+        query = db.session.query(Schedule.id, Schedule.updated_at)
+        if _queue_watermark is not None:
+            # Always re-read the slack window: a transaction stamped before the watermark may
+            # commit after it was read, however old the watermark is. _queued_versions dedupes.
+            query = query.filter(Schedule.updated_at >= _queue_watermark - timedelta(seconds=_SYNC_SLACK))
+        changed = []
+        for schedule_id, updated_at in query:
+            if schedule_id not in _queued_versions or _queued_versions[schedule_id] != updated_at:
+                changed.append(schedule_id)
+            if updated_at and (_queue_watermark is None or updated_at > _queue_watermark):
+                _queue_watermark = updated_at
+
+        for i in range(0, len(changed), 500):
+            for s in _with_user_zone(Schedule.query.filter(Schedule.id.in_(changed[i:i + 500]))).all():
+                queue_schedule(s)
+
+
 def check_and_send_notifications():
-    """Check all schedules and send notifications at appropriate times."""
+    """Fire every alarm whose instant is due according to the in-memory fire queue.
+
+    Each tick runs as a batch pipeline: pop due entries, load their schedules with one
+    query, dedupe and insert all notifications in one transaction, then emit.
+    """
     # Allow the scheduler to run without a SocketIO instance (worker mode).
     if not _app:
         return
     
-    from app.models import Schedule, Notification
+    from app.models import Schedule
     from app import db
     
-    with _app.app_context():
+    with _app.app_context(), _count_queries() as stats, _timed(metrics.tick_seconds):
         # Use timezone-aware UTC now for calculations
-        now = datetime.now(timezone.utc)
-        
-        # Clean up old notifications (older than 2 hours)
-        cleanup_time = now - timedelta(hours=2)
-        old_notifications = Notification.query.filter(
-            Notification.timestamp < cleanup_time
-        ).delete(synchronize_session=False)
-        if old_notifications > 0:
-            db.session.commit()
-        
-        # Get all enabled schedules
-        schedules = Schedule.query.filter_by(alarm_enabled=True).all()
-        
-        print(f"\n[SCHEDULER] Checking {len(schedules)} enabled schedules at {now.strftime('%H:%M:%S')}")
-        
-        for sched in schedules:
-            # Determine next start in UTC for this schedule
-            next_start = _next_start_datetime_for_schedule(sched, now)
-            if not next_start:
-                print(f"  ⏭️ Skipping {sched.subject} - no upcoming occurrence found, days: {sched.days}")
-                continue
+        now = clock()
 
-            # Skip if not scheduled for today in local timezone
-            if not _should_notify_today(sched, now):
-                try:
-                    local_tz = datetime.now().astimezone().tzinfo
-                    local_next = next_start.astimezone(local_tz)
-                    print(f"  ⏭️ Skipping {sched.subject} - not scheduled for {local_next.strftime('%a')}, days: {sched.days}")
-                except Exception:
-                    print(f"  ⏭️ Skipping {sched.subject} - not scheduled today, days: {sched.days}")
-                continue
+        # Expired notifications are purged by the retention job, not the tick
+        _touch_checkpoint(now)
+
+        # Pick up schedules added or edited by other processes since the last tick
+        _sync_fire_queue()
 
-            print(f"  ✓ Checking {sched.subject} - time: {sched.time}")
-            # Calculate time difference in seconds relative to UTC now
-            delta_seconds = (next_start - now).total_seconds()
-            print(f"    ⏱️ Delta: {delta_seconds:.1f} seconds (until next start UTC: {next_start.isoformat()})")
-            
-            # Clean up notifications for this class if it's already passed by 5+ minutes
-            if delta_seconds < -300:  # older than 5 minutes
-                # Delete old notifications for this subject
-                Notification.query.filter(
-                    Notification.user_id == sched.user_id,
-                    Notification.message.like(f"%{sched.subject}%")
-                ).delete(synchronize_session=False)
-                db.session.commit()
-                print(f"    🗑️ Class passed, cleaned up old notifications")
+        # Only the head of the queue is inspected; nothing due means no further work
+        due = fire_queue.pop_due(now + timedelta(seconds=_FIRE_THRESHOLD))
+        if not due:
+            return
+        metrics.schedules_evaluated.inc(len(due))
+
+        print(f"\n[SCHEDULER] {len(due)} due alarm(s) at {now.strftime('%H:%M:%S')} ({len(fire_queue)} queued)")
+
+        schedule_ids = {schedule_id for schedule_id, _, _ in due}
+        schedules = {s.id: s for s in _with_user_zone(Schedule.query.filter(Schedule.id.in_(schedule_ids))).all()}
+
+        alarms = []
+        for schedule_id, seconds_before, fire_at in due:
+            sched = schedules.get(schedule_id)
+            if not _is_active(sched):
+                # Deleted, disabled or archived elsewhere; drop it from the queue for good
                 continue
-            
-            # Determine notification times based on fixed offsets (in seconds)
-            notification_times = []
-            # Standard targets: 1 hour, 30 minutes, and start
-            targets = [3600, 1800, 0]
-            # Include custom alarm offset if provided (in minutes)
-            try:
-                custom_offset = int(sched.alarm_offset_minutes) if sched.alarm_offset_minutes is not None else None
-            except Exception:
-                custom_offset = None
-            if custom_offset is not None and custom_offset not in (60, 30):
-                # convert minutes to seconds
-                targets.append(custom_offset * 60)
-
-            # Threshold is half the check interval (we will run every 5 seconds)
-            threshold = 4  # seconds
-            today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
-
-            for t in targets:
-                # Check if delta_seconds is within threshold of target t
-                if abs(delta_seconds - t) <= threshold:
-                    # Build message depending on t
-                    if t == 0:
-                        msg = f"🔔 CLASS STARTING NOW: {sched.subject} at {sched.time}"
-                        ntype = 'warning'
-                    elif t == 1800:
-                        msg = f"⏰ Class in 30 minutes: {sched.subject} at {sched.time}"
-                        ntype = 'info'
-                    elif t == 3600:
-                        msg = f"⏰ Class in 1 hour: {sched.subject} at {sched.time}"
-                        ntype = 'info'
-                    else:
-                        mins = int(t / 60)
-                        msg = f"⏰ Class in {mins} minutes: {sched.subject} at {sched.time}"
-                        ntype = 'info'
-
-                    # Ensure we didn't already send this exact message today
-                    existing = Notification.query.filter(
-                        Notification.user_id == sched.user_id,
-                        Notification.message == msg,
-                        Notification.timestamp >= today_start
-                    ).first()
-
-                    if not existing:
-                        notification_times.append({'message': msg, 'type': ntype})
-            
-            # Send notifications
-            for notif_data in notification_times:
-                # Create notification
-                notification = Notification(
-                    user_id=sched.user_id,
-                    message=notif_data['message'],
-                    notification_type=notif_data['type']
-                )
-                db.session.add(notification)
-                db.session.commit()
-                
-                # Emit socket event for real-time notification
-                try:
-                    _socketio.emit('new_notification', {
-                        'user_id': sched.user_id,
-                        'message': notif_data['message'],
-                        'type': notif_data['type']
-                    })
-                except Exception:
-                    pass  # Socket might not be connected
+
+            lateness = (now - fire_at).total_seconds()
+            if lateness > _MAX_FIRE_LATENESS:
+                print(f"  ⏭️ Skipping {sched.subject} ({seconds_before}s) - {lateness:.0f}s late")
+            else:
+                alarms.append((sched, seconds_before, _occurrence_date(sched, fire_at, seconds_before), fire_at))
+
+            # Queue the following occurrence of this offset
+            _queue_offset(sched, seconds_before, fire_at + timedelta(seconds=1))
+
+        delivered = _dispatch_alarms(alarms, 'tick')
+        db.session.commit()
+
+        print(f"  ✓ {len(delivered)} notification(s) {'queued' if _queue_mode() else 'created'}, "
+              f"{len(alarms) - len(delivered)} already claimed, "
+              f"{stats['queries']} queries")
+
+
+def purge_expired_notifications():
+    """Scheduler job: apply the notification retention policy (see app/retention.py)."""
+    if not _app:
+        return
+
+    from app.retention import run_retention
+
+    with _app.app_context():
+        try:
+            run_retention(_app.config)
+        except Exception:
+            traceback.print_exc()
+
+
+def archive_ended_terms():
+    """Scheduler job: archive schedules whose academic term is not in session (see app/terms.py)."""
+    if not _app:
+        return
+
+    from app.terms import run_rollover
+
+    with _app.app_context():
+        try:
+            run_rollover()
+        except Exception:
+            traceback.print_exc()
 
 
 def start_scheduler(app, socketio):
-    """Start the background scheduler."""
+    """Start the background scheduler, or compete for leadership when the lease is enabled.
+
+    With SCHEDULER_LEASE_ENABLED, only the process holding the `scheduler_leases` row runs
+    jobs and the fire queue; the others stay passive and take over if its heartbeat stops.
+    """
     global _app, _socketio
     _app = app
     _socketio = socketio
-    
+
+    # In queue mode every process delivers, leader or not
+    if _queue_mode():
+        alarm_consumer.start(app)
+
+    if not app.config.get('SCHEDULER_LEASE_ENABLED', True):
+        _start_engine(app)
+        return
+
+    scheduler_lease.start(app, on_acquired=_on_leadership_acquired, on_lost=_on_leadership_lost)
+    print(f"✓ Scheduler lease started for {scheduler_lease.holder} (passive until acquired)")
+
+
+def _on_leadership_acquired():
+    if scheduler.running:
+        # Re-acquired after losing it: catch up on alarms and changes made while passive
+        with _app.app_context():
+            _recover_missed_alarms(_app)
+            _rebuild_fire_queue()
+            reconcile_jobs()
+        scheduler.resume()
+        print("✓ Background scheduler resumed")
+    else:
+        _start_engine(_app)
+
+
+def _recover_missed_alarms(app):
+    """Run the missed-alarm recovery pass (app/recovery.py) if enabled. Call inside an app context."""
+    if not app.config.get('RECOVERY_ENABLED', True):
+        return
+    from app.recovery import recover_missed_alarms
+
+    try:
+        recover_missed_alarms(app.config)
+    except Exception:
+        traceback.print_exc()
+
+
+def _touch_checkpoint(now: datetime):
+    """Record that the tick ran, at most every _CHECKPOINT_INTERVAL seconds (bounds recovery windows)."""
+    global _checkpoint_written
+    if _checkpoint_written is not None and (now - _checkpoint_written).total_seconds() < _CHECKPOINT_INTERVAL:
+        return
+    from app.recovery import write_checkpoint
+
+    write_checkpoint(now)
+    _checkpoint_written = now
+
+
+def _on_leadership_lost():
+    if scheduler.running:
+        scheduler.pause()
+        print("⏸️ Background scheduler paused - another process holds the lease")
+
+
+def _start_engine(app):
+    """Configure and start APScheduler, load the fire queue and reconcile jobs."""
     if not scheduler.running:
-        # Try to configure a persistent jobstore using the application's DB URI.
-        try:
-            db_uri = app.config.get('SQLALCHEMY_DATABASE_URI')
-            if db_uri and 'default' not in getattr(scheduler, '_jobstores', {}):
-                scheduler.add_jobstore(SQLAlchemyJobStore(url=db_uri), 'default')
-                print(f"✓ APScheduler jobstore configured with: {db_uri}")
-        except Exception:
-            traceback.print_exc()
+        _configure_executors(app)
+        _configure_jobstore(app)
 
         # Interval fallback to catch missed events and support demo/serverless setups.
         scheduler.add_job(
             func=check_and_send_notifications,
             trigger="interval",
-            seconds=5,  # Check every 5 seconds for alarm-like precision
+            seconds=_INTERVAL_JOBS['class_notifications'],  # Check every 5 seconds for alarm-like precision
             id='class_notifications',
             name='Check and send class notifications',
             replace_existing=True
         )
 
+        # Expired notifications are purged in chunks on their own low-frequency job
+        _INTERVAL_JOBS['notification_retention'] = app.config.get('NOTIFICATION_RETENTION_INTERVAL', 600)
+        scheduler.add_job(
+            func=purge_expired_notifications,
+            trigger="interval",
+            seconds=_INTERVAL_JOBS['notification_retention'],
+            id='notification_retention',
+            name='Purge expired notifications',
+            replace_existing=True
+        )
+
+        # Schedules of academic terms not in session (ended or upcoming) are archived out of the working set
+        _INTERVAL_JOBS['term_rollover'] = app.config.get('TERM_ROLLOVER_INTERVAL', 3600)
+        scheduler.add_job(
+            func=archive_ended_terms,
+            trigger="interval",
+            seconds=_INTERVAL_JOBS['term_rollover'],
+            id='term_rollover',
+            name='Archive schedules of terms not in session',
+            replace_existing=True
+        )
+
+        # The computed fire queue is snapshotted to disk so the next start can skip recomputing it
+        if _snapshot_path():
+            _INTERVAL_JOBS['plan_snapshot'] = app.config.get('SCHEDULER_SNAPSHOT_INTERVAL', 300)
+            scheduler.add_job(
+                func=write_plan_snapshot,
+                trigger="interval",
+                seconds=_INTERVAL_JOBS['plan_snapshot'],
+                id='plan_snapshot',
+                name='Snapshot the alarm plan',
+                replace_existing=True
+            )
+
+        # Stats and leader-only metrics are persisted for the processes not running the scheduler
+        _INTERVAL_JOBS['scheduler_report'] = app.config.get('SCHEDULER_REPORT_INTERVAL', 15)
+        scheduler.add_job(
+            func=write_report,
+            trigger="interval",
+            seconds=_INTERVAL_JOBS['scheduler_report'],
+            id='scheduler_report',
+            name='Persist scheduler stats and metrics',
+            replace_existing=True
+        )
+
+        # Deliver what fell due while no scheduler was running, then load the fire queue
+        try:
+            with app.app_context():
+                _recover_missed_alarms(app)
+                _rebuild_fire_queue()
+        except Exception:
+            traceback.print_exc()
+
         scheduler.start()
         print("✓ Background scheduler started - checking for class notifications every 5 seconds")
 
-        # Schedule per-occurrence jobs for existing enabled schedules (if any)
+        # Bring persisted per-occurrence jobs in line with the enabled schedules (diff only)
         try:
-            from app.models import Schedule
             with app.app_context():
-                schedules = Schedule.query.filter_by(alarm_enabled=True).all()
-                for s in schedules:
-                    try:
-                        schedule_jobs_for_schedule(s)
-                    except Exception:
-                        traceback.print_exc()
+                reconcile_jobs()
+        except Exception:
+            traceback.print_exc()
+
+
+def _configure_executors(app):
+    """Apply executor and job default settings from Config (scheduler must not be running).
+
+    Alarm jobs run on the 'alarms' executor, which may be a process pool; the interval
+    tick stays on the 'default' thread pool because the fire queue lives in this process.
+    """
+    max_workers = app.config.get('SCHEDULER_MAX_WORKERS', 20)
+    if app.config.get('SCHEDULER_EXECUTOR') == 'processpool':
+        alarms_executor = ProcessPoolExecutor(max_workers, pool_kwargs={'initializer': _init_process_worker})
+    else:
+        alarms_executor = ThreadPoolExecutor(max_workers)
+
+    scheduler.configure(
+        executors={
+            'default': ThreadPoolExecutor(max_workers),
+            ALARM_EXECUTOR: alarms_executor,
+        },
+        job_defaults=_job_defaults(app)
+    )
+    scheduler.add_listener(
+        _on_job_event,
+        EVENT_JOB_SUBMITTED | EVENT_JOB_EXECUTED | EVENT_JOB_ERROR | EVENT_JOB_MISSED | EVENT_JOB_MAX_INSTANCES
+    )
+
+
+def _job_defaults(app):
+    """APScheduler job defaults (coalescing, instances, misfire grace) from Config."""
+    return {
+        'coalesce': bool(app.config.get('SCHEDULER_COALESCE', True)),
+        'max_instances': int(app.config.get('SCHEDULER_MAX_INSTANCES', 3)),
+        'misfire_grace_time': int(app.config.get('SCHEDULER_MISFIRE_GRACE_TIME', 30)),
+    }
+
+
+def _init_process_worker():
+    """ProcessPoolExecutor initializer: give the child process its own app and DB connections.
+
+    Children have no Socket.IO server of their own, so their alarms go through the outbox.
+    """
+    global _app, _socketio
+    if _app is not None:
+        # Forked: the inherited pool's connections and Socket.IO server belong to the parent
+        _socketio = None
+        from app import db
+        with _app.app_context():
+            db.engine.dispose(close=False)
+        return
+
+    # Spawned: config was imported with the parent's environment, so override it explicitly
+    from app import create_app
+    from config import WorkerConfig
+    _app = create_app(WorkerConfig)
+
+
+def _on_job_event(event):
+    """Maintain scheduler_stats from APScheduler job events."""
+    with _stats_lock:
+        if event.code == EVENT_JOB_SUBMITTED:
+            scheduler_stats['submitted'] += 1
+            interval = _INTERVAL_JOBS.get(event.job_id)
+            if interval and event.scheduled_run_times:
+                # Run times between the previous submission and this one were coalesced away
+                previous = _last_submitted.get(event.job_id)
+                if previous is not None:
+                    gap = (event.scheduled_run_times[0] - previous).total_seconds()
+                    scheduler_stats['coalesced'] += max(0, round(gap / interval) - 1)
+                _last_submitted[event.job_id] = event.scheduled_run_times[-1]
+        elif event.code in (EVENT_JOB_EXECUTED, EVENT_JOB_ERROR):
+            scheduler_stats['finished'] += 1
+            if event.code == EVENT_JOB_ERROR:
+                scheduler_stats['errors'] += 1
+        elif event.code == EVENT_JOB_MISSED:
+            scheduler_stats['misfired'] += 1
+        elif event.code == EVENT_JOB_MAX_INSTANCES:
+            scheduler_stats['max_instances_skipped'] += 1
+
+
+def get_scheduler_stats():
+    """Snapshot of the job counters, including jobs currently queued or running in executors."""
+    with _stats_lock:
+        stats = dict(scheduler_stats)
+    stats['queued'] = stats['submitted'] - stats['finished']
+
+    from app import recovery, retention
+    stats['retention'] = dict(retention.last_run)
+    stats['recovery'] = dict(recovery.last_run)
+    stats['snapshot'] = {'written': dict(plan_snapshot.last_write), 'loaded': dict(plan_snapshot.last_load)}
+    stats['alarm_queue'] = dict(alarm_queue.last_batch)
+    stats['outbox'] = dict(outbox.last_drain)
+    return stats
+
+
+def collect_metrics():
+    """Refresh the scrape-time gauges in app.metrics (jobstore size, queue depth, job events)."""
+    metrics.fire_queue_entries.set(len(fire_queue))
+    for name, value in get_scheduler_stats().items():
+        if isinstance(value, int):
+            metrics.job_events.set(value, name)
+
+    from app import db
+
+    for alias, store in getattr(scheduler, '_jobstores', {}).items():
+        if not hasattr(store, 'jobs_t'):
+            continue
+        try:
+            with store.engine.connect() as connection:
+                count = connection.execute(select(db.func.count()).select_from(store.jobs_t)).scalar()
+            metrics.jobstore_jobs.set(count, alias)
+        except Exception:
+            pass  # jobstore table not created yet; leave the gauge unset
+
+    if _queue_mode():
+        try:
+            metrics.alarm_queue_depth.set(alarm_queue.depth())
         except Exception:
-            # models may not be available in some contexts
-            pass
+            db.session.rollback()
+    if _outbox_mode():
+        try:
+            metrics.outbox_depth.set(outbox.depth())
+        except Exception:
+            db.session.rollback()
+
+
+def write_report():
+    """Job handler: persist this (leading) process's stats and leader-only metrics to `scheduler_reports`."""
+    if not _app:
+        return
+    from app import db
+    from app.models import SchedulerReport
+
+    with _app.app_context():
+        try:
+            text = metrics.render(collect_metrics, leader=True)
+            values = {
+                SchedulerReport.holder: scheduler_lease.holder or f"pid {os.getpid()}",
+                SchedulerReport.reported_at: datetime.utcnow(),
+                SchedulerReport.stats: get_scheduler_stats(),
+                SchedulerReport.metrics: text,
+            }
+            updated = SchedulerReport.query.filter_by(name=scheduler_lease.name).update(
+                values, synchronize_session=False
+            )
+            if not updated:
+                db.session.add(SchedulerReport(name=scheduler_lease.name, **{c.key: v for c, v in values.items()}))
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            traceback.print_exc()
+
+
+def _leader_report():
+    """The leader's persisted report, or None when this process runs the scheduler (or none exists yet)."""
+    if scheduler.state == STATE_RUNNING:
+        return None
+    from app.models import SchedulerReport
+
+    return SchedulerReport.query.get(scheduler_lease.name)
+
+
+def reported_stats():
+    """get_scheduler_stats() of the process running the scheduler (call inside an app context).
+
+    Other processes return the leader's last report, with who wrote it and how old it is.
+    """
+    report = _leader_report()
+    if report is None:
+        return get_scheduler_stats()
+    return dict(report.stats, reported_by=report.holder, reported_at=report.reported_at.isoformat(),
+                report_age_seconds=round((datetime.utcnow() - report.reported_at).total_seconds(), 1))
+
+
+def render_metrics():
+    """Prometheus text for /admin/metrics: local series, with the leader's in place of this process's own."""
+    report = _leader_report()
+    if report is None:
+        metrics.report_age.set(0)
+        return metrics.render(collect_metrics)
+    metrics.report_age.set(round((datetime.utcnow() - report.reported_at).total_seconds(), 1))
+    return metrics.render(collect_metrics, leader=False) + report.metrics
+
+
+def _configure_jobstore(app):
+    """Add the persistent jobstores for the application's DB URI (once).
+
+    Interval and minute-bucket jobs use APScheduler's pickling SQLAlchemyJobStore; with
+    SCHEDULER_JOBSTORE='compact' per-occurrence alarm jobs go to the typed AlarmJobStore.
+    Also applies the configured job defaults, which jobs written without a running
+    scheduler (_put_job, reconcile_jobs.py) are built with.
+    """
+    if not scheduler.running:
+        scheduler._job_defaults.update(_job_defaults(app))
+    try:
+        db_uri = app.config.get('SQLALCHEMY_DATABASE_URI')
+        stores = getattr(scheduler, '_jobstores', {})
+        if db_uri and 'default' not in stores:
+            scheduler.add_jobstore(SQLAlchemyJobStore(url=db_uri), 'default')
+            print(f"✓ APScheduler jobstore configured with: {db_uri}")
+        if db_uri and _compact_jobstore(app) and ALARM_JOBSTORE not in stores:
+            scheduler.add_jobstore(AlarmJobStore(url=db_uri, executor=ALARM_EXECUTOR), ALARM_JOBSTORE)
+    except Exception:
+        traceback.print_exc()
+
+
+def _compact_jobstore(app=None):
+    app = app or _app
+    return bool(app) and app.config.get('SCHEDULER_JOBSTORE', 'compact') == 'compact'
+
+
+def _store_alias_for(func):
+    """Jobstore alias a job function's jobs are kept in."""
+    return ALARM_JOBSTORE if func is _fire_notification and _compact_jobstore() else 'default'
+
+
+def _job_stores():
+    """Every configured jobstore that keeps jobs in a table (both stores expose `jobs_t` and `engine`)."""
+    return [store for store in getattr(scheduler, '_jobstores', {}).values() if hasattr(store, 'jobs_t')]
+
+
+def _desired_jobs(now: datetime):
+    """Return {job_id: (trigger, args)} for every alarm job the enabled schedules call for.
+
+    In minute-bucket mode this also rewrites `alarm_slots` (call inside an app context).
+    """
+    desired = {}
+    if _bucket_mode():
+        minutes, zones = _rebuild_slots(_scan_active_schedules())
+        desired.update(_bucket_jobs(minutes))
+        desired.update(_zone_change_jobs(zones, now))
+        return desired
+
+    for chunk in _scan_active_schedules():
+        for c in chunk:
+            next_start = c.next_start(now)
+            if not next_start:
+                continue
+            for t in c.offsets:
+                run_date = next_start - timedelta(seconds=t)
+                # don't schedule jobs in the past
+                if run_date < now - timedelta(seconds=5):
+                    continue
+                desired[_job_id_for(c.schedule_id, t)] = (_fire_notification, DateTrigger(run_date=run_date),
+                                                          [c.schedule_id, t])
+    return desired
+
 
+def _job_row(store, job_id, func, trigger, args, now: datetime):
+    """Serialize a job exactly as the store's add_job would, without writing it."""
+    next_run_time = trigger.get_next_fire_time(None, now)
+    if isinstance(store, AlarmJobStore):
+        return store.row(job_id, args[0], args[1], trigger.run_date, next_run_time)
 
-def schedule_jobs_for_schedule(schedule):
+    job = Job(scheduler, id=job_id, func=func, trigger=trigger, executor=ALARM_EXECUTOR, args=tuple(args), kwargs={},
+              next_run_time=next_run_time, **scheduler._job_defaults)
+    return {
+        'id': job.id,
+        'next_run_time': datetime_to_utc_timestamp(job.next_run_time),
+        'job_state': pickle.dumps(job.__getstate__(), store.pickle_protocol),
+    }
+
+
+def _put_job(job_id, func, trigger, args):
+    """Add or replace an alarm job on the alarms executor.
+
+    When this process's scheduler is not running (process-pool children, tools), the job is
+    written straight to the SQLAlchemy jobstore instead of being held pending in memory.
+    """
+    alias = _store_alias_for(func)
+    if scheduler.running:
+        scheduler.add_job(func=func, trigger=trigger, args=args, id=job_id, executor=ALARM_EXECUTOR,
+                          jobstore=alias, replace_existing=True)
+        return
+
+    _configure_jobstore(_app)
+    store = scheduler._jobstores[alias]
+    store.jobs_t.create(store.engine, checkfirst=True)
+    row = _job_row(store, job_id, func, trigger, args, clock())
+    with store.engine.begin() as connection:
+        connection.execute(store.jobs_t.delete().where(store.jobs_t.c.id == job_id))
+        connection.execute(store.jobs_t.insert(), row)
+
+
+def reconcile_jobs():
+    """Diff the persisted alarm jobs against the desired set and write only the changes.
+
+    Reads job ids and next run times from each jobstore once (no unpickling), computes the
+    desired jobs in memory, then bulk-inserts missing jobs, bulk-updates jobs whose run
+    time moved and bulk-deletes jobs no schedule needs. In the pickling store a job whose
+    pickled state differs (e.g. written under other job defaults) is updated as well.
+    Call inside an app context. Returns a dict of counts.
+    """
+    _configure_jobstore(_app)
+    stores = getattr(scheduler, '_jobstores', {})
+    if not isinstance(stores.get('default'), SQLAlchemyJobStore):
+        raise RuntimeError('reconcile_jobs requires the SQLAlchemy jobstore')
+
+    now = clock()
+    desired = _desired_jobs(now)
+    by_store = {alias: {} for alias, store in stores.items() if hasattr(store, 'jobs_t')}
+    for job_id, (func, trigger, args) in desired.items():
+        by_store[_store_alias_for(func)][job_id] = (func, trigger, args)
+
+    inserts = updates = deletes = 0
+    for alias, wanted in by_store.items():
+        store = stores[alias]
+        jobs_t = store.jobs_t
+        jobs_t.create(store.engine, checkfirst=True)
+        managed = or_(*(jobs_t.c.id.like(prefix + '\\_%', escape='\\') for prefix in ('sched', 'minute', 'zone_change')))
+        pickled = 'job_state' in jobs_t.c
+        columns = [jobs_t.c.id, jobs_t.c.next_run_time] + ([jobs_t.c.job_state] if pickled else [])
+        with store.engine.begin() as connection:
+            existing = {row[0]: row[1:] for row in connection.execute(select(*columns).where(managed))}
+
+        store_inserts, store_updates = [], []
+        for job_id, (func, trigger, args) in wanted.items():
+            if job_id not in existing:
+                store_inserts.append(_job_row(store, job_id, func, trigger, args, now))
+                continue
+            expected = datetime_to_utc_timestamp(trigger.get_next_fire_time(None, now))
+            stored_time = existing[job_id][0]
+            row = None
+            if stored_time is None or abs(stored_time - expected) > 0.5:
+                row = _job_row(store, job_id, func, trigger, args, now)
+            elif pickled:
+                # Compared as bytes; nothing is unpickled
+                row = _job_row(store, job_id, func, trigger, args, now)
+                if row['job_state'] == existing[job_id][1]:
+                    row = None
+            if row is not None:
+                row['_id'] = row.pop('id')
+                store_updates.append(row)
+        # Jobs no schedule needs, including ones left in this store by a SCHEDULER_JOBSTORE switch
+        store_deletes = [job_id for job_id in existing if job_id not in wanted]
+
+        with store.engine.begin() as connection:
+            if store_inserts:
+                connection.execute(jobs_t.insert(), store_inserts)
+            if store_updates:
+                columns = [name for name in store_updates[0] if name != '_id']
+                connection.execute(
+                    jobs_t.update().where(jobs_t.c.id == bindparam('_id')).values(
+                        **{name: bindparam(name) for name in columns}
+                    ),
+                    store_updates
+                )
+            for i in range(0, len(store_deletes), 500):
+                connection.execute(jobs_t.delete().where(jobs_t.c.id.in_(store_deletes[i:i + 500])))
+        inserts += len(store_inserts)
+        updates += len(store_updates)
+        deletes += len(store_deletes)
+
+    # Refresh the per-process job indexes from the desired set
+    _job_offsets.clear()
+    _bucket_minutes.clear()
+    for func, trigger, args in desired.values():
+        if func is _fire_notification:
+            _job_offsets.setdefault(args[0], set()).add(args[1])
+        elif func is _fire_minute_bucket:
+            _bucket_minutes.add(args[0])
+
+    if scheduler.running:
+        scheduler.wakeup()
+
+    counts = {
+        'inserted': inserts,
+        'updated': updates,
+        'deleted': deletes,
+        'unchanged': len(desired) - inserts - updates,
+    }
+    print("✓ Jobs reconciled: {inserted} inserted, {updated} updated, {deleted} deleted, "
+          "{unchanged} unchanged".format(**counts))
+    return counts
+
+
+def schedule_jobs_for_schedule(schedule, requeue: bool = True):
     """Create per-occurrence DateTrigger jobs for the next matching occurrence of a schedule.
 
     This schedules jobs for the standard targets: 1 hour (3600s), 30 minutes (1800s), start (0s),
     and any custom `alarm_offset_minutes` configured on the schedule (if provided and not duplicate).
+    The schedule's entries in the in-memory fire queue are refreshed as well unless
+    `requeue` is False (startup, where the queue was just rebuilt).
     """
     if not schedule or not getattr(schedule, 'id', None):
         return
 
     try:
-        now = datetime.now(timezone.utc)
+        now = clock()
+        if requeue:
+            queue_schedule(schedule, now)
+        if _bucket_mode():
+            _write_slots(schedule)
+            return
+        if schedule.archived_at is not None:
+            return
         next_start = _next_start_datetime_for_schedule(schedule, now)
         if not next_start:
             return
 
-        # Standard targets
-        targets = [3600, 1800, 0]
-        try:
-            custom_offset = int(schedule.alarm_offset_minutes) if schedule.alarm_offset_minutes is not None else None
-        except Exception:
-            custom_offset = None
-        if custom_offset is not None and custom_offset * 60 not in targets:
-            targets.append(custom_offset * 60)
-
-        for t in targets:
+        for t in compile_schedule(schedule).offsets:
             run_date = next_start - timedelta(seconds=t)
             # don't schedule jobs in the past
             if run_date < now - timedelta(seconds=5):
@@ -370,13 +1234,8 @@ def schedule_jobs_for_schedule(schedule):
 
             job_id = _job_id_for(schedule.id, t)
             try:
-                scheduler.add_job(
-                    func=_fire_notification,
-                    trigger=DateTrigger(run_date=run_date),
-                    args=[schedule.id, t],
-                    id=job_id,
-                    replace_existing=True
-                )
+                _put_job(job_id, _fire_notification, DateTrigger(run_date=run_date), [schedule.id, t])
+                _job_offsets.setdefault(schedule.id, set()).add(t)
                 print(f"Scheduled job {job_id} at {run_date} for schedule {schedule.id}")
             except Exception:
                 traceback.print_exc()
@@ -384,27 +1243,265 @@ def schedule_jobs_for_schedule(schedule):
         traceback.print_exc()
 
 
+def _job_ids_for_schedule(schedule_id: int):
+    """Every job id a schedule may own, derived from its known offsets instead of listing the jobstore."""
+    offsets = {3600, 1800, 0} | _job_offsets.get(schedule_id, set())
+    compiled = cached_schedule(schedule_id)
+    if compiled is not None:
+        offsets.update(compiled.offsets)
+    return [_job_id_for(schedule_id, t) for t in sorted(offsets)]
+
+
+def _remove_job_ids(job_ids):
+    """Delete jobs by id, in one statement per table-backed jobstore; unknown ids are ignored."""
+    job_ids = list(job_ids)
+    if not job_ids:
+        return
+    if not scheduler.running:
+        # Alarm jobs are written straight to the jobstore when the scheduler is not running
+        _configure_jobstore(_app)
+    for store in list(getattr(scheduler, '_jobstores', {}).values()):
+        if hasattr(store, 'jobs_t'):
+            store.jobs_t.create(store.engine, checkfirst=True)
+            with store.engine.begin() as connection:
+                connection.execute(store.jobs_t.delete().where(store.jobs_t.c.id.in_(job_ids)))
+        else:
+            for job_id in job_ids:
+                try:
+                    store.remove_job(job_id)
+                except JobLookupError:
+                    pass
+
+
+def remove_jobs_for_schedules(schedule_ids):
+    """Remove scheduled jobs, queued fires and alarm slots of many schedules at once.
+
+    Used for bulk deletions (e.g. a user deleting their account); touches only those
+    schedules' jobs, never the whole jobstore.
+    """
+    schedule_ids = [sid for sid in schedule_ids if sid]
+    if not schedule_ids:
+        return
+
+    job_ids = []
+    for schedule_id in schedule_ids:
+        job_ids.extend(_job_ids_for_schedule(schedule_id))
+        unqueue_schedule(schedule_id)
+
+    try:
+        if _bucket_mode():
+            _delete_slots(schedule_ids)
+        else:
+            _remove_job_ids(job_ids)
+    except Exception:
+        traceback.print_exc()
+
+    for schedule_id in schedule_ids:
+        _job_offsets.pop(schedule_id, None)
+        evict(schedule_id)
+
+
 def remove_jobs_for_schedule(schedule_id: int):
-    """Remove any scheduled jobs associated with a schedule id."""
+    """Remove any scheduled jobs and queued fires associated with a schedule id."""
     if not schedule_id:
         return
+    remove_jobs_for_schedules([schedule_id])
+    print(f"Removed jobs for schedule {schedule_id}")
+
+
+def _bucket_mode():
+    return bool(_app) and _app.config.get('SCHEDULER_JOB_MODE') == 'minute_bucket'
+
+
+def _bucket_job_id(minute_of_week: int):
+    return f"minute_{int(minute_of_week)}"
+
+
+def _zone_change_job_id(ts: int):
+    return f"zone_change_{int(ts)}"
 
+
+def _slot_rows(compiled_schedules, now: datetime):
+    """alarm_slots rows for compiled schedules, with minutes converted to UTC at each owner's offset at `now`.
+
+    Slots follow the offset in effect when written; a `zone_change_*` job (see
+    _zone_change_jobs) rewrites them when an owner's zone changes its offset.
+    """
+    now_ts = int(now.timestamp())
+    return [
+        {'schedule_id': c.schedule_id, 'offset_seconds': offset, 'minute_of_week': minute}
+        for c in compiled_schedules
+        for offset, minute in c.fire_minutes(zone_table(c.tz_name, now_ts).offset_at(now_ts) // 60)
+    ]
+
+
+def _bucket_jobs(minutes):
+    """{job_id: (func, trigger, args)} of the weekly CronTrigger jobs for fire minutes."""
+    jobs = {}
+    for minute_of_week in minutes:
+        day, minute_of_day = divmod(minute_of_week, 1440)
+        trigger = CronTrigger(day_of_week=day, hour=minute_of_day // 60, minute=minute_of_day % 60,
+                              timezone=timezone.utc)
+        jobs[_bucket_job_id(minute_of_week)] = (_fire_minute_bucket, trigger, [minute_of_week])
+    return jobs
+
+
+def _zone_change_jobs(tz_names, now: datetime):
+    """{job_id: (func, trigger, args)} of one slot refresh at the next offset change of each zone."""
+    now_ts = int(now.timestamp())
+    changes = {zone_table(name, now_ts).next_change(now_ts) for name in tz_names}
+    return {
+        _zone_change_job_id(ts): (_refresh_zone_slots, DateTrigger(run_date=datetime.fromtimestamp(ts, timezone.utc)), [])
+        for ts in changes if ts is not None
+    }
+
+
+def _ensure_jobs(jobs):
+    """Create the jobs of a {job_id: (func, trigger, args)} dict that the default jobstore does not hold."""
+    if not jobs:
+        return
+    _configure_jobstore(_app)
+    store = scheduler._jobstores['default']
+    store.jobs_t.create(store.engine, checkfirst=True)
+    with store.engine.begin() as connection:
+        stored = set(connection.execute(select(store.jobs_t.c.id).where(store.jobs_t.c.id.in_(list(jobs)))).scalars())
+    for job_id, (func, trigger, args) in sorted(jobs.items()):
+        try:
+            if job_id not in stored:
+                _put_job(job_id, func, trigger, args)
+            if func is _fire_minute_bucket:
+                _bucket_minutes.add(args[0])
+        except Exception:
+            traceback.print_exc()
+
+
+def _remove_empty_buckets(minutes):
+    """Remove the bucket jobs of fire minutes no alarm_slots row uses any more."""
+    from app import db
+    from app.models import AlarmSlot
+
+    minutes = set(minutes)
+    if not minutes:
+        return
+    used = set(db.session.execute(
+        db.select(AlarmSlot.minute_of_week).where(AlarmSlot.minute_of_week.in_(minutes)).distinct()
+    ).scalars())
+    db.session.commit()
+    empty = minutes - used
+    if empty:
+        _remove_job_ids([_bucket_job_id(minute_of_week) for minute_of_week in sorted(empty)])
+        _bucket_minutes.difference_update(empty)
+
+
+def _write_slots(schedule):
+    """Replace the alarm_slots rows of one schedule and keep the bucket and zone-change jobs in step.
+
+    Jobstores are checked rather than this process's `_bucket_minutes`, since another
+    process may have removed a bucket job this one created.
+    """
+    from app import db
+    from app.models import AlarmSlot
+
+    old = set(db.session.execute(
+        db.delete(AlarmSlot).where(AlarmSlot.schedule_id == schedule.id).returning(AlarmSlot.minute_of_week)
+    ).scalars())
+    now = clock()
+    compiled = compile_schedule(schedule)
+    rows = _slot_rows([compiled], now) if _is_active(schedule) else []
+    if rows:
+        db.session.execute(db.insert(AlarmSlot), rows)
+    db.session.commit()
+    minutes = {row['minute_of_week'] for row in rows}
+    _ensure_jobs({**_bucket_jobs(minutes), **(_zone_change_jobs([compiled.tz_name], now) if rows else {})})
+    _remove_empty_buckets(old - minutes)
+
+
+def _delete_slots(schedule_ids):
+    from app import db
+    from app.models import AlarmSlot
+
+    old = set(db.session.execute(
+        db.delete(AlarmSlot).where(AlarmSlot.schedule_id.in_(schedule_ids)).returning(AlarmSlot.minute_of_week)
+    ).scalars())
+    db.session.commit()
+    _remove_empty_buckets(old)
+
+
+def _rebuild_slots(chunks):
+    """Rewrite alarm_slots from chunks of compiled schedules in one transaction.
+
+    Returns the fire minutes and the owners' zone names.
+    """
+    from app import db
+    from app.models import AlarmSlot
+
+    now = clock()
+    AlarmSlot.query.delete(synchronize_session=False)
+    count = 0
+    minutes, zones = set(), set()
+    for chunk in chunks:
+        rows = _slot_rows(chunk, now)
+        if rows:
+            db.session.execute(db.insert(AlarmSlot), rows)
+        count += len(rows)
+        minutes.update(row['minute_of_week'] for row in rows)
+        zones.update(c.tz_name for c in chunk)
+    db.session.commit()
+    print(f"✓ Minute-bucket mode: {count} alarm slots in {len(minutes)} weekly jobs")
+    return minutes, zones
+
+
+def _refresh_zone_slots():
+    """Job handler: an owner's zone changed its UTC offset (DST), so rewrite the slots at the new offsets."""
     try:
-        # Remove jobs by id pattern
-        jobs = list(scheduler.get_jobs())
-        for j in jobs:
-            if str(j.id).startswith(f"sched_{schedule_id}_"):
-                try:
-                    scheduler.remove_job(j.id)
-                    print(f"Removed job {j.id} for schedule {schedule_id}")
-                except Exception:
-                    traceback.print_exc()
+        if not _app or not _bucket_mode():
+            return
+        with _app.app_context():
+            reconcile_jobs()
+    except Exception:
+        traceback.print_exc()
+
+
+def _fire_minute_bucket(minute_of_week: int):
+    """Job handler: deliver every (schedule, offset) slot due in one minute of the week."""
+    try:
+        from app import db
+        from app.models import Schedule, AlarmSlot
+        if not _app:
+            return
+
+        with _app.app_context():
+            now = clock()
+            # The instant this bucket stands for: its most recent occurrence at or before now
+            week_start = (now - timedelta(days=now.weekday())).replace(hour=0, minute=0, second=0, microsecond=0)
+            fire_at = week_start + timedelta(minutes=minute_of_week)
+            if fire_at > now + timedelta(seconds=_FIRE_THRESHOLD):
+                fire_at -= timedelta(days=7)
+
+            rows = _with_user_zone(db.session.query(Schedule, AlarmSlot.offset_seconds).join(
+                AlarmSlot, AlarmSlot.schedule_id == Schedule.id
+            ).filter(
+                AlarmSlot.minute_of_week == minute_of_week,
+                Schedule.alarm_enabled.is_(True),
+                Schedule.archived_at.is_(None)
+            )).all()
+            metrics.schedules_evaluated.inc(len(rows))
+            delivered = _dispatch_alarms([
+                (sched, seconds_before, _occurrence_date(sched, fire_at, seconds_before), fire_at)
+                for sched, seconds_before in rows
+            ], 'bucket')
+            if rows:
+                print(f"[SCHEDULER] Minute bucket {minute_of_week}: {len(rows)} slot(s), {len(delivered)} delivered")
     except Exception:
         traceback.print_exc()
 
 
 def stop_scheduler():
-    """Stop the background scheduler."""
+    """Stop the background scheduler and hand the lease over."""
     if scheduler.running:
         scheduler.shutdown()
+        write_plan_snapshot()
         print("✓ Background scheduler stopped")
+    if scheduler_lease.running:
+        scheduler_lease.stop()
+    alarm_consumer.stop()
@@ -0,0 +1,130 @@
+"""
+Idempotent schema upgrades for existing databases
+
+`db.create_all()` creates missing tables but never alters existing ones, and there are no
+Alembic migrations. `upgrade()` runs right after it in `create_app` and brings a database
+created by an older version up to the models: it adds the columns listed in COLUMNS
+(filling them in for existing rows through BACKFILL), drops the superseded indexes in
+DROPPED_INDEXES and creates the indexes listed in INDEXES, each only when the inspector
+shows it is needed, so running it on every start is a no-op once applied.
+`python upgrade_db.py` runs it by hand (e.g. before rolling out several processes at once).
+"""
+
+from sqlalchemy import false, func, inspect, select, text
+from sqlalchemy.schema import CreateColumn
+
+# Columns added to tables that existed before them: (table, column)
+COLUMNS = [
+    ('users', 'timezone'),
+    ('users', 'unread_notifications'),
+    ('schedules', 'archived_at'),
+    ('notification_outbox', 'claimed_until'),
+    ('notification_outbox', 'claimed_by'),
+    ('notifications_archive', 'original_id'),
+]
+
+# Indexes added to tables that existed before them: (table, index name)
+INDEXES = [
+    ('schedules', 'ix_schedules_updated_at'),
+    ('schedules', 'ix_schedules_alarm_active'),
+    ('schedules', 'ix_schedules_term'),
+    ('notifications', 'ix_notifications_type_timestamp'),
+    ('notifications', 'ix_notifications_user_timestamp_id'),
+    ('notifications', 'ix_notifications_unread_user_id'),
+]
+
+# Indexes later replaced under another name, dropped when still present: (table, index name)
+DROPPED_INDEXES = [
+    # Its predicate did not match the `is_read = false` the queries filter with
+    ('notifications', 'ix_notifications_unread'),
+]
+
+
+def _archive_surrogate_ids(connection):
+    """notifications_archive.id used to be the original notification id, with no sequence."""
+    connection.execute(text("UPDATE notifications_archive SET original_id = id"))
+    if connection.dialect.name == 'postgresql':
+        # SQLite assigns INTEGER PRIMARY KEY values itself; Postgres needs a sequence default
+        connection.execute(text("CREATE SEQUENCE IF NOT EXISTS notifications_archive_id_seq "
+                                "OWNED BY notifications_archive.id"))
+        connection.execute(text("SELECT setval('notifications_archive_id_seq', "
+                                "COALESCE(MAX(id), 0) + 1, false) FROM notifications_archive"))
+        connection.execute(text("ALTER TABLE notifications_archive ALTER COLUMN id "
+                                "SET DEFAULT nextval('notifications_archive_id_seq')"))
+
+
+def _count_unread(connection):
+    """Same as unread.recount(), on the upgrade's connection."""
+    from app import db
+
+    users, notifications = db.metadata.tables['users'], db.metadata.tables['notifications']
+    unread = select(func.count()).where(
+        notifications.c.user_id == users.c.id, notifications.c.is_read == false()
+    ).scalar_subquery()
+    connection.execute(users.update().values(unread_notifications=unread, updated_at=users.c.updated_at))
+
+
+# Run in the same transaction as adding the column, to fill it in for existing rows
+BACKFILL = {
+    ('users', 'unread_notifications'): _count_unread,
+    ('notifications_archive', 'original_id'): _archive_surrogate_ids,
+}
+
+
+def _add_column(connection, table, column):
+    preparer = connection.dialect.identifier_preparer
+    ddl = CreateColumn(column).compile(dialect=connection.dialect)
+    connection.execute(text(f"ALTER TABLE {preparer.format_table(table)} ADD COLUMN {ddl}"))
+
+
+def upgrade():
+    """Apply whatever COLUMNS, DROPPED_INDEXES and INDEXES still need (call inside an app context). Returns the names applied."""
+    from app import db
+
+    applied = []
+    inspector = inspect(db.engine)
+    tables = set(inspector.get_table_names())
+    for table_name, column_name in COLUMNS:
+        if table_name not in tables:
+            continue  # created complete by create_all
+        if column_name in {c['name'] for c in inspector.get_columns(table_name)}:
+            continue
+        table = db.metadata.tables[table_name]
+        try:
+            with db.engine.begin() as connection:
+                _add_column(connection, table, table.c[column_name])
+                if (table_name, column_name) in BACKFILL:
+                    BACKFILL[table_name, column_name](connection)
+            applied.append(f"{table_name}.{column_name}")
+        except Exception as e:
+            # Another process starting at the same time may have added it first
+            print(f"⚠️ Could not add column {table_name}.{column_name}: {e}")
+
+    for table_name, index_name in DROPPED_INDEXES:
+        if table_name not in tables:
+            continue
+        if index_name not in {ix['name'] for ix in inspector.get_indexes(table_name)}:
+            continue
+        try:
+            with db.engine.begin() as connection:
+                connection.execute(text(f"DROP INDEX {connection.dialect.identifier_preparer.quote(index_name)}"))
+            applied.append(f"-{index_name}")
+        except Exception as e:
+            print(f"⚠️ Could not drop index {index_name}: {e}")
+
+    for table_name, index_name in INDEXES:
+        if table_name not in tables:
+            continue
+        if index_name in {ix['name'] for ix in inspector.get_indexes(table_name)}:
+            continue
+        index = next(ix for ix in db.metadata.tables[table_name].indexes if ix.name == index_name)
+        try:
+            with db.engine.begin() as connection:
+                index.create(connection, checkfirst=True)
+            applied.append(index_name)
+        except Exception as e:
+            print(f"⚠️ Could not create index {index_name}: {e}")
+
+    if applied:
+        print(f"✓ Schema upgraded: {', '.join(applied)}")
+    return applied
@@ -2,14 +2,17 @@ from flask import render_template, redirect, url_for, request, flash
 from flask_login import login_required, current_user, logout_user
 from app.settings import bp
 from app import db
-from app.models import User
+from app.models import User, Schedule
+from app.scheduler import remove_jobs_for_schedules, schedule_jobs_for_schedule
+from app.utils.timezones import is_valid_zone, zone_names
+from datetime import datetime
 
 
 @bp.route('/')
 @login_required
 def view_settings():
     """Display settings page"""
-    return render_template('settings/settings.html')
+    return render_template('settings/settings.html', timezones=zone_names())
 
 
 @bp.route('/update', methods=['POST'])
@@ -19,6 +22,7 @@ def update_settings():
     username = request.form.get('username', '').strip()
     email = request.form.get('email', '').strip()
     password = request.form.get('password', '').strip()
+    tz_name = request.form.get('timezone', '').strip() or None
     
     if not username or not email:
         flash('Username and email are required.', 'danger')
@@ -38,7 +42,12 @@ def update_settings():
             flash('Email already registered.', 'danger')
             return redirect(url_for('settings.view_settings'))
     
+    if tz_name and not is_valid_zone(tz_name):
+        flash('Unknown time zone.', 'danger')
+        return redirect(url_for('settings.view_settings'))
+    
     # Update user info
+    zone_changed = tz_name != current_user.timezone
     current_user.username = username
     current_user.email = email
     
@@ -46,8 +55,22 @@ def update_settings():
     if password:
         current_user.set_password(password)
     
+    if zone_changed:
+        current_user.timezone = tz_name
+        # Bump the schedules so every scheduler process re-queues them in the new zone
+        Schedule.query.filter_by(user_id=current_user.id).update(
+            {Schedule.updated_at: datetime.utcnow()}, synchronize_session=False
+        )
+    
     db.session.commit()
     
+    if zone_changed:
+        for schedule in Schedule.query.filter_by(user_id=current_user.id, alarm_enabled=True):
+            try:
+                schedule_jobs_for_schedule(schedule)
+            except Exception:
+                pass
+    
     flash('Settings updated successfully!', 'success')
     return redirect(url_for('settings.view_settings'))
 
@@ -58,6 +81,13 @@ def delete_account():
     """Delete user account"""
     user = current_user
     
+    # Drop alarm jobs for all of the user's classes in one pass
+    try:
+        schedule_ids = [sid for (sid,) in db.session.query(Schedule.id).filter_by(user_id=user.id)]
+        remove_jobs_for_schedules(schedule_ids)
+    except Exception:
+        pass
+    
     # Log out user
     logout_user()
     
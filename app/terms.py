@@ -0,0 +1,91 @@
+"""
+Academic term rollover
+
+Schedules carry free-text `semester` / `academic_year` from the COR. An `AcademicTerm`
+row gives such a pair a date range. Only schedules of a term in session
+(starts_on <= today <= ends_on, dates in DEFAULT_TIMEZONE) are evaluated: those of a term
+that has ended or not started yet are archived in bulk (`Schedule.archived_at`), which
+drops them out of every scheduler query, so the working set stays the size of the current
+term however many past and upcoming terms are registered. Schedules are restored when
+their term starts, or when editing or removing a term puts them back in session.
+Schedules whose pair has no registered term are always evaluated.
+"""
+
+from datetime import datetime, date
+import time
+import traceback
+
+# Report of the most recent rollover
+last_run = {}
+
+
+def _terms_not_in_session(today: date):
+    from app import db
+    from app.models import AcademicTerm
+
+    return db.select(AcademicTerm.semester, AcademicTerm.academic_year).where(
+        db.or_(AcademicTerm.ends_on < today, AcademicTerm.starts_on > today)
+    )
+
+
+def _update_in_chunks(ids, values, chunk_size):
+    from app import db
+    from app.models import Schedule
+
+    for i in range(0, len(ids), chunk_size):
+        db.session.execute(db.update(Schedule).where(Schedule.id.in_(ids[i:i + chunk_size])).values(**values))
+        db.session.commit()
+
+
+def run_rollover(today: date = None, chunk_size: int = 1000):
+    """Archive schedules whose term is not in session and restore those whose term is. Call inside an app context.
+
+    Returns a report dict with the counts and time spent.
+    """
+    from app import db
+    from app.models import Schedule
+    from app.scheduler import remove_jobs_for_schedules, schedule_jobs_for_schedule, _with_user_zone
+    import app.scheduler as sched_module
+    from app.utils.timezones import get_zone
+
+    started = time.monotonic()
+    today = today or sched_module.clock().astimezone(get_zone()).date()
+    now = datetime.utcnow()
+    out_of_session = db.tuple_(Schedule.semester, Schedule.academic_year).in_(_terms_not_in_session(today))
+
+    try:
+        to_archive = db.session.execute(
+            db.select(Schedule.id).where(Schedule.archived_at.is_(None), out_of_session)
+        ).scalars().all()
+        to_restore = db.session.execute(
+            db.select(Schedule.id).where(Schedule.archived_at.isnot(None), db.not_(out_of_session))
+        ).scalars().all()
+
+        # updated_at moves too, so other scheduler processes re-sync these rows
+        _update_in_chunks(to_archive, {'archived_at': now, 'updated_at': now}, chunk_size)
+        _update_in_chunks(to_restore, {'archived_at': None, 'updated_at': now}, chunk_size)
+    except Exception:
+        traceback.print_exc()
+        db.session.rollback()
+        raise
+
+    remove_jobs_for_schedules(to_archive)
+    for i in range(0, len(to_restore), chunk_size):
+        chunk = to_restore[i:i + chunk_size]
+        for schedule in _with_user_zone(Schedule.query.filter(Schedule.id.in_(chunk))).all():
+            if schedule.alarm_enabled:
+                schedule_jobs_for_schedule(schedule)
+
+    report = {
+        'ran_at': now.isoformat(),
+        'today': today.isoformat(),
+        'archived': len(to_archive),
+        'restored': len(to_restore),
+        'seconds': round(time.monotonic() - started, 3),
+    }
+    last_run.clear()
+    last_run.update(report)
+    if to_archive or to_restore:
+        print(f"📚 Term rollover: {len(to_archive)} schedule(s) archived, {len(to_restore)} restored "
+              f"in {report['seconds']:.2f}s")
+    return report
@@ -0,0 +1,78 @@
+"""
+Denormalized unread-notification counter (`users.unread_notifications`)
+
+The navbar badge and `/notifications/unread-count` read the counter on the user row,
+which Flask-Login loads on every request anyway, so showing the badge never touches the
+notifications table. Every path that inserts notifications, marks them read or deletes
+them adjusts the counter in the same transaction: inserts through `adjust()`, reads and
+deletes through `mark_read()` / `delete_notifications()`, which use RETURNING so each
+row is counted by exactly one statement even when requests race. `recount()` rebuilds
+the counters from the table (through the partial index on unread rows) if they drift.
+"""
+
+from collections import Counter
+
+
+def adjust(deltas):
+    """Add {user_id: delta} to the users' counters in the current transaction (does not commit)."""
+    from app import db
+    from app.models import User
+
+    rows = [{'uid': user_id, 'delta': delta} for user_id, delta in deltas.items() if delta]
+    if not rows:
+        return
+    users = User.__table__
+    db.session.execute(
+        users.update().where(users.c.id == db.bindparam('uid')).values(
+            unread_notifications=users.c.unread_notifications + db.bindparam('delta'),
+            updated_at=users.c.updated_at,  # a counter change is not a profile edit
+        ),
+        rows,
+    )
+
+
+def inserted(user_ids):
+    """Count freshly inserted unread notifications, one per entry of `user_ids` (does not commit)."""
+    adjust(Counter(user_ids))
+
+
+def mark_read(condition):
+    """Mark the unread notifications matching `condition` read and decrement their counters. Returns rows changed."""
+    from app import db
+    from app.models import Notification
+
+    user_ids = db.session.execute(
+        db.update(Notification).where(condition, Notification.is_read == db.false()).values(is_read=True)
+        .returning(Notification.user_id).execution_options(synchronize_session=False)
+    ).scalars().all()
+    adjust({user_id: -count for user_id, count in Counter(user_ids).items()})
+    return len(user_ids)
+
+
+def delete_notifications(condition):
+    """Delete the notifications matching `condition`, decrementing counters for unread ones. Returns rows deleted."""
+    from app import db
+    from app.models import Notification
+
+    rows = db.session.execute(
+        db.delete(Notification).where(condition)
+        .returning(Notification.user_id, Notification.is_read).execution_options(synchronize_session=False)
+    ).all()
+    adjust({user_id: -count for user_id, count in Counter(uid for uid, is_read in rows if not is_read).items()})
+    return len(rows)
+
+
+def recount(user_ids=None):
+    """Recompute counters from the notifications table (all users, or just `user_ids`). Commits."""
+    from app import db
+    from app.models import Notification, User
+
+    unread = db.select(db.func.count(Notification.id)).where(
+        Notification.user_id == User.id, Notification.is_read == db.false()
+    ).scalar_subquery()
+    stmt = db.update(User).values(unread_notifications=unread, updated_at=User.updated_at)
+    if user_ids is not None:
+        stmt = stmt.where(User.id.in_(list(user_ids)))
+    result = db.session.execute(stmt.execution_options(synchronize_session=False))
+    db.session.commit()
+    return result.rowcount
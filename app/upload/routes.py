@@ -5,6 +5,7 @@ from app.upload import bp
 from app import db
 from app.models import UploadedFile, Schedule
 from app.utils.pdf_parser import parse_cor_pdf
+from app.scheduler import schedule_jobs_for_schedule
 import os
 
 
@@ -84,6 +85,7 @@ def upload_file():
         
         if schedules:
             added_count = 0
+            added_schedules = []
             for sched_data in schedules:
                 # Check if schedule already exists
                 existing = Schedule.query.filter_by(
@@ -106,9 +108,17 @@ def upload_file():
                         alarm_offset_minutes=30
                     )
                     db.session.add(schedule)
+                    added_schedules.append(schedule)
                     added_count += 1
             
             db.session.commit()
+
+            # Queue alarms for the imported classes
+            for schedule in added_schedules:
+                try:
+                    schedule_jobs_for_schedule(schedule)
+                except Exception:
+                    pass
             
             flash(f'File "{filename}" uploaded successfully! {added_count} schedule(s) extracted and added.', 'success')
             return redirect(url_for('schedule.view_schedules'))
@@ -0,0 +1,193 @@
+"""
+Compiled schedule representation shared by the scheduler and notification routes
+
+Parsing the free-text `Schedule.days` and `Schedule.time` fields is done once per
+schedule version: the result is a small `__slots__` object holding a weekday bitmask,
+start/end minute-of-day, the alarm offsets and the owner's time zone name, cached by
+schedule id and invalidated when the row's `updated_at` or the zone changes.
+Next-occurrence lookup is bitmask arithmetic on local wall-clock seconds, using the
+zone's precomputed offset table (app/utils/timezones.py) for UTC conversion.
+"""
+
+from datetime import datetime, timezone, time as dt_time
+from app.utils.timezones import local_timezone, zone_table  # noqa: F401 (local_timezone re-exported)
+import re
+
+DAY_BITS = {'mon': 0, 'tue': 1, 'wed': 2, 'thu': 3, 'fri': 4, 'sat': 5, 'sun': 6}
+ALL_DAYS = 0x7F
+MINUTES_PER_WEEK = 7 * 24 * 60
+
+# Same shapes strptime accepted before: "%I:%M %p" and "%I:%M%p"
+_TIME_RE = re.compile(r'^(\d{1,2}):(\d{2}) ?([AaPp][Mm])$')
+
+_cache = {}  # schedule_id -> CompiledSchedule
+
+
+def parse_minute_of_day(value: str):
+    """Return minutes since midnight for "01:00 PM" / "01:00PM", or None if unparseable."""
+    match = _TIME_RE.match((value or '').strip())
+    if not match:
+        return None
+    hour, minute = int(match.group(1)), int(match.group(2))
+    if not 1 <= hour <= 12 or minute > 59:
+        return None
+    hour %= 12
+    if match.group(3).lower() == 'pm':
+        hour += 12
+    return hour * 60 + minute
+
+
+def parse_time_range(time_str: str):
+    """Return (start_minute, end_minute) from a range string like "01:00 PM - 02:30 PM"."""
+    if not time_str:
+        return None, None
+    parts = time_str.split('-')
+    start = parse_minute_of_day(parts[0])
+    end = parse_minute_of_day(parts[1]) if len(parts) > 1 else None
+    return start, end
+
+
+def parse_weekday_mask(days: str):
+    """Return a Mon=bit0 .. Sun=bit6 mask for a days field like "Mon, Wed, Fri".
+
+    An empty or unrecognised field means every day, as before.
+    """
+    mask = 0
+    for token in (days or '').lower().replace(',', ' ').split():
+        bit = DAY_BITS.get(token[:3])
+        if bit is not None:
+            mask |= 1 << bit
+    return mask or ALL_DAYS
+
+
+def alarm_offsets(alarm_offset_minutes):
+    """Return the alarm offsets in seconds: 1 hour, 30 minutes, start, plus a distinct custom offset."""
+    targets = [3600, 1800, 0]
+    try:
+        custom_offset = int(alarm_offset_minutes) if alarm_offset_minutes is not None else None
+    except Exception:
+        custom_offset = None
+    if custom_offset is not None and custom_offset * 60 not in targets:
+        targets.append(custom_offset * 60)
+    return tuple(targets)
+
+
+def schedule_zone_name(schedule):
+    """IANA zone name of the schedule's owner, or None for the default zone.
+
+    Column rows from the scheduler's streaming scan carry it as `tz_name` instead of `user`.
+    """
+    if hasattr(schedule, 'tz_name'):
+        return schedule.tz_name or None
+    return getattr(getattr(schedule, 'user', None), 'timezone', None) or None
+
+
+class CompiledSchedule:
+    """Pre-parsed, immutable view of a Schedule row."""
+
+    __slots__ = ('schedule_id', 'updated_at', 'weekday_mask', 'start_minute', 'end_minute', 'offsets', 'tz_name')
+
+    def __init__(self, schedule_id, updated_at, weekday_mask, start_minute, end_minute, offsets, tz_name=None):
+        self.schedule_id = schedule_id
+        self.updated_at = updated_at
+        self.weekday_mask = weekday_mask
+        self.start_minute = start_minute
+        self.end_minute = end_minute
+        self.offsets = offsets
+        self.tz_name = tz_name
+
+    @classmethod
+    def from_schedule(cls, schedule, tz_name=None):
+        start_minute, end_minute = parse_time_range(schedule.time or '')
+        return cls(
+            getattr(schedule, 'id', None),
+            getattr(schedule, 'updated_at', None),
+            parse_weekday_mask(schedule.days),
+            start_minute,
+            end_minute,
+            alarm_offsets(schedule.alarm_offset_minutes),
+            tz_name,
+        )
+
+    @property
+    def zone(self):
+        """Offset table of the owner's time zone."""
+        return zone_table(self.tz_name)
+
+    @property
+    def start_time(self):
+        """Start as a `datetime.time`, or None when the time field could not be parsed."""
+        if self.start_minute is None:
+            return None
+        return dt_time(self.start_minute // 60, self.start_minute % 60)
+
+    def runs_on(self, weekday: int):
+        """True if the class meets on `weekday` (Mon=0)."""
+        return bool(self.weekday_mask >> weekday & 1)
+
+    def fire_minutes(self, utc_offset_minutes: int):
+        """Return (offset_seconds, minute_of_week) for every weekly fire, as UTC minutes from Monday 00:00."""
+        if self.start_minute is None:
+            return []
+        return [
+            (offset, (day * 1440 + self.start_minute - offset // 60 - utc_offset_minutes) % MINUTES_PER_WEEK)
+            for day in range(7) if self.weekday_mask >> day & 1
+            for offset in self.offsets
+        ]
+
+    def local_date(self, at: datetime):
+        """Date on the owner's wall clock at instant `at`."""
+        ts = int(at.timestamp())
+        return datetime.fromtimestamp(ts + zone_table(self.tz_name, ts).offset_at(ts), timezone.utc).date()
+
+    def next_start(self, from_dt: datetime):
+        """Return the next class start (aware UTC) at or after `from_dt`, or None."""
+        if self.start_minute is None:
+            return None
+
+        ts = int(from_dt.timestamp())
+        table = zone_table(self.tz_name, ts)
+        day, second_of_day = divmod(ts + table.offset_at(ts), 86400)
+        weekday = (day + 3) % 7  # 1970-01-01 was a Thursday
+
+        # Rotate the mask so bit 0 is today, then the lowest set bit is the days ahead
+        rotated = ((self.weekday_mask >> weekday) | (self.weekday_mask << (7 - weekday))) & ALL_DAYS
+        if self.start_minute * 60 < second_of_day:
+            rotated &= ~1
+        if not rotated:
+            # Only today's weekday matches and it has passed: same weekday next week
+            days_ahead = 7
+        else:
+            days_ahead = (rotated & -rotated).bit_length() - 1
+
+        start_local = (day + days_ahead) * 86400 + self.start_minute * 60
+        return datetime.fromtimestamp(table.to_utc(start_local), timezone.utc)
+
+
+def compile_schedule(schedule):
+    """Return the cached CompiledSchedule for a schedule, recompiling if `updated_at` or the owner's zone moved.
+
+    The zone is read from `schedule.user`; bulk callers should eager-load it (see
+    `app.scheduler._with_user_zone`) to avoid one user query per schedule.
+    """
+    schedule_id = getattr(schedule, 'id', None)
+    tz_name = schedule_zone_name(schedule)
+    if schedule_id is None:
+        return CompiledSchedule.from_schedule(schedule, tz_name)
+
+    compiled = _cache.get(schedule_id)
+    if (compiled is None or compiled.updated_at != getattr(schedule, 'updated_at', None)
+            or compiled.tz_name != tz_name):
+        compiled = CompiledSchedule.from_schedule(schedule, tz_name)
+        _cache[schedule_id] = compiled
+    return compiled
+
+
+def cached_schedule(schedule_id: int):
+    """Return the last compiled form of a schedule id without touching the database."""
+    return _cache.get(schedule_id)
+
+
+def evict(schedule_id: int):
+    """Forget the compiled form of a schedule (e.g. after deletion)."""
+    _cache.pop(schedule_id, None)
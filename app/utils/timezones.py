@@ -0,0 +1,154 @@
+"""
+Time zone resolution and precomputed UTC offset tables
+
+`User.timezone` holds an IANA name ("Asia/Manila"). Names are resolved to `zoneinfo`
+objects once and cached. For next-fire computation each zone gets an `OffsetTable`: the
+UTC offsets in effect over the coming year with the exact instants of its DST
+transitions, so converting between UTC and local wall-clock seconds is a bisect (or a
+NumPy searchsorted for a whole batch) instead of a tz conversion per candidate date.
+"""
+
+from bisect import bisect_right
+from datetime import datetime, timezone
+import threading
+
+try:
+    from zoneinfo import ZoneInfo, ZoneInfoNotFoundError, available_timezones
+except ImportError:  # Python < 3.9
+    ZoneInfo = None
+
+# Days of transitions covered by a table, and how close to its end it gets rebuilt
+_TABLE_DAYS = 400
+_TABLE_REFRESH_DAYS = 14
+
+_zones = {}   # name -> tzinfo
+_tables = {}  # name -> OffsetTable
+_lock = threading.Lock()
+_default_zone_name = None
+
+
+def local_timezone():
+    """Return the server's local timezone (falls back to UTC)."""
+    try:
+        return datetime.now().astimezone().tzinfo
+    except Exception:
+        return timezone.utc
+
+
+def set_default_zone(name):
+    """Zone used for users without a time zone (None keeps the server's local zone)."""
+    global _default_zone_name
+    _default_zone_name = name or None
+    _tables.pop(None, None)
+
+
+def is_valid_zone(name: str):
+    if not name or ZoneInfo is None:
+        return False
+    try:
+        ZoneInfo(name)
+        return True
+    except (ZoneInfoNotFoundError, ValueError):
+        return False
+
+
+def zone_names():
+    """Sorted IANA zone names available on this system (for pickers)."""
+    if ZoneInfo is None:
+        return []
+    return sorted(available_timezones())
+
+
+def get_zone(name=None):
+    """Return the cached tzinfo for an IANA name; unknown or empty names map to the default zone."""
+    name = name or _default_zone_name
+    if not name:
+        return local_timezone()
+
+    zone = _zones.get(name)
+    if zone is None:
+        if is_valid_zone(name):
+            zone = ZoneInfo(name)
+        else:
+            print(f"⚠️ Unknown time zone {name!r}; using the default zone")
+            zone = get_zone(None) if name != _default_zone_name else local_timezone()
+        _zones[name] = zone
+    return zone
+
+
+class OffsetTable:
+    """UTC offsets of one zone between `valid_from` and `valid_until` (epoch seconds).
+
+    `starts[i]` is the UTC instant from which `offsets[i]` (seconds east of UTC) applies.
+    """
+
+    __slots__ = ('zone', 'valid_from', 'valid_until', 'starts', 'offsets', '_np_starts', '_np_offsets')
+
+    def __init__(self, zone, from_ts: int, days: int = _TABLE_DAYS):
+        self.zone = zone
+        self.valid_from = from_ts - 86400
+        self.valid_until = from_ts + days * 86400
+        self.starts = [self.valid_from]
+        self.offsets = [self._offset(self.valid_from)]
+        self._np_starts = self._np_offsets = None
+
+        # Sample once a day; bisect each day where the offset changed down to the second
+        previous = self.valid_from
+        for ts in range(self.valid_from + 86400, self.valid_until + 1, 86400):
+            offset = self._offset(ts)
+            if offset != self.offsets[-1]:
+                lo, hi = previous, ts
+                while hi - lo > 1:
+                    mid = (lo + hi) // 2
+                    if self._offset(mid) == offset:
+                        hi = mid
+                    else:
+                        lo = mid
+                self.starts.append(hi)
+                self.offsets.append(offset)
+            previous = ts
+
+    def _offset(self, ts: int):
+        return int(datetime.fromtimestamp(ts, self.zone).utcoffset().total_seconds())
+
+    def covers(self, ts: int):
+        return self.valid_from <= ts <= self.valid_until - _TABLE_REFRESH_DAYS * 86400
+
+    def offset_at(self, ts: int):
+        """UTC offset in seconds at UTC instant `ts`."""
+        if not self.valid_from <= ts <= self.valid_until:
+            return self._offset(ts)
+        return self.offsets[bisect_right(self.starts, ts) - 1]
+
+    def next_change(self, ts: int):
+        """First UTC instant after `ts` at which the offset changes, or None if none within the table."""
+        i = bisect_right(self.starts, ts)
+        return self.starts[i] if i < len(self.starts) else None
+
+    def to_utc(self, local_ts: int):
+        """UTC instant of a local wall-clock time (epoch seconds as if the wall clock were UTC)."""
+        return local_ts - self.offset_at(local_ts - self.offset_at(local_ts))
+
+    def offsets_at(self, np, ts):
+        """Vectorized `offset_at` over an int64 array of UTC instants (inside the table window)."""
+        if self._np_starts is None:
+            self._np_starts = np.asarray(self.starts, dtype=np.int64)
+            self._np_offsets = np.asarray(self.offsets, dtype=np.int64)
+        return self._np_offsets[np.maximum(np.searchsorted(self._np_starts, ts, side='right') - 1, 0)]
+
+    def to_utc_batch(self, np, local_ts):
+        return local_ts - self.offsets_at(np, local_ts - self.offsets_at(np, local_ts))
+
+
+def zone_table(name=None, ts: int = None):
+    """Return the cached OffsetTable of a zone, rebuilt when `ts` (default now) nears its end."""
+    ts = int(datetime.now(timezone.utc).timestamp()) if ts is None else ts
+    key = name or None
+    table = _tables.get(key)
+    if table is None or not table.covers(ts):
+        with _lock:
+            table = _tables.get(key)
+            if table is None or not table.covers(ts):
+                table = OffsetTable(get_zone(key), ts)
+                _tables[key] = table
+    return table
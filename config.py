@@ -34,6 +34,87 @@ class Config:
     # SocketIO settings
     SOCKETIO_ASYNC_MODE = 'threading'
     
+    # Time zone for users without one set, e.g. "Asia/Manila" (unset: the server's local zone)
+    DEFAULT_TIMEZONE = os.environ.get('DEFAULT_TIMEZONE')
+
+    # Scheduler settings
+    # Set SCHEDULER_AUTOSTART=0 for one-off tools that should not run the scheduler
+    SCHEDULER_AUTOSTART = os.environ.get('SCHEDULER_AUTOSTART', '1') != '0'
+    # 'per_schedule': one DateTrigger job per (schedule, offset)
+    # 'minute_bucket': one weekly job per distinct fire minute, firing all alarm_slots rows due in it;
+    # slots are rewritten at each DST change of an owner's zone
+    SCHEDULER_JOB_MODE = os.environ.get('SCHEDULER_JOB_MODE', 'per_schedule')
+    # Executor for alarm jobs: 'threadpool', or 'processpool' for CPU-bound batches
+    SCHEDULER_EXECUTOR = os.environ.get('SCHEDULER_EXECUTOR', 'threadpool')
+    SCHEDULER_MAX_WORKERS = int(os.environ.get('SCHEDULER_MAX_WORKERS', 20))
+    SCHEDULER_MAX_INSTANCES = int(os.environ.get('SCHEDULER_MAX_INSTANCES', 3))
+    SCHEDULER_COALESCE = os.environ.get('SCHEDULER_COALESCE', '1') != '0'
+    SCHEDULER_MISFIRE_GRACE_TIME = int(os.environ.get('SCHEDULER_MISFIRE_GRACE_TIME', 30))  # seconds
+    # 'compact': per-occurrence alarm jobs in typed columns (app/jobstore.py); 'pickle': APScheduler's pickled store
+    SCHEDULER_JOBSTORE = os.environ.get('SCHEDULER_JOBSTORE', 'compact')
+    # Full schedule scans: 'stream' reads column tuples in yield_per chunks; 'orm' loads Schedule objects
+    SCHEDULER_SCAN_MODE = os.environ.get('SCHEDULER_SCAN_MODE', 'stream')
+    SCHEDULER_SCAN_CHUNK_SIZE = int(os.environ.get('SCHEDULER_SCAN_CHUNK_SIZE', 2000))
+    # Shared due-alarm queue: the leader enqueues, every scheduler process claims and delivers (app/alarm_queue.py)
+    ALARM_QUEUE_ENABLED = os.environ.get('ALARM_QUEUE_ENABLED', '0') == '1'
+    ALARM_QUEUE_BATCH_SIZE = int(os.environ.get('ALARM_QUEUE_BATCH_SIZE', 500))
+    ALARM_QUEUE_VISIBILITY_TIMEOUT = int(os.environ.get('ALARM_QUEUE_VISIBILITY_TIMEOUT', 30))  # seconds
+    ALARM_QUEUE_POLL_INTERVAL = float(os.environ.get('ALARM_QUEUE_POLL_INTERVAL', 1))  # seconds
+    ALARM_QUEUE_MAX_LATENESS = int(os.environ.get('ALARM_QUEUE_MAX_LATENESS', 300))  # seconds
+    ALARM_QUEUE_MAX_ATTEMPTS = int(os.environ.get('ALARM_QUEUE_MAX_ATTEMPTS', 5))
+    # Seconds the scheduler holds socket events so alarms from separate jobs merge into one
+    # notifications_batch per user; 0 merges only alarms delivered together
+    NOTIFICATION_COALESCE_WINDOW = float(os.environ.get('NOTIFICATION_COALESCE_WINDOW', 0))
+    # Scheduler processes without a Socket.IO server (scheduler_worker.py) commit socket events to
+    # `notification_outbox`; the web process emits them (app/outbox.py)
+    NOTIFICATION_OUTBOX_ENABLED = os.environ.get('NOTIFICATION_OUTBOX_ENABLED', '1') != '0'
+    NOTIFICATION_OUTBOX_BATCH_SIZE = int(os.environ.get('NOTIFICATION_OUTBOX_BATCH_SIZE', 500))
+    # Polling backs off from MIN to MAX while the outbox stays empty (Postgres wakes early on NOTIFY)
+    NOTIFICATION_OUTBOX_POLL_MIN = float(os.environ.get('NOTIFICATION_OUTBOX_POLL_MIN', 0.05))  # seconds
+    NOTIFICATION_OUTBOX_POLL_MAX = float(os.environ.get('NOTIFICATION_OUTBOX_POLL_MAX', 1))  # seconds
+    NOTIFICATION_OUTBOX_MAX_AGE = int(os.environ.get('NOTIFICATION_OUTBOX_MAX_AGE', 300))  # older rows are dropped unsent
+    # Claimed rows a drainer has not deleted within this many seconds are emitted again by any drainer
+    NOTIFICATION_OUTBOX_VISIBILITY_TIMEOUT = int(os.environ.get('NOTIFICATION_OUTBOX_VISIBILITY_TIMEOUT', 30))
+    # Warm-start snapshot of the fire queue (a JSON manifest plus a .npy beside it); set to '' to disable
+    SCHEDULER_SNAPSHOT_PATH = os.environ.get('SCHEDULER_SNAPSHOT_PATH', os.path.join(basedir, 'instance', 'scheduler_plan.json'))
+    SCHEDULER_SNAPSHOT_INTERVAL = int(os.environ.get('SCHEDULER_SNAPSHOT_INTERVAL', 300))  # seconds
+    # Only the holder of the DB lease runs the scheduler; others take over within TTL + renew interval
+    SCHEDULER_LEASE_ENABLED = os.environ.get('SCHEDULER_LEASE_ENABLED', '1') != '0'
+    SCHEDULER_LEASE_TTL = int(os.environ.get('SCHEDULER_LEASE_TTL', 30))  # seconds
+    SCHEDULER_LEASE_RENEW_INTERVAL = int(os.environ.get('SCHEDULER_LEASE_RENEW_INTERVAL', 10))  # seconds
+    # The leader persists its scheduler stats and metrics this often for the other processes to serve
+    SCHEDULER_REPORT_INTERVAL = int(os.environ.get('SCHEDULER_REPORT_INTERVAL', 15))  # seconds
+
+    # Bearer token for Prometheus scrapes of /admin/metrics (unset: logged-in users only)
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+    # Term management (POST /admin/terms, /admin/terms/rollover) needs `Bearer <ADMIN_TOKEN>`
+    # or a logged-in user whose username is listed in ADMIN_USERS (comma-separated)
+    ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN')
+    ADMIN_USERS = {name.strip() for name in os.environ.get('ADMIN_USERS', '').split(',') if name.strip()}
+
+    # Notification retention (app/retention.py), run as its own scheduler job
+    NOTIFICATION_RETENTION_HOURS = float(os.environ.get('NOTIFICATION_RETENTION_HOURS', 2))
+    # Per-type overrides in hours, e.g. "warning=1,info=24"
+    NOTIFICATION_RETENTION_BY_TYPE = os.environ.get('NOTIFICATION_RETENTION_BY_TYPE', '')
+    NOTIFICATION_RETENTION_INTERVAL = int(os.environ.get('NOTIFICATION_RETENTION_INTERVAL', 600))  # seconds
+    NOTIFICATION_RETENTION_CHUNK_SIZE = int(os.environ.get('NOTIFICATION_RETENTION_CHUNK_SIZE', 1000))
+    NOTIFICATION_RETENTION_MAX_SECONDS = int(os.environ.get('NOTIFICATION_RETENTION_MAX_SECONDS', 30))
+    # Copy purged notifications to notifications_archive instead of dropping them
+    NOTIFICATION_ARCHIVE_ENABLED = os.environ.get('NOTIFICATION_ARCHIVE_ENABLED', '0') == '1'
+    FIRE_LEDGER_RETENTION_DAYS = int(os.environ.get('FIRE_LEDGER_RETENTION_DAYS', 8))
+    # Missed-alarm recovery when a scheduler starts after downtime (app/recovery.py)
+    RECOVERY_ENABLED = os.environ.get('RECOVERY_ENABLED', '1') != '0'
+    RECOVERY_MAX_WINDOW_HOURS = float(os.environ.get('RECOVERY_MAX_WINDOW_HOURS', 24))
+    # Missed alarms are delivered until this many seconds after class start, then count as stale
+    RECOVERY_STALE_AFTER = int(os.environ.get('RECOVERY_STALE_AFTER', 0))
+    # 'digest': one "you missed N alerts" notification per user; 'skip': drop stale alarms
+    RECOVERY_STALE_POLICY = os.environ.get('RECOVERY_STALE_POLICY', 'digest')
+    # How often schedules are archived or restored as academic terms end and start (seconds)
+    TERM_ROLLOVER_INTERVAL = int(os.environ.get('TERM_ROLLOVER_INTERVAL', 3600))
+    # Notifications page and JSON API are keyset-paginated on (timestamp, id)
+    NOTIFICATIONS_PAGE_SIZE = int(os.environ.get('NOTIFICATIONS_PAGE_SIZE', 50))
+    NOTIFICATIONS_MAX_PAGE_SIZE = int(os.environ.get('NOTIFICATIONS_MAX_PAGE_SIZE', 200))
+    
     # Flask-Login settings
     REMEMBER_COOKIE_DURATION = timedelta(days=7)
     REMEMBER_COOKIE_SECURE = False  # Set to True in production with HTTPS
@@ -54,6 +135,11 @@ class ProductionConfig(Config):
     REMEMBER_COOKIE_SECURE = True
 
 
+class WorkerConfig(Config):
+    """Process-pool alarm workers: the parent process runs the scheduler"""
+    SCHEDULER_AUTOSTART = False
+
+
 class TestingConfig(Config):
     """Testing configuration"""
     TESTING = True
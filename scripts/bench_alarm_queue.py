@@ -0,0 +1,129 @@
+"""
+Benchmark: due-alarm queue drain throughput vs. number of worker processes
+
+Fills `due_alarms` with N due alarms (one per synthetic schedule) and times K worker
+processes draining it with `app.alarm_queue.process_batch`, for each K given. Checks that
+every alarm produced exactly one notification. Uses DATABASE_URL when set (Postgres shows
+the SKIP LOCKED scaling), otherwise a throwaway SQLite file (claims serialize there).
+The benchmark creates and deletes its own rows, but run it against a scratch database.
+
+Usage:
+    python scripts/bench_alarm_queue.py
+    DATABASE_URL=postgresql://... python scripts/bench_alarm_queue.py --alarms 50000 --workers 1 2 4 8
+"""
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+os.environ['SCHEDULER_AUTOSTART'] = '0'
+os.environ['SCHEDULER_SNAPSHOT_PATH'] = ''
+os.environ['ALARM_QUEUE_ENABLED'] = '1'
+
+
+def worker(name):
+    """Wait for the start signal on stdin, then drain the queue until a claim comes back empty."""
+    from app import create_app
+    from app import alarm_queue
+
+    app = create_app()
+    with app.app_context():
+        print('ready', flush=True)
+        sys.stdin.readline()
+        while alarm_queue.process_batch(app.config, name):
+            pass
+
+
+def fill(db, User, Schedule, DueAlarm, Notification, FireLedger, count):
+    """Reset the benchmark rows and enqueue one due alarm per schedule."""
+    DueAlarm.query.delete()
+    FireLedger.query.delete()
+    Notification.query.delete()
+    db.session.commit()
+
+    if Schedule.query.count() < count:
+        if User.query.filter_by(username='queuebench').first() is None:
+            db.session.add(User(username='queuebench', email='queuebench@example.com'))
+            db.session.commit()
+        user_id = User.query.filter_by(username='queuebench').first().id
+        missing = count - Schedule.query.count()
+        db.session.execute(db.insert(Schedule), [
+            {'user_id': user_id, 'subject': f'Bench {i}', 'days': 'Mon', 'time': '08:00 AM - 09:00 AM',
+             'alarm_enabled': True}
+            for i in range(missing)
+        ])
+        db.session.commit()
+
+    ids = [sid for (sid,) in db.session.query(Schedule.id).order_by(Schedule.id).limit(count)]
+    fire_at = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(seconds=1)
+    today = fire_at.date()
+    db.session.execute(db.insert(DueAlarm), [
+        {'schedule_id': sid, 'offset_seconds': 0, 'occurrence_date': today, 'fire_at': fire_at, 'attempts': 0}
+        for sid in ids
+    ])
+    db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--alarms', type=int, default=20_000)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--batch-size', type=int, default=500)
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        worker(args.worker)
+        return
+
+    workdir = None
+    if not os.environ.get('DATABASE_URL'):
+        workdir = tempfile.mkdtemp(prefix='queue-bench-')
+        os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ['ALARM_QUEUE_BATCH_SIZE'] = str(args.batch_size)
+
+    from app import create_app, db
+    from app.models import User, Schedule, DueAlarm, Notification, FireLedger
+
+    app = create_app()
+    print(f"{'workers':>7}  {'alarms':>8}  {'seconds':>8}  {'alarms/s':>9}  {'speedup':>7}  notifications")
+    baseline = None
+    with app.app_context():
+        db.create_all()
+        for count in args.workers:
+            fill(db, User, Schedule, DueAlarm, Notification, FireLedger, args.alarms)
+            procs = [
+                subprocess.Popen([sys.executable, os.path.abspath(__file__), '--worker', f'bench-{count}-{i}'],
+                                 stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+                for i in range(count)
+            ]
+            # Time the drain only, not interpreter start-up
+            for proc in procs:
+                while proc.stdout.readline().strip() != 'ready':
+                    pass
+            started = time.perf_counter()
+            for proc in procs:
+                proc.stdin.write('go\n')
+                proc.stdin.flush()
+            for proc in procs:
+                proc.communicate()
+            seconds = time.perf_counter() - started
+            db.session.expire_all()
+            notifications = Notification.query.count()
+            rate = args.alarms / seconds
+            baseline = baseline or rate
+            print(f"{count:>7}  {args.alarms:>8,}  {seconds:>8.2f}  {rate:>9,.0f}  {rate / baseline:>6.2f}x  "
+                  f"{notifications:,}{'' if notifications == args.alarms else '  MISMATCH'}")
+    if workdir:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""
+Benchmark: vectorized next_fire_batch vs. per-object _next_start_datetime_for_schedule
+
+Generates synthetic schedules (no database needed) and times the next-fire computation
+for every (schedule, offset) pair both ways, checking that the results agree.
+
+Usage:
+    python scripts/bench_next_fire.py
+    python scripts/bench_next_fire.py --sizes 10000 100000 1000000 --scalar-limit 100000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+
+from app.scheduler import next_fire_batch, _next_start_datetime_for_schedule
+from app.utils.compiled_schedule import compile_schedule
+
+DAY_NAMES = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+
+
+def make_schedules(n, seed=42):
+    rng = random.Random(seed)
+    stamp = datetime(2025, 1, 1)
+    schedules = []
+    for i in range(1, n + 1):
+        days = ', '.join(sorted(rng.sample(DAY_NAMES, rng.randint(1, 3)), key=DAY_NAMES.index))
+        hour, minute = rng.randint(7, 19), rng.choice((0, 15, 30, 45))
+        start = datetime(2000, 1, 1, hour, minute)
+        end = start + timedelta(minutes=90)
+        schedules.append(SimpleNamespace(
+            id=i,
+            days=days,
+            time=f"{start.strftime('%I:%M %p')} - {end.strftime('%I:%M %p')}",
+            alarm_offset_minutes=rng.choice((None, 5, 10, 15, 30, 60)),
+            updated_at=stamp,
+        ))
+    return schedules
+
+
+def run(n, now, scalar_limit):
+    schedules = make_schedules(n)
+    compiled = [compile_schedule(s) for s in schedules]
+
+    # Array setup is part of the vectorized cost
+    t0 = time.perf_counter()
+    rows = [(c.weekday_mask, c.start_minute, t) for c in compiled for t in c.offsets]
+    masks, starts, offs = (np.asarray(col, dtype=np.int64) for col in zip(*rows))
+    t1 = time.perf_counter()
+    fires = next_fire_batch(masks, starts, offs, now)
+    t2 = time.perf_counter()
+    print(f"{n:>9,} schedules ({len(rows):,} rows): arrays {t1 - t0:7.3f}s, batch {t2 - t1:7.3f}s", end='')
+
+    if n > scalar_limit:
+        print("  | per-object: skipped")
+        return
+
+    t3 = time.perf_counter()
+    expected = []
+    for s in schedules:
+        for t in compile_schedule(s).offsets:
+            start = _next_start_datetime_for_schedule(s, now + timedelta(seconds=t))
+            expected.append(int((start - timedelta(seconds=t)).timestamp()))
+    t4 = time.perf_counter()
+
+    mismatches = int(np.count_nonzero(fires != np.asarray(expected, dtype=np.int64)))
+    print(f"  | per-object {t4 - t3:7.3f}s  speedup x{(t4 - t3) / max(t2 - t1, 1e-9):,.0f}"
+          f"  mismatches={mismatches}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--scalar-limit', type=int, default=1_000_000,
+                        help='skip the per-object run above this many schedules')
+    args = parser.parse_args()
+
+    now = datetime.now(timezone.utc)
+    for n in args.sizes:
+        run(n, now, args.scalar_limit)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+"""
+Benchmark: notification outbox delivery latency (commit to Socket.IO emit) and depth
+
+Plays the standalone scheduler worker: a writer thread commits alarm-sized bursts of
+outbox rows at a fixed rate while `app.outbox.drainer` runs as it does in the web process,
+emitting to a connected Socket.IO test client. Reports the commit-to-emit latency
+percentiles, the deepest outbox seen, how many socket events carried the alerts and
+whether the client got every one. On Postgres
+(DATABASE_URL) it runs once with LISTEN/NOTIFY and once polling only; otherwise a
+throwaway SQLite file, polling only. Run it against a scratch database.
+
+Usage:
+    python scripts/bench_outbox_latency.py
+    DATABASE_URL=postgresql://... python scripts/bench_outbox_latency.py --bursts 100 --burst-size 200
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+os.environ['SCHEDULER_AUTOSTART'] = '0'
+os.environ['SCHEDULER_SNAPSHOT_PATH'] = ''
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else float('nan')
+
+
+def run(app, db, socketio, user_id, args, listen):
+    from app import metrics, outbox
+    from app.models import NotificationOutbox
+
+    # The drainer observes each row's commit-to-emit latency; keep the raw values
+    latencies = []
+    observe = metrics.outbox_latency.observe
+    metrics.outbox_latency.observe = lambda value, *labels: (latencies.append(value), observe(value, *labels))
+    # The first authenticated socket starts the drainer, as in the web process
+    drainer = outbox.drainer
+    drainer._listen = (lambda: outbox.OutboxDrainer._listen(drainer)) if listen else (lambda: None)
+
+    http = app.test_client()
+    with http.session_transaction() as session:
+        session['_user_id'] = str(user_id)
+    client = socketio.test_client(app, flask_test_client=http)
+    if not drainer.running:
+        raise RuntimeError('connecting did not start the outbox drainer')
+    time.sleep(app.config['NOTIFICATION_OUTBOX_POLL_MAX'] + 0.5)  # let the poll back off fully
+
+    depths = []
+
+    def sample_depth():
+        with app.app_context():
+            while not done.is_set():
+                depths.append(outbox.depth())
+                db.session.commit()
+                time.sleep(0.05)
+            db.session.remove()
+
+    done = threading.Event()
+    sampler = threading.Thread(target=sample_depth, daemon=True)
+    sampler.start()
+    with app.app_context():
+        for burst in range(args.bursts):
+            outbox.add([(user_id, 'new_notification', {'user_id': user_id, 'message': f'Bench {burst}/{i}'})
+                        for i in range(args.burst_size)])
+            db.session.commit()
+            time.sleep(args.interval)
+        deadline = time.time() + 30
+        while db.session.query(NotificationOutbox.id).first() is not None and time.time() < deadline:
+            db.session.commit()
+            time.sleep(0.05)
+    time.sleep(0.2)
+    done.set()
+    sampler.join()
+    drainer.stop()
+    drainer._thread.join()
+    metrics.outbox_latency.observe = observe
+
+    # A burst drained together reaches the client as one notifications_batch
+    packets = client.get_received()
+    received = sum(len(p['args'][0].get('items', [None])) for p in packets)
+    client.disconnect()
+    expected = args.bursts * args.burst_size
+    return {
+        'p50': percentile(latencies, 0.5) * 1000, 'p95': percentile(latencies, 0.95) * 1000,
+        'max': max(latencies) * 1000 if latencies else float('nan'),
+        'depth': max(depths) if depths else 0, 'received': received, 'expected': expected,
+        'events': len(packets),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--bursts', type=int, default=50)
+    parser.add_argument('--burst-size', type=int, default=100)
+    parser.add_argument('--interval', type=float, default=1.0, help='seconds between bursts')
+    args = parser.parse_args()
+
+    workdir = None
+    if not os.environ.get('DATABASE_URL'):
+        workdir = tempfile.mkdtemp(prefix='outbox-bench-')
+        os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+
+    from app import create_app, db, socketio
+    from app.models import User, NotificationOutbox
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        NotificationOutbox.query.delete()
+        if User.query.filter_by(username='outboxbench').first() is None:
+            db.session.add(User(username='outboxbench', email='outboxbench@example.com'))
+        db.session.commit()
+        user_id = User.query.filter_by(username='outboxbench').first().id
+        postgres = db.engine.dialect.name == 'postgresql'
+
+    print(f"{'mode':>7}  {'p50 ms':>7}  {'p95 ms':>7}  {'max ms':>7}  {'max depth':>9}  {'events':>6}  received")
+    for listen in ([True, False] if postgres else [False]):
+        r = run(app, db, socketio, user_id, args, listen)
+        print(f"{'listen' if listen else 'poll':>7}  {r['p50']:>7.1f}  {r['p95']:>7.1f}  {r['max']:>7.1f}  "
+              f"{r['depth']:>9,}  {r['events']:>6,}  {r['received']:,}/{r['expected']:,}")
+    if workdir:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
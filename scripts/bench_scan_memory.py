@@ -0,0 +1,148 @@
+"""
+Benchmark: worker memory of a full schedule scan, streaming vs. ORM
+
+Grows a throwaway SQLite database through the given table sizes and, at each size, runs
+`app.scheduler._scan_active_schedules()` once per SCHEDULER_SCAN_MODE in a fresh
+subprocess, sampling its RSS. As in production, the scan fills the compiled-schedule
+cache (one entry per schedule), so the peak includes the cache and grows with the table
+in both modes; 'stream' should grow by the cache alone, 'orm' by the cache plus every
+loaded ORM object. --clear-cache empties the cache after each chunk, which production
+never does, to measure the scan by itself: then 'stream' stays flat.
+
+Linux only (reads /proc/self/statm).
+
+Usage:
+    python scripts/bench_scan_memory.py
+    python scripts/bench_scan_memory.py --sizes 10000 50000 200000 --chunk-size 1000
+    python scripts/bench_scan_memory.py --clear-cache
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+DAY_NAMES = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+PAGE_KB = os.sysconf('SC_PAGE_SIZE') // 1024
+
+
+def rss_kb():
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * PAGE_KB
+
+
+def seed(db, User, Schedule, count, start_index, rng):
+    """Bulk-insert `count` more schedules spread over count/5 new users."""
+    users = max(1, count // 5)
+    db.session.execute(db.insert(User), [
+        {'username': f'scan{start_index + i}', 'email': f'scan{start_index + i}@example.com'} for i in range(users)
+    ])
+    user_ids = [uid for (uid,) in db.session.query(User.id).filter(User.username.like('scan%'))]
+    for offset in range(0, count, 10_000):
+        rows = []
+        for i in range(offset, min(count, offset + 10_000)):
+            days = ', '.join(sorted(rng.sample(DAY_NAMES, rng.randint(1, 3)), key=DAY_NAMES.index))
+            start = datetime(2000, 1, 1, rng.randint(7, 19), rng.choice((0, 15, 30, 45)))
+            end = start + timedelta(minutes=90)
+            rows.append({
+                'user_id': rng.choice(user_ids),
+                'subject': f'Class {start_index + i}',
+                'days': days,
+                'time': f"{start.strftime('%I:%M %p')} - {end.strftime('%I:%M %p')}",
+                'alarm_enabled': True,
+                'alarm_offset_minutes': rng.choice((None, 5, 10, 15, 30, 60)),
+            })
+        db.session.execute(db.insert(Schedule), rows)
+    db.session.commit()
+
+
+def child(mode, clear_cache):
+    """Run one scan in this process and print its cost as JSON."""
+    from app import create_app
+    import app.scheduler as sched
+    from app.utils import compiled_schedule
+
+    app = create_app()
+    sched._app = app
+    with app.app_context():
+        baseline = rss_kb()
+        peak = [baseline]
+        done = threading.Event()
+
+        def sample():
+            while not done.is_set():
+                peak[0] = max(peak[0], rss_kb())
+                time.sleep(0.002)
+
+        sampler = threading.Thread(target=sample, daemon=True)
+        sampler.start()
+        started = time.perf_counter()
+        rows = 0
+        for chunk in sched._scan_active_schedules():
+            rows += len(chunk)
+            if clear_cache:
+                compiled_schedule._cache.clear()
+        seconds = time.perf_counter() - started
+        done.set()
+        sampler.join()
+        peak[0] = max(peak[0], rss_kb())
+    print(json.dumps({'rows': rows, 'baseline_kb': baseline, 'peak_kb': peak[0], 'seconds': seconds,
+                      'cached': len(compiled_schedule._cache)}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 50_000, 100_000, 200_000])
+    parser.add_argument('--modes', nargs='+', default=['stream', 'orm'])
+    parser.add_argument('--chunk-size', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--clear-cache', action='store_true',
+                        help='empty the compiled-schedule cache after each chunk (scan cost alone)')
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child, args.clear_cache)
+        return
+
+    workdir = tempfile.mkdtemp(prefix='scan-bench-')
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(workdir, 'bench.db')}", SCHEDULER_AUTOSTART='0',
+               SCHEDULER_SCAN_CHUNK_SIZE=str(args.chunk_size))
+    os.environ.update(env)
+
+    from app import create_app, db
+    from app.models import User, Schedule
+
+    app = create_app()
+    rng = random.Random(args.seed)
+    print(f"{'schedules':>10}  {'mode':>6}  {'scan peak MB':>12}  {'cached':>8}  {'seconds':>8}")
+    seeded = 0
+    with app.app_context():
+        db.create_all()
+        for size in sorted(args.sizes):
+            if size > seeded:
+                seed(db, User, Schedule, size - seeded, seeded, rng)
+                seeded = size
+            for mode in args.modes:
+                out = subprocess.run(
+                    [sys.executable, os.path.abspath(__file__), '--child', mode] + ['--clear-cache'] * args.clear_cache,
+                    env=dict(env, SCHEDULER_SCAN_MODE=mode), capture_output=True, text=True, check=True,
+                )
+                result = json.loads(out.stdout.strip().splitlines()[-1])
+                growth_mb = (result['peak_kb'] - result['baseline_kb']) / 1024
+                print(f"{result['rows']:>10,}  {mode:>6}  {growth_mb:>12.1f}  {result['cached']:>8,}  "
+                      f"{result['seconds']:>8.2f}")
+    shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
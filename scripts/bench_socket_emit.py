@@ -0,0 +1,110 @@
+"""
+Benchmark: cost of delivering one alert with thousands of connected Socket.IO clients
+
+Connects N logged-in Socket.IO test clients (one user each, through the real connect
+handler, so each joins its `user:<id>` room), then times sending alerts two ways:
+broadcast to every socket (the old behaviour) and `emit_to_user` to the recipient's room.
+Also counts how many sockets received each alert and how many of those belong to another
+user; with rooms that must be exactly one and zero.
+Uses a throwaway SQLite database.
+
+Usage:
+    python scripts/bench_socket_emit.py
+    python scripts/bench_socket_emit.py --clients 1000 5000 --alerts 500
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+
+def connect_clients(app, socketio, user_ids):
+    clients = []
+    for user_id in user_ids:
+        http = app.test_client()
+        with http.session_transaction() as session:
+            session['_user_id'] = str(user_id)
+            session['_fresh'] = True
+        client = socketio.test_client(app, flask_test_client=http)
+        if not client.is_connected():
+            raise RuntimeError(f"user {user_id} was refused")
+        clients.append((user_id, client))
+    return clients
+
+
+def drain(clients):
+    """(events waiting across all clients, events addressed to another user) - clears them."""
+    received = misrouted = 0
+    for user_id, client in clients:
+        for packet in client.get_received():
+            received += 1
+            misrouted += packet['args'][0]['user_id'] != user_id
+    return received, misrouted
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--clients', type=int, nargs='+', default=[500, 2000, 5000])
+    parser.add_argument('--alerts', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='socket-bench-')
+    os.environ.update(DATABASE_URL=f"sqlite:///{os.path.join(workdir, 'bench.db')}", SCHEDULER_AUTOSTART='0',
+                      SCHEDULER_SNAPSHOT_PATH='')
+
+    from app import create_app, db, socketio
+    from app.models import User
+    from app.realtime import emit_to_user
+
+    app = create_app()
+    rng = random.Random(args.seed)
+    # Sockets connect outside any app context: each handshake must get its own `g`, or
+    # Flask-Login would reuse the first socket's user for all of them
+    with app.app_context():
+        db.create_all()
+    if socketio.test_client(app).is_connected():
+        raise RuntimeError('anonymous socket was accepted')
+
+    print(f"{'clients':>8}  {'mode':>9}  {'ms/alert':>9}  {'sockets/alert':>13}  {'leaked':>8}")
+    clients = []
+    for count in sorted(args.clients):
+        with app.app_context():
+            missing = count - len(clients)
+            db.session.execute(db.insert(User), [
+                {'username': f'sock{len(clients) + i}', 'email': f'sock{len(clients) + i}@example.com'}
+                for i in range(missing)
+            ])
+            db.session.commit()
+            user_ids = [uid for (uid,) in db.session.query(User.id).order_by(User.id).offset(len(clients))]
+            all_ids = [uid for (uid,) in db.session.query(User.id)]
+        clients += connect_clients(app, socketio, user_ids)
+        drain(clients)
+
+        recipients = [rng.choice(all_ids) for _ in range(args.alerts)]
+        for mode in ('broadcast', 'room'):
+            started = time.perf_counter()
+            for user_id in recipients:
+                payload = {'user_id': user_id, 'message': 'Upcoming class: Bench', 'type': 'alarm'}
+                if mode == 'broadcast':
+                    socketio.emit('new_notification', payload)
+                else:
+                    emit_to_user(socketio, user_id, 'new_notification', payload)
+            seconds = time.perf_counter() - started
+            received, misrouted = drain(clients)
+            print(f"{count:>8,}  {mode:>9}  {seconds / args.alerts * 1000:>9.3f}  "
+                  f"{received / args.alerts:>13,.1f}  {misrouted:>8,}")
+
+    for _, client in clients:
+        client.disconnect()
+    shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,227 @@
+"""
+Replay harness: run the interval scheduler tick against a virtual clock
+
+Loads N synthetic schedules into an in-memory SQLite database, points the scheduler at a
+virtual clock (app.scheduler.set_clock) and replays a simulated week of 5 second ticks
+in seconds. Ticks with nothing due are skipped by jumping the clock to the fire queue
+head (pass --every-tick to execute all of them). Every fire is checked against a list of
+intended instants computed straight from each row's days, start time and offsets with
+`datetime` and `zoneinfo`, sharing no code with the scheduler's next-occurrence math.
+Users without a zone use DEFAULT_TIMEZONE (UTC unless set in the environment).
+
+Reports fires, lateness vs. the intended instant, duplicates, misses and per-tick cost.
+
+Usage:
+    python scripts/replay_week.py
+    python scripts/replay_week.py --schedules 100000 --days 7 --zones Asia/Manila America/New_York
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Isolated in-memory database, no background scheduler or leader lease
+os.environ['DATABASE_URL'] = 'sqlite://'
+os.environ['SCHEDULER_AUTOSTART'] = '0'
+os.environ['SCHEDULER_SNAPSHOT_PATH'] = ''
+# The oracle needs an IANA zone for users without one, not the server's local offset
+os.environ.setdefault('DEFAULT_TIMEZONE', 'UTC')
+
+from app import create_app, db
+from app.models import User, Schedule
+import app.scheduler as sched
+
+DAY_NAMES = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+TICK = timedelta(seconds=5)
+
+
+class VirtualClock:
+    """Settable stand-in for the scheduler's wall clock."""
+
+    def __init__(self, now: datetime):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def seed(n, zones, rng):
+    """Bulk-insert N schedules spread over N/5 users."""
+    users = max(1, n // 5)
+    db.session.execute(db.insert(User), [
+        {'username': f'replay{i}', 'email': f'replay{i}@example.com', 'timezone': rng.choice(zones) if zones else None}
+        for i in range(users)
+    ])
+    user_ids = [uid for (uid,) in db.session.query(User.id)]
+    rows = []
+    for i in range(n):
+        days = ', '.join(sorted(rng.sample(DAY_NAMES, rng.randint(1, 3)), key=DAY_NAMES.index))
+        start = datetime(2000, 1, 1, rng.randint(7, 19), rng.choice((0, 15, 30, 45)))
+        end = start + timedelta(minutes=90)
+        rows.append({
+            'user_id': rng.choice(user_ids),
+            'subject': f'Class {i}',
+            'days': days,
+            'time': f"{start.strftime('%I:%M %p')} - {end.strftime('%I:%M %p')}",
+            'alarm_enabled': True,
+            'alarm_offset_minutes': rng.choice((None, 5, 10, 15, 30, 60)),
+        })
+    db.session.execute(db.insert(Schedule), rows)
+    db.session.commit()
+
+
+def intended_fires(rows, default_zone: str, start: datetime, end: datetime):
+    """{(schedule_id, offset, local class date): intended fire instant (UTC)} for fires in [start, end].
+
+    `rows` are (id, days, time, alarm_offset_minutes, zone name) as seeded. Each local
+    class start is built with `datetime.combine(..., tzinfo=ZoneInfo(zone))` (fold=0 for
+    ambiguous wall times) and converted to UTC, without the scheduler's compiled schedules.
+    """
+    intended = {}
+    for schedule_id, days, time_range, offset_minutes, zone_name in rows:
+        zone = ZoneInfo(zone_name or default_zone)
+        weekdays = {DAY_NAMES.index(day.strip()) for day in days.split(',')}
+        start_time = datetime.strptime(time_range.split('-')[0].strip(), '%I:%M %p').time()
+        offsets = {3600, 1800, 0}
+        if offset_minutes is not None:
+            offsets.add(offset_minutes * 60)
+
+        # Every local date a fire in the window can belong to (offsets are at most an hour)
+        day = start.astimezone(zone).date() - timedelta(days=1)
+        while day <= end.astimezone(zone).date() + timedelta(days=1):
+            if day.weekday() in weekdays:
+                class_start = datetime.combine(day, start_time, tzinfo=zone).astimezone(timezone.utc)
+                for offset in offsets:
+                    fire_at = class_start - timedelta(seconds=offset)
+                    if start <= fire_at <= end:
+                        intended[(schedule_id, offset, day)] = fire_at
+            day += timedelta(days=1)
+    return intended
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--schedules', type=int, default=10_000)
+    parser.add_argument('--days', type=float, default=7)
+    parser.add_argument('--zones', nargs='*', default=[], help='IANA zones to assign to users at random')
+    parser.add_argument('--start', help='ISO start instant in UTC (default: next Monday 00:00 UTC)')
+    parser.add_argument('--every-tick', action='store_true', help='execute idle ticks too')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    if args.start:
+        start = datetime.fromisoformat(args.start).replace(tzinfo=timezone.utc)
+    else:
+        today = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+        start = today + timedelta(days=7 - today.weekday())
+    end = start + timedelta(days=args.days)
+
+    app = create_app()
+    clock = VirtualClock(start)
+    sched.set_clock(clock)
+    sched._app = app
+    sched._socketio = None
+
+    # Record every fire the tick tries to claim, and which ones the ledger granted
+    attempts, granted = [], []
+    claim_fires = sched._claim_fires
+
+    def recording_claim(keys):
+        keys = list(keys)
+        claimed = claim_fires(keys)
+        attempts.extend((key, clock.now) for key in keys)
+        granted.extend((key, clock.now) for key in keys if key in claimed)
+        return claimed
+
+    sched._claim_fires = recording_claim
+
+    with app.app_context():
+        db.create_all()
+        t0 = time.perf_counter()
+        seed(args.schedules, args.zones, random.Random(args.seed))
+        t1 = time.perf_counter()
+        rows = db.session.query(Schedule.id, Schedule.days, Schedule.time, Schedule.alarm_offset_minutes,
+                                User.timezone).join(User, Schedule.user_id == User.id).all()
+        intended = intended_fires(rows, app.config['DEFAULT_TIMEZONE'], start, end)
+        t2 = time.perf_counter()
+        sched._rebuild_fire_queue()
+        t3 = time.perf_counter()
+        db.session.remove()
+    print(f"Seeded {args.schedules:,} schedules in {t1 - t0:.2f}s, {len(intended):,} intended fires "
+          f"({t2 - t1:.2f}s), fire queue loaded in {t3 - t2:.2f}s")
+
+    # Replay on the 5 second tick grid
+    tick_ms, tick_queries, busy = [], [], 0
+    ticks = skipped = 0
+    replay_started = time.perf_counter()
+    sys.stdout, real_stdout = open(os.devnull, 'w'), sys.stdout  # silence per-tick logging
+    try:
+        while clock.now <= end:
+            before = len(attempts)
+            t = time.perf_counter()
+            sched.check_and_send_notifications()
+            tick_ms.append((time.perf_counter() - t) * 1000)
+            tick_queries.append(sched.last_tick_stats.get('queries', 0))
+            ticks += 1
+            busy += len(attempts) > before
+
+            following = clock.now + TICK
+            head = sched.fire_queue.peek()
+            if not args.every_tick and head is not None:
+                # First grid tick whose threshold window reaches the queue head
+                lead = head - timedelta(seconds=sched._FIRE_THRESHOLD) - clock.now
+                steps = max(1, -(-int(lead.total_seconds()) // int(TICK.total_seconds())))
+                skipped += steps - 1
+                following = clock.now + steps * TICK
+            clock.now = following
+    finally:
+        sys.stdout.close()
+        sys.stdout = real_stdout
+    replay_seconds = time.perf_counter() - replay_started
+    sched.set_clock(None)
+
+    # Compare against the intended fires
+    delivered = {}
+    duplicates = 0
+    for key, at in granted:
+        if key in delivered:
+            duplicates += 1
+        delivered.setdefault(key, at)
+    suppressed = len(attempts) - len(granted)
+    lateness = [(at - intended[key]).total_seconds() for key, at in delivered.items() if key in intended]
+    unexpected = [key for key in delivered if key not in intended]
+    misses = [key for key in intended if key not in delivered]
+
+    print(f"\nReplayed {args.days:g} day(s) from {start.isoformat()} in {replay_seconds:.2f}s")
+    print(f"  ticks executed {ticks:,} ({busy:,} with fires), idle ticks skipped {skipped:,}")
+    print(f"  fires delivered {len(delivered):,} / intended {len(intended):,}")
+    print(f"  misses {len(misses):,}, duplicates {duplicates:,}, unexpected {len(unexpected):,}, "
+          f"re-fires suppressed by ledger {suppressed:,}")
+    print(f"  lateness s: min {min(lateness, default=0):.1f}  p50 {percentile(lateness, 50):.1f}  "
+          f"p95 {percentile(lateness, 95):.1f}  max {max(lateness, default=0):.1f}")
+    print(f"  tick ms:    p50 {percentile(tick_ms, 50):.2f}  p95 {percentile(tick_ms, 95):.2f}  "
+          f"max {max(tick_ms, default=0):.2f}")
+    print(f"  queries/tick: p50 {percentile(tick_queries, 50):.0f}  max {max(tick_queries, default=0)}")
+    for key in unexpected[:10]:
+        print(f"  unexpected {key} at {delivered[key].isoformat()}")
+    for key in misses[:10]:
+        print(f"  missed {key} intended {intended[key].isoformat()}")
+
+    return 1 if misses or duplicates or unexpected else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())